@@ -1,5 +1,7 @@
 '''Filter events based on the number of objects in the input collection.'''
 
+import numpy
+
 from heppy.framework.analyzer import Analyzer
 from heppy.statistics.counter import Counter
 
@@ -31,6 +33,8 @@ class EventFilter  (Analyzer):
       - if True: events are rejected if there are >= min_number objects in input_objects.
     '''
 
+    is_filter = True
+
     def beginLoop(self, setup):
         super(EventFilter, self).beginLoop(setup)
         self.counters.addCounter('efficiency')
@@ -54,5 +58,17 @@ class EventFilter  (Analyzer):
         if passed:
             self.counters['efficiency'].inc('Selected')
         return passed
+
+    def process_batch(self, batch):
+        '''Same as L{process}, for a L{block of events<heppy.framework.batch.EventBatch>}.'''
+        nobjects = numpy.array([len(input_collection) for input_collection
+                                in batch.get(self.cfg_ana.input_objects)])
+        if self.cfg_ana.veto:
+            passed = nobjects < self.cfg_ana.min_number
+        else:
+            passed = nobjects >= self.cfg_ana.min_number
+        self.counters['efficiency'].inc('All events', len(batch))
+        self.counters['efficiency'].inc('Selected', int(passed.sum()))
+        return passed.tolist()
             
 
@@ -0,0 +1,55 @@
+'''Writes the index of the events reaching this analyzer.'''
+
+from heppy.framework.analyzer import Analyzer
+from heppy.framework.eventindex import EventIndex
+from heppy.framework.entries import EntryCounts
+
+class EventIndexWriter(Analyzer):
+    '''Records the entries of the events reaching this analyzer,
+    i.e. the events selected by the previous analyzers in the sequence.
+
+    The index is written to event_index.npz in the analyzer directory.
+    See L{EventIndex<heppy.framework.eventindex.EventIndex>}.
+    In a later run, only the selected events can be processed
+    by setting the event_index attribute of the component::
+
+      comp.event_index = 'Outdir/comp/heppy.analyzers.EventIndexWriter.EventIndexWriter_zh/event_index.npz'
+
+    Example::
+
+        from heppy.analyzers.EventIndexWriter import EventIndexWriter
+        zh_index = cfg.Analyzer(
+          EventIndexWriter,
+          'zh'
+        )
+        sequence = cfg.Sequence(
+          source,
+          zed_filter,
+          zh_index,
+          ...
+        )
+
+    The indices of the chunks of a component are merged by heppy_hadd.
+    '''
+
+    def beginLoop(self, setup):
+        super(EventIndexWriter, self).beginLoop(setup)
+        self.events_class = setup.config.events_class
+        self.entries = []
+
+    def process(self, event):
+        self.entries.append(event.iEv)
+
+    def write(self, setup):
+        super(EventIndexWriter, self).write(setup)
+        tree_name = getattr(self.cfg_comp, 'tree_name', None)
+        counts = EntryCounts()
+        nentries = [counts.count(fname, tree_name, self.events_class)
+                    for fname in self.cfg_comp.files]
+        counts.save()
+        index = EventIndex.from_entries(self.entries,
+                                        self.cfg_comp.files,
+                                        nentries,
+                                        tree_name)
+        index.write('/'.join([self.dirName, EventIndex.fname]))
+        self.logger.info(str(index))
@@ -2,7 +2,7 @@ from heppy.framework.analyzer import Analyzer
 from ROOT import TVector3, TLorentzVector, TFile, TTree
 from heppy.papas.path import Helix
 import math
-import random
+import heppy.statistics.rrandom as random
 from heppy.utils.computeIP import *
 # from heppy.utils.ComputeMVA import ComputeMVA
 
@@ -3,7 +3,7 @@ from heppy.papas.path import ImpactParameter
 from ROOT import TVector3, TLorentzVector, TFile, TTree
 # from heppy.papas.path import Helix
 import math
-import random
+import heppy.statistics.rrandom as random
 # from heppy.utils.computeIP import *
 
 class ImpactParameterSmearer(Analyzer):
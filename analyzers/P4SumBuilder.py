@@ -43,4 +43,14 @@ class P4SumBuilder(Analyzer):
             charge += ptc.q()
         sumptc = Particle(pdgid, charge, p4)
         setattr(event, self.cfg_ana.output, sumptc)
+
+    def process_batch(self, batch):
+        '''Same as L{process}, for a L{block of events<heppy.framework.batch.EventBatch>}.'''
+        ptcs = batch.columns(self.cfg_ana.particles)
+        px, py, pz, e = [ptcs.sum(values) for values in ptcs.p4()]
+        charges = ptcs.sum(ptcs['q'])
+        sumptcs = [Particle(0, int(round(charges[i])),
+                            TLorentzVector(px[i], py[i], pz[i], e[i]))
+                   for i in range(len(batch))]
+        batch.put(self.cfg_ana.output, sumptcs)
                 
@@ -47,7 +47,7 @@ class PapasSim(Analyzer):
         self.simname = '_'.join([self.instance_label,  self.cfg_ana.sim_particles])
 
     def process(self, event):
-        #random.seed(0xdeadbeef) #Useful to make results reproducable between loops and single runs
+        # see the random_seed parameter of the Config to get reproducible results
         event.simulator = self
         event.papasevent = PapasEvent(event.iEv)   
         papasevent = event.papasevent
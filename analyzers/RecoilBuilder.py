@@ -45,4 +45,13 @@ class RecoilBuilder(Analyzer):
             recoil_p4 -= ptc.p4()
         recoil = Recoil(0, 0, recoil_p4, 1)
         setattr(event, self.cfg_ana.output, recoil)
+
+    def process_batch(self, batch):
+        '''Same as L{process}, for a L{block of events<heppy.framework.batch.EventBatch>}.'''
+        sqrts = self.cfg_ana.sqrts
+        to_remove = batch.columns(self.cfg_ana.to_remove)
+        px, py, pz, e = [to_remove.sum(values) for values in to_remove.p4()]
+        recoils = [Recoil(0, 0, TLorentzVector(-px[i], -py[i], -pz[i], sqrts - e[i]), 1)
+                   for i in range(len(batch))]
+        batch.put(self.cfg_ana.output, recoils)
                 
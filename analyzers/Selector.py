@@ -2,6 +2,7 @@
 
 from heppy.framework.analyzer import Analyzer
 import collections
+import numpy
 
 class Selector(Analyzer):
     '''Select objects from the input_objects collection 
@@ -27,8 +28,20 @@ class Selector(Analyzer):
     @param filter_func: a function object.
     
     @param nmax: up to nmax objects verifying filter_func are kept (optional).
+
+    @param batch_filter_func: when the events are processed by blocks,
+        a function object taking the L{columns<heppy.framework.batch.Columns>}
+        of the input collection, and returning the array of booleans selecting
+        the objects (optional). The example above becomes::
+
+          batch_filter_func = lambda ptcs: (ptcs['e'] > 5.) & \
+              numpy.in1d(numpy.abs(ptcs['pdgid']), [11, 13])
+
+        If not set, filter_func is applied to the objects of all events.
     '''
 
+    pure_producer = True
+
     def process(self, event):
         '''event must contain
         
@@ -47,3 +60,25 @@ class Selector(Analyzer):
         if hasattr(self.cfg_ana, 'nmax'):
             output_collection = output_collection[:self.cfg_ana.nmax]
         setattr(event, self.cfg_ana.output, output_collection)
+
+    def process_batch(self, batch):
+        '''Same as L{process}, for a L{block of events<heppy.framework.batch.EventBatch>}.'''
+        input_collections = batch.get(self.cfg_ana.input_objects)
+        if any(isinstance(input_collection, collections.Mapping)
+               for input_collection in input_collections):
+            # dictionaries are selected event by event
+            for event in batch:
+                self.process(event)
+            return
+        objects = batch.columns(self.cfg_ana.input_objects)
+        batch_filter_func = getattr(self.cfg_ana, 'batch_filter_func', None)
+        if batch_filter_func:
+            mask = numpy.asarray(batch_filter_func(objects), dtype=bool)
+        else:
+            mask = numpy.array([bool(self.cfg_ana.filter_func(obj))
+                                for obj in objects.objects], dtype=bool)
+        output_collections = objects.split(mask)
+        if hasattr(self.cfg_ana, 'nmax'):
+            output_collections = [output_collection[:self.cfg_ana.nmax]
+                                  for output_collection in output_collections]
+        batch.put(self.cfg_ana.output, output_collections)
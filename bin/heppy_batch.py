@@ -417,7 +417,8 @@ def main(options, heppy_args, batchManager):
    batchManager.config = config
 
    batchManager.components = split( [comp for comp in config.components \
-                                     if len(comp.files)>0] )
+                                     if len(comp.files)>0],
+                                    config.events_class )
    listOfValues = range(0, len(batchManager.components))
    listOfNames = [comp.name for comp in batchManager.components]
 
@@ -5,16 +5,29 @@
 import sys
 import re
 import os
+import json
 import pprint
 
-def check_chunk(dirname):
+def check_chunk(dirname, verbose=True):
     if not os.path.isdir(dirname):
         return -1
     if dirname.find('_Chunk') == -1:
         return -1
+    timingName = '/'.join([dirname, 'timing.json'])
+    if os.path.isfile( timingName ):
+        # written by the looper once all outputs have been written
+        try:
+            with open(timingName) as timingFile:
+                json.load(timingFile)['events']
+            return 1
+        except (ValueError, KeyError):
+            if verbose:
+                print dirname, ': timing.json is corrupted'
+            return 0
     logName  = '/'.join([dirname, 'log.txt'])
     if not os.path.isfile( logName ):
-        print dirname, ': log.txt does not exist'
+        if verbose:
+            print dirname, ': log.txt does not exist'
         return 0
     logFile = open(logName)
     nEvents = -1
@@ -24,7 +37,8 @@ def check_chunk(dirname):
         except:
             pass
     if nEvents == -1:
-        print dirname, 'cannot find number of processed events'
+        if verbose:
+            print dirname, 'cannot find number of processed events'
         return 0
     else:
         return 1    
@@ -3,15 +3,33 @@
 # https://github.com/cbernet/heppy/blob/master/LICENSE
 
 import os
+import sys
 import pprint
 import dill
 import pickle
+import pstats
+import cProfile
+import marshal
 import shutil
+import json
+import time
+import collections
+import multiprocessing
 import yaml
 from heppy.bin.heppy_check import check_chunk
+from heppy.statistics.timing import TimingReport
+from heppy.statistics.summary import Summary
+from heppy.framework.eventindex import EventIndex
+from heppy.framework.products import ProductRegistry
 
 MAX_ARG_STRLEN = 131072
 
+# list of the chunks already merged in a destination directory
+MERGED_FNAME = 'merged_chunks.json'
+
+# integrity report of the tree merge
+REPORT_FNAME = 'hadd_report.txt'
+
 def haddPck(file, odir, idirs):
     '''add pck files in directories idirs to a directory outdir.
     All dirs in idirs must have the same subdirectory structure.
@@ -47,10 +65,99 @@ def haddPck(file, odir, idirs):
     txtFile.close()
     
 
+def haddPstats(file, odir, idirs):
+    '''add the cProfile statistics in directories idirs, e.g. the
+    profile.pstats files of the L{analyzer profilers<heppy.framework.profiler.AnalyzerProfiler>}.
+    The missing or empty statistics, e.g. of an analyzer which did not
+    process any event, are skipped.
+    '''
+    fnames = []
+    for dirpath in idirs:
+        fname = file.replace(idirs[0], dirpath)
+        if os.path.isfile(fname):
+            with open(fname, 'rb') as infile:
+                if marshal.load(infile):
+                    fnames.append(fname)
+    oFileName = file.replace( idirs[0], odir )
+    print 'output:', oFileName
+    if fnames:
+        pstats.Stats(*fnames).dump_stats(oFileName)
+    else:
+        cProfile.Profile().dump_stats(oFileName)
+
+
+def haddTiming(file, odir, idirs):
+    '''add the L{timing reports<heppy.statistics.timing.TimingReport>}
+    in directories idirs.'''
+    report = None
+    for dirpath in idirs:
+        other = TimingReport.load(file.replace(idirs[0], dirpath))
+        if report is None:
+            report = other
+        else:
+            report += other
+    oFileName = file.replace( idirs[0], odir )
+    print 'output:', oFileName
+    report.write(os.path.dirname(oFileName))
+
+
+def haddEventIndex(file, odir, idirs):
+    '''merge the L{event indices<heppy.framework.eventindex.EventIndex>}
+    in directories idirs.'''
+    index = EventIndex.load(file)
+    for dirpath in idirs[1:]:
+        index += EventIndex.load(file.replace(idirs[0], dirpath))
+    oFileName = file.replace( idirs[0], odir )
+    print 'output:', oFileName
+    index.write(oFileName)
+
+
+def haddProducts(file, odir, idirs):
+    '''merge the L{product registries<heppy.framework.products.ProductRegistry>}
+    in directories idirs.'''
+    registry = ProductRegistry.load(file)
+    for dirpath in idirs[1:]:
+        registry += ProductRegistry.load(file.replace(idirs[0], dirpath))
+    oFileName = file.replace( idirs[0], odir )
+    print 'output:', oFileName
+    registry.write(os.path.dirname(oFileName))
+
+
+def haddSummary(file, odir, idirs):
+    '''add the L{summaries<heppy.statistics.summary.Summary>}
+    of the counters and averages in directories idirs.'''
+    summary = Summary.load(file)
+    for dirpath in idirs[1:]:
+        summary += Summary.load(file.replace(idirs[0], dirpath))
+    oFileName = file.replace( idirs[0], odir )
+    print 'output:', oFileName
+    summary.write(os.path.dirname(oFileName))
+
+
 def hadd(fname, odir, idirs, appx=''):
+    '''merge the file fname of directory idirs[0] with the corresponding
+    files in the other directories of idirs, into odir.
+    Returns the status of the hadd command for root files, and 0 otherwise.
+    The other files are merged in python, which raises an exception on failure.
+    '''
     if fname.endswith('.pck'):
         haddPck(fname, odir, idirs)
         return
+    elif fname.endswith('.pstats'):
+        haddPstats(fname, odir, idirs)
+        return
+    elif os.path.basename(fname) == EventIndex.fname:
+        haddEventIndex(fname, odir, idirs)
+        return
+    elif os.path.basename(fname) == ProductRegistry.fname:
+        haddProducts(fname, odir, idirs)
+        return
+    elif os.path.basename(fname) == TimingReport.fname:
+        haddTiming(fname, odir, idirs)
+        return
+    elif os.path.basename(fname) == Summary.fname:
+        haddSummary(fname, odir, idirs)
+        return
     elif fname.endswith('.yaml') or fname.endswith('.py'):
         # just copy the yaml file to the output dir
         shutil.copy(fname, odir)
@@ -71,17 +178,17 @@ def hadd(fname, odir, idirs, appx=''):
     print cmd
     if len(cmd) > MAX_ARG_STRLEN:
         print 'Command longer than maximum unix string length; dividing into 2'
-        hadd(fname, odir, idirs[:len(idirs)/2], '1')
-        hadd(fname.replace(idirs[0], idirs[len(idirs)/2]), odir, idirs[len(idirs)/2:], '2')
+        status1 = hadd(fname, odir, idirs[:len(idirs)/2], '1')
+        status2 = hadd(fname.replace(idirs[0], idirs[len(idirs)/2]), odir, idirs[len(idirs)/2:], '2')
         haddCmd = ['hadd']
         haddCmd.append( fname.replace( idirs[0], odir ).replace('.root', appx+'.root') )
         haddCmd.append( fname.replace( idirs[0], odir ).replace('.root', '1.root') )
         haddCmd.append( fname.replace( idirs[0], odir ).replace('.root', '2.root') )
         cmd = ' '.join(haddCmd)
         print 'Running merge cmd:', cmd
-        os.system(cmd)
+        return os.system(cmd) or status1 or status2
     else:
-        os.system(cmd)
+        return os.system(cmd)
 ##    data = {
 ##        'processing' : {
 ##            'ngoodfiles' : ngoodfiles,
@@ -92,6 +199,8 @@ def hadd(fname, odir, idirs, appx=''):
 ##        yaml.dump(data)
         
 def haddRec(odir, idirs):
+    '''merge the directories idirs into odir.
+    Returns the list of the files of odir for which the hadd command failed.'''
     print 
     print 'adding' 
     pprint.pprint(idirs)
@@ -104,6 +213,7 @@ def haddRec(odir, idirs):
     if os.path.isdir(odir):
         shutil.rmtree(odir)
     os.mkdir(odir)
+    failed = []
 ##    try:
 ##        os.mkdir( odir )
 ##    except OSError:
@@ -121,11 +231,211 @@ def haddRec(odir, idirs):
             # os.system(cmd)
             os.mkdir(dir)
         for file in files:
-            hadd('/'.join([root, file]), odir, idirs)
+            fname = '/'.join([root, file])
+            if hadd(fname, odir, idirs):
+                failed.append(fname.replace(idirs[0], odir))
+    return failed
+
+def haddRootAppend(file, odir, chunk):
+    '''append the root file in directory chunk to the
+    corresponding root file in odir.
+    Raises RuntimeError if the hadd command fails.'''
+    cmd = ' '.join(['hadd', '-a', file.replace(chunk, odir), file])
+    print cmd
+    if os.system(cmd):
+        raise RuntimeError('failed: ' + cmd)
+
+
+def haddChunk(chunk, odir):
+    '''add the outputs of directory chunk to odir,
+    which contains the outputs already merged, if any.
+    The timing report is merged last, as for the chunks.
+    Raises RuntimeError if a hadd command fails.'''
+    if not os.path.isdir(odir):
+        failed = haddRec(odir, [chunk])
+        if failed:
+            raise RuntimeError('hadd failed for {fnames}'.format(fnames=failed))
+        return
+    timing_files = []
+    for root, dirs, files in os.walk(chunk):
+        for dirname in dirs:
+            dirname = '/'.join([root, dirname]).replace(chunk, odir)
+            if not os.path.isdir(dirname):
+                os.mkdir(dirname)
+        for fname in files:
+            fname = '/'.join([root, fname])
+            ofname = fname.replace(chunk, odir)
+            if os.path.basename(fname) == TimingReport.fname:
+                timing_files.append(ofname)
+            elif not os.path.isfile(ofname):
+                if hadd(fname, odir, [chunk]):
+                    raise RuntimeError('hadd failed for ' + ofname)
+            elif fname.endswith('.root'):
+                haddRootAppend(fname, odir, chunk)
+            elif not fname.endswith('.yaml') and not fname.endswith('.py'):
+                # the merged file is read before being overwritten
+                hadd(ofname, odir, [odir, chunk])
+    for ofname in timing_files:
+        if os.path.isfile(ofname):
+            hadd(ofname, odir, [odir, chunk])
+        else:
+            hadd(ofname.replace(odir, chunk), odir, [chunk])
+
+
+def mergeable(fname):
+    '''True if the file is merged by L{hadd}.'''
+    return fname.endswith('.pck') or fname.endswith('.pstats') or \
+        fname.endswith('.root') or \
+        os.path.basename(fname) in [EventIndex.fname,
+                                    ProductRegistry.fname,
+                                    Summary.fname,
+                                    TimingReport.fname]
+
+
+def relativeFiles(dirname):
+    '''set of the paths of the files merged by L{hadd} in dirname,
+    relative to dirname.'''
+    fnames = set()
+    for root, dirs, files in os.walk(dirname):
+        for fname in files:
+            if mergeable(fname):
+                fnames.add(os.path.relpath('/'.join([root, fname]), dirname))
+    return fnames
+
+
+def checkChunks(idirs):
+    '''check that the directories idirs contain the same files to be merged.
+
+    The reference is the set of files found in most directories.
+    Returns the list of the directories matching the reference,
+    and the list of the problems found in the other directories,
+    which should not be merged.
+    '''
+    fsets = [frozenset(relativeFiles(dirname)) for dirname in idirs]
+    counts = collections.Counter(fsets)
+    reference = max(fsets, key=lambda fset: counts[fset])
+    good = []
+    problems = []
+    for dirname, fset in zip(idirs, fsets):
+        if fset == reference:
+            good.append(dirname)
+            continue
+        for fname in sorted(reference - fset):
+            problems.append('{dirname}: missing {fname}'.format(
+                dirname=dirname, fname=fname))
+        for fname in sorted(fset - reference):
+            problems.append('{dirname}: unexpected {fname}'.format(
+                dirname=dirname, fname=fname))
+        problems.append('{dirname}: excluded from the merge'.format(
+            dirname=dirname))
+    return good, problems
 
-def haddChunks(idir, removeDestDir, cleanUp=False, base_odir='./'):
+
+def haddGroup(args):
+    '''merge the directories idirs into odir, in a worker process.
+    The directories must contain the same files, see L{checkChunks}.
+
+    Returns the list of the failed merges.
+    '''
+    odir, idirs = args
+    try:
+        failed = haddRec(odir, idirs)
+    except Exception as err:
+        return ['{odir}: merge failed, {err}'.format(
+            odir=odir, err=repr(err))]
+    failures = ['{fname}: hadd failed'.format(fname=fname)
+                for fname in failed]
+    merged = relativeFiles(odir)
+    for fname in sorted(relativeFiles(idirs[0]) - merged):
+        failures.append('{odir}: {fname} not merged'.format(
+            odir=odir, fname=fname))
+    return failures
+
+
+def haddTree(odir, idirs, njobs, fanin=2):
+    '''merge the directories idirs into odir by tree reduction.
+
+    The directories are first checked with L{checkChunks}, and
+    those missing some files are left out. The other directories are
+    merged by groups of fanin directories,
+    in parallel in njobs processes. The outputs of a round are merged
+    again in the next round, until a single directory is left.
+    The merging time thus increases with the logarithm of the number
+    of directories, and the hadd command lines stay short.
+
+    An integrity report is printed and written to odir/hadd_report.txt.
+    Returns the list of the merged directories.
+    Raises RuntimeError if a merge failed.
+    '''
+    start = time.time()
+    workdir = odir.rstrip('/') + '_rounds'
+    if os.path.isdir(workdir):
+        shutil.rmtree(workdir)
+    os.makedirs(workdir)
+    good, problems = checkChunks(idirs)
+    failures = []
+    level = list(good)
+    nrounds = 0
+    pool = multiprocessing.Pool(njobs)
+    try:
+        while len(level) > 1 and not failures:
+            rounddir = '/'.join([workdir, 'round{}'.format(nrounds)])
+            os.mkdir(rounddir)
+            groups = [level[i:i+fanin] for i in range(0, len(level), fanin)]
+            tasks = [('/'.join([rounddir, 'group{}'.format(i)]), group)
+                     for i, group in enumerate(groups) if len(group) > 1]
+            for group_failures in pool.map(haddGroup, tasks):
+                failures.extend(group_failures)
+            outputs = iter(task[0] for task in tasks)
+            level = [group[0] if len(group) == 1 else next(outputs)
+                     for group in groups]
+            if nrounds > 0:
+                # the previous round is not needed anymore
+                previous = '/'.join([workdir, 'round{}'.format(nrounds-1)])
+                for dirname in os.listdir(previous):
+                    dirname = '/'.join([previous, dirname])
+                    if dirname not in level:
+                        shutil.rmtree(dirname)
+            nrounds += 1
+    finally:
+        pool.close()
+        pool.join()
+    if os.path.isdir(odir):
+        shutil.rmtree(odir)
+    if failures:
+        os.mkdir(odir)
+    elif level[0] in idirs:
+        failures = ['{fname}: hadd failed'.format(fname=fname)
+                    for fname in haddRec(odir, level)]
+    else:
+        shutil.move(level[0], odir)
+    if not failures:
+        shutil.rmtree(workdir)
+    report = [
+        'inputs: {n}'.format(n=len(idirs)),
+        'merged: {n}'.format(n=len(good)),
+        'rounds: {n}'.format(n=nrounds),
+        'processes: {n}'.format(n=njobs),
+        'time: {t:.1f} s'.format(t=time.time() - start),
+        'problems: {n}'.format(n=len(problems)),
+        'failures: {n}'.format(n=len(failures))
+    ]
+    report.extend(problems)
+    report.extend(failures)
+    report = '\n'.join(report)
+    print report
+    with open('/'.join([odir, REPORT_FNAME]), 'w') as reportfile:
+        reportfile.write(report)
+        reportfile.write('\n')
+    if failures:
+        raise RuntimeError('merge of {odir} failed, see {report}, partial outputs in {workdir}'.format(
+            odir=odir, report=REPORT_FNAME, workdir=workdir))
+    return good
+
+
+def findChunks(idir):
+    '''returns a dictionary component -> list of chunk directories in idir.'''
     chunks = {}
-    nchunks = {}
     for path in sorted(os.listdir(idir)):
         filepath = '/'.join( [idir, path] )
         if os.path.isdir(filepath):
@@ -135,7 +445,122 @@ def haddChunks(idir, removeDestDir, cleanUp=False, base_odir='./'):
             except ValueError:
                 # ok, not a chunk
                 continue
-            nchunks[prefix] = nchunks.setdefault(prefix, 0) + 1
+            chunks.setdefault( prefix, list() ).append(filepath)
+    return chunks
+
+
+def mergedChunks(odir):
+    '''names of the chunks already merged in odir.'''
+    fname = '/'.join([odir, MERGED_FNAME])
+    if not os.path.isfile(fname):
+        return []
+    with open(fname) as infile:
+        return json.load(infile)
+
+
+def writeProcessing(odir, merged, nchunks):
+    '''write the list of merged chunks, and the processing.yaml summary.'''
+    with open('/'.join([odir, MERGED_FNAME]), 'w') as out:
+        json.dump(merged, out, indent=1)
+    data = {
+        'processing' : {
+            'ngoodfiles' : len(merged),
+            'nfiles' : nchunks
+        }   
+    }   
+    with open('/'.join([odir, 'processing.yaml']), 'w') as outyaml:
+        yaml.dump(data, outyaml, default_flow_style=False)        
+
+
+def recoverMerge(odir):
+    '''clean up after an interruption of L{addChunk}.
+
+    odir_merging is the copy of odir in which a chunk is added, and
+    odir_previous is odir before it is replaced by this copy.
+    The copy is complete once odir has been moved to odir_previous.
+    '''
+    tmpdir = odir.rstrip('/') + '_merging'
+    previous = odir.rstrip('/') + '_previous'
+    if os.path.isdir(previous):
+        if not os.path.isdir(odir):
+            os.rename(tmpdir, odir)
+        shutil.rmtree(previous)
+    if os.path.isdir(tmpdir):
+        shutil.rmtree(tmpdir)
+
+
+def addChunk(chunk, odir, merged, nchunks):
+    '''add the outputs of directory chunk to odir with L{haddChunk},
+    and the name of the chunk to the list merged.
+
+    The chunk is added to a copy of odir, which then replaces odir,
+    so that an interruption leaves odir unchanged or with the chunk fully added,
+    see L{recoverMerge}.
+    '''
+    recoverMerge(odir)
+    tmpdir = odir.rstrip('/') + '_merging'
+    previous = odir.rstrip('/') + '_previous'
+    if os.path.isdir(odir):
+        shutil.copytree(odir, tmpdir)
+    haddChunk(chunk, tmpdir)
+    writeProcessing(tmpdir, merged + [os.path.basename(chunk)], nchunks)
+    if os.path.isdir(odir):
+        os.rename(odir, previous)
+    os.rename(tmpdir, odir)
+    if os.path.isdir(previous):
+        shutil.rmtree(previous)
+    merged.append(os.path.basename(chunk))
+
+
+def haddNewChunks(idir, base_odir='./', verbose=True):
+    '''add the good chunks in idir that are not merged yet
+    to the destination directories, one at a time.
+
+    Returns the number of chunks which are not good yet.
+    '''
+    npending = 0
+    for comp, cchunks in findChunks(idir).iteritems():
+        odir = '/'.join( [base_odir, comp] )
+        recoverMerge(odir)
+        merged = mergedChunks(odir)
+        for chunk in cchunks:
+            name = os.path.basename(chunk)
+            if name in merged:
+                continue
+            # only chunks with a timing report,
+            # written once all other outputs are written
+            if not os.path.isfile('/'.join([chunk, TimingReport.fname])) or \
+               check_chunk(chunk, verbose) != 1:
+                npending += 1
+                continue
+            print 'adding', chunk, 'to', odir
+            addChunk(chunk, odir, merged, len(cchunks))
+    return npending
+
+
+def watchChunks(idir, base_odir='./', period=30.):
+    '''merge the chunks in idir as soon as they are good,
+    until all chunks are merged.
+
+    The merging can be interrupted, e.g. with Ctrl-C, and restarted later:
+    the chunks already merged are listed in merged_chunks.json
+    in each destination directory, and each chunk is added
+    to a copy of the destination directory, see L{addChunk}.
+    '''
+    while True:
+        npending = haddNewChunks(idir, base_odir, verbose=False)
+        if npending == 0:
+            break
+        print time.strftime('%H:%M:%S'), npending, 'chunks pending'
+        time.sleep(period)
+
+
+def haddChunks(idir, removeDestDir, cleanUp=False, base_odir='./', njobs=1):
+    chunks = {}
+    nchunks = {}
+    for prefix, cchunks in findChunks(idir).iteritems():
+        nchunks[prefix] = len(cchunks)
+        for filepath in cchunks:
             code = check_chunk(filepath)
             if code == 1:
                 chunks.setdefault( prefix, list() ).append(filepath)
@@ -149,15 +574,22 @@ def haddChunks(idir, removeDestDir, cleanUp=False, base_odir='./'):
         if removeDestDir:
             if os.path.isdir( odir ):
                 shutil.rmtree(odir)
-        haddRec(odir, cchunks)
-        data = {
-            'processing' : {
-                'ngoodfiles' : len(cchunks),
-                'nfiles' : nchunks[comp]
-            }   
-        }   
-        with open('/'.join([odir, 'processing.yaml']), 'w') as outyaml:
-            yaml.dump(data, outyaml, default_flow_style=False)        
+        recoverMerge(odir)
+        merged = mergedChunks(odir)
+        if merged:
+            # partly merged with --watch, adding the other chunks
+            for chunk in cchunks:
+                if os.path.basename(chunk) not in merged:
+                    addChunk(chunk, odir, merged, nchunks[comp])
+        else:
+            if njobs > 1:
+                cchunks = haddTree(odir, cchunks, njobs)
+            else:
+                failed = haddRec(odir, cchunks)
+                if failed:
+                    raise RuntimeError('hadd failed for {fnames}'.format(fnames=failed))
+            merged = [os.path.basename(chunk) for chunk in cchunks]
+        writeProcessing(odir, merged, nchunks[comp])
     if cleanUp:
         chunkDir = 'Chunks'
         if os.path.isdir('Chunks'):
@@ -192,6 +624,12 @@ if __name__ == '__main__':
     parser.add_option("-c","--clean", dest="clean",
                       default=False,action="store_true",
                       help="move chunks to Chunks/ after processing.")
+    parser.add_option("-w","--watch", dest="watch",
+                      default=None,type="float",
+                      help="merge the chunks as soon as they are done, checking every given number of seconds, until all chunks are merged.")
+    parser.add_option("-j","--jobs", dest="jobs",
+                      default=1,type="int",
+                      help="merge the chunks pairwise in rounds, with this number of processes.")
 
     (options,args) = parser.parse_args()
 
@@ -205,5 +643,7 @@ if __name__ == '__main__':
     else:
         odir = dirname
         
-    haddChunks(dirname, options.remove, options.clean, odir)
+    if options.watch:
+        watchChunks(dirname, odir, options.watch)
+    haddChunks(dirname, options.remove, options.clean, odir, options.jobs)
 
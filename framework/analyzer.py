@@ -28,6 +28,17 @@ class Analyzer(object):
       
     Each event is processed by a L{sequence<config.Sequence>} of analyzers in well-defined order.
     The information added to the event by a given analyzer can be used by subsequent analyzers. 
+
+    An analyzer may also define a process_batch method, which processes
+    a L{block of events<batch.EventBatch>} at once, e.g. with numpy array
+    operations. This method is used instead of L{process} when the
+    events are processed by blocks, see the batch_size parameter of the
+    L{Config<config.Config>}. Like L{process}, it returns None if all events
+    are selected, or the list of the results for each event::
+
+      def process_batch(self, batch):
+          energies = batch.columns('jets')['e']
+          ...
     
     Important attributes:
     
@@ -42,6 +53,10 @@ class Analyzer(object):
     @param logger: logger specific to this analyzer. 
     """
 
+    # set to True in analyzers that only accept or reject events,
+    # see L{scheduler<heppy.framework.scheduler>}
+    is_filter = False
+
     def __init__(self, cfg_ana, cfg_comp, looperName ):
         """Create an analyzer.
         
@@ -128,10 +143,18 @@ class Analyzer(object):
         
           super(YourAnalyzerClass, self).write(setup) 
         
+        The counters and averages are added to the summary of the looper,
+        see L{Summary<heppy.statistics.summary.Summary>}, or written to pickle
+        files in the directory of the analyzer if the summary is not used.
+
         Automatically called by L{Looper<looper.Looper>}, for all analyzers.
         """
-        self.counters.write( self.dirName )
-        self.averages.write( self.dirName )
+        summary = getattr(setup, 'summary', None)
+        if summary is not None:
+            summary.add(self.name, self.counters.counters, self.averages)
+        if summary is None or getattr(setup.config, 'pickle_statistics', False):
+            self.counters.write( self.dirName )
+            self.averages.write( self.dirName )
         if len(self.counters):
             self.logger.info(str(self.counters))
         if len(self.averages):
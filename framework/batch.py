@@ -0,0 +1,148 @@
+'''Blocks of events, processed at once by the analyzers with a process_batch method.'''
+
+import numpy
+
+
+class Columns(object):
+    '''Columnar view of a collection of objects in a block of events.
+
+    The objects of all events are concatenated,
+    and their attributes are returned as numpy arrays::
+
+      ptcs = batch.columns('rec_particles')
+      energies = ptcs['e']          # obj.e() for all objects
+      selected = energies > 5.
+      per_event = ptcs.split(selected)
+
+    The arrays are computed once, when first requested.
+    '''
+
+    def __init__(self, collections):
+        self.counts = numpy.array([len(coll) for coll in collections],
+                                  dtype=numpy.int64)
+        self.offsets = numpy.concatenate([[0], numpy.cumsum(self.counts)])
+        self.objects = [obj for coll in collections for obj in coll]
+        # index of the event of each object
+        self.events = numpy.repeat(numpy.arange(len(self.counts)), self.counts)
+        self._arrays = dict()
+
+    def __len__(self):
+        return len(self.objects)
+
+    def __getitem__(self, attribute):
+        '''Returns the array of the attribute for all objects.
+        If the attribute is a method, it is called.'''
+        array = self._arrays.get(attribute)
+        if array is None:
+            values = [getattr(obj, attribute) for obj in self.objects]
+            if values and callable(values[0]):
+                values = [value() for value in values]
+            array = numpy.array(values, dtype=float)
+            self._arrays[attribute] = array
+        return array
+
+    def p4(self):
+        '''Returns the arrays px, py, pz, e of the objects, read from obj.p4().'''
+        if 'px' not in self._arrays:
+            p4s = numpy.array([[p4.Px(), p4.Py(), p4.Pz(), p4.E()]
+                               for p4 in (obj.p4() for obj in self.objects)],
+                              dtype=float).reshape(-1, 4)
+            for i, name in enumerate(['px', 'py', 'pz', 'e']):
+                self._arrays[name] = p4s[:, i]
+        return [self._arrays[name] for name in ['px', 'py', 'pz', 'e']]
+
+    def sum(self, values):
+        '''Returns the sums of values, an array of one value per object,
+        for each event.'''
+        return numpy.bincount(self.events, weights=values,
+                              minlength=len(self.counts))
+
+    def split(self, mask):
+        '''Returns, for each event, the list of objects selected by mask,
+        an array of booleans of one value per object.'''
+        selected = numpy.flatnonzero(mask)
+        bounds = numpy.searchsorted(selected, self.offsets)
+        return [[self.objects[i] for i in selected[start:stop]]
+                for start, stop in zip(bounds[:-1], bounds[1:])]
+
+
+class EventBatch(object):
+    '''Block of events, passed by the L{Looper<heppy.framework.looper.Looper>}
+    to the process_batch method of the analyzers.
+
+    The events of the block are the L{events<heppy.framework.event.Event>}
+    selected by the previous analyzers. The products of all events can be
+    read and put at once::
+
+      jets = batch.get('jets')            # list of the jets of each event
+      batch.put('njets', [len(jets_ev) for jets_ev in jets])
+      energies = batch.columns('jets')['e']
+    '''
+
+    def __init__(self, events):
+        self.events = events
+        self._columns = dict()
+
+    def __len__(self):
+        return len(self.events)
+
+    def __iter__(self):
+        return iter(self.events)
+
+    def get(self, name):
+        '''Returns the list of the values of product name in each event.'''
+        return [event.get(name) for event in self.events]
+
+    def put(self, name, values):
+        '''Puts the values, one per event, as product name in each event.'''
+        if len(values) != len(self.events):
+            raise ValueError('{n} values for {nev} events'.format(
+                n=len(values), nev=len(self.events)))
+        for event, value in zip(self.events, values):
+            event.put(name, value)
+        self._columns.pop(name, None)
+
+    def columns(self, name):
+        '''Returns the L{Columns} of the collection name in the events.'''
+        columns = self._columns.get(name)
+        if columns is None:
+            columns = Columns(self.get(name))
+            self._columns[name] = columns
+        return columns
+
+
+class ReleasedInput(object):
+    '''Placeholder for the input of an event processed in a block,
+    once the analyzers reading the input have processed the event.
+
+    Most events backends, e.g. L{Chain<heppy.framework.chain.Chain>},
+    return the same object for all entries, positioned on the last entry read.
+    The input of the events of a block is therefore only available to the
+    analyzers placed before the first analyzer with a process_batch method,
+    which process each event as soon as it is read.
+    Backends returning a new object for each entry can declare it
+    with a class attribute independent_entries = True.
+    '''
+
+    def __init__(self, iEv):
+        self.iEv = iEv
+
+    def _unavailable(self):
+        raise RuntimeError(
+            'input of event {iEv} read after an analyzer with a process_batch method. '
+            'Move the analyzers reading event.input before it.'.format(iEv=self.iEv)
+        )
+
+    def __getattr__(self, attr):
+        if attr.startswith('__'):
+            raise AttributeError(attr)
+        self._unavailable()
+
+    def __getitem__(self, index):
+        self._unavailable()
+
+    def __iter__(self):
+        self._unavailable()
+
+    def __len__(self):
+        self._unavailable()
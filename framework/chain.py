@@ -4,7 +4,7 @@
 import glob
 import os
 import pprint
-from ROOT import TChain, TFile, TTree, gSystem
+from heppy.framework.lazyroot import ROOT
 
 #TODO should use eostools
 def is_pfn(fn):
@@ -59,7 +59,7 @@ class Chain( object ):
                 raise ValueError(err)
         if tree_name is None:
             tree_name = self._guessTreeName(input_filenames)
-        self.chain = TChain(tree_name)
+        self.chain = ROOT.TChain(tree_name)
         for file in self.files:
             self.chain.Add(file)
 
@@ -72,10 +72,10 @@ class Chain( object ):
         """
         names = []
         for fnam in self.files:
-            rfile = TFile(fnam)
+            rfile = ROOT.TFile(fnam)
             for key in rfile.GetListOfKeys():
                 obj = rfile.Get(key.GetName())
-                if type(obj) is TTree:
+                if type(obj) is ROOT.TTree:
                     names.append( key.GetName() )
         thename = set(names)
         if len(thename)==1:
@@ -4,7 +4,7 @@
 import glob
 import os
 import pprint
-from ROOT import TChain, TFile, TTree, gSystem
+from heppy.framework.lazyroot import ROOT
 
 class ChainNoIndexing( object ):
     """Wrapper to TChain, with a python iterable interface.
@@ -43,7 +43,7 @@ class ChainNoIndexing( object ):
                 raise ValueError(err)
         if tree_name is None:
             tree_name = self._guessTreeName(input)
-        self.chain = TChain(tree_name)
+        self.chain = ROOT.TChain(tree_name)
         for file in self.files:
             self.chain.Add(file)
 
@@ -56,10 +56,10 @@ class ChainNoIndexing( object ):
         """
         names = []
         for fnam in self.files:
-            rfile = TFile(fnam)
+            rfile = ROOT.TFile(fnam)
             for key in rfile.GetListOfKeys():
                 obj = rfile.Get(key.GetName())
-                if type(obj) is TTree:
+                if type(obj) is ROOT.TTree:
                     names.append( key.GetName() )
         thename = set(names)
         if len(thename)==1:
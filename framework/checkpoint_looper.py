@@ -0,0 +1,336 @@
+'''Processing of a component in segments, with checkpoints allowing to resume.'''
+
+import os
+import sys
+import json
+import shutil
+import logging
+import tempfile
+import timeit
+
+from heppy.framework.looper import Looper
+from heppy.framework.memory import rss
+from heppy.framework.parallel_looper import event_range, plain_config, merge_outputs
+from heppy.statistics.counter import Counter
+import heppy.framework.services.shared as shared
+
+
+class SegmentStop(object):
+    '''Stop flag of the looper processing a segment.
+
+    Used as the stopFlag of a L{Looper<heppy.framework.looper.Looper>},
+    which checks its value after each event. The value is 1:
+     - when the maximum duration of the segment is reached.
+       In this case, expired is set to True.
+     - when a graceful stop was requested, i.e. when the looper set the value
+       upon reception of SIGUSR2, or when the stop flag of the whole job is set.
+       In this case, interrupted is set to True.
+     - when the resident set size of the process exceeds maxRSS.
+       In this case, interrupted and outOfMemory are set to True.
+    '''
+
+    # number of events between two checks of the resident set size
+    rss_period = 100
+
+    def __init__(self, maxTime=None, stopFlag=None, maxRSS=None):
+        '''
+        @param maxTime: maximum duration of the segment in seconds, or None.
+        @param stopFlag: stop flag of the whole job, e.g. a multiprocessing.Value.
+        @param maxRSS: maximum resident set size in MB, or None.
+        '''
+        self.maxTime = maxTime
+        self.stopFlag = stopFlag
+        self.maxRSS = maxRSS
+        self.start = timeit.default_timer()
+        self.expired = False
+        self.interrupted = False
+        self.outOfMemory = False
+        self._ncalls = 0
+
+    def _get_value(self):
+        if self.stopFlag and self.stopFlag.value:
+            self.interrupted = True
+        if self.maxRSS:
+            if self._ncalls % self.rss_period == 0 and rss() > self.maxRSS:
+                self.outOfMemory = True
+                self.interrupted = True
+            self._ncalls += 1
+        if self.interrupted:
+            return 1
+        if self.maxTime and timeit.default_timer() - self.start >= self.maxTime:
+            self.expired = True
+            return 1
+        return 0
+
+    def _set_value(self, value):
+        self.interrupted = bool(value)
+        if self.stopFlag is not None:
+            self.stopFlag.value = value
+
+    value = property(_get_value, _set_value)
+
+
+class CheckpointLooper(Looper):
+    '''Processes a component in consecutive segments of events,
+    saving a checkpoint after each segment.
+
+    Each segment is processed by a L{Looper<heppy.framework.looper.Looper>}
+    in its own directory, and ends after checkpointEvents events,
+    after checkpointTime seconds, or when a graceful stop is requested
+    with SIGUSR2 or with the stopFlag.
+    The outputs of the segment are then written, and the segment is recorded
+    in the checkpoint file, checkpoints/checkpoint.json.
+
+    If the job is stopped or killed, it can be resumed with resume=True.
+    The processing then restarts after the last recorded segment.
+
+    When all events have been processed, L{write} merges the outputs
+    of the segments in event order, like for the L{ParallelLooper<heppy.framework.parallel_looper.ParallelLooper>}.
+    The merged outputs are identical to the ones of a single looper
+    if the outputs of the analyzers can be merged, e.g. trees, counters
+    and averages.
+
+    With an event index, see the event_index attribute of the
+    L{Component<heppy.framework.config.Component>}, the segments are
+    ranges of checkpointEvents entries, in which only the selected
+    entries are processed.
+
+    Example::
+
+      loop = CheckpointLooper('Out', config,
+                              checkpointEvents=10000,
+                              checkpointTime=600,
+                              resume=True)
+      loop.loop()
+      loop.write()
+    '''
+
+    def __init__(self, name,
+                 config,
+                 nEvents=None,
+                 firstEvent=0,
+                 nPrint=0,
+                 timeReport=True,
+                 quiet=False,
+                 memCheckFromEvent=-1,
+                 stopFlag=None,
+                 prefetch=0,
+                 checkpointEvents=None,
+                 checkpointTime=None,
+                 resume=False,
+                 maxRSS=None):
+        '''Create the checkpoint looper.
+
+        The parameters are the same as for the L{Looper<heppy.framework.looper.Looper>},
+        except for:
+
+        @param checkpointEvents: maximum number of events per segment.
+        @param checkpointTime: maximum duration of a segment, in seconds.
+        @param resume: if True and if a checkpoint exists in the output directory,
+          resume processing from this checkpoint.
+        @param maxRSS: maximum resident set size of the process in MB.
+          When it is exceeded, the current segment is ended, and the processing
+          stops after saving the checkpoint. It can then be resumed in a new process.
+        '''
+        self.config = config
+        self.cfg_comp = config.components[0]
+        if len(self.cfg_comp.files)==0:
+            errmsg = 'please provide at least an input file in the files attribute of this component\n' + str(self.cfg_comp)
+            raise ValueError( errmsg )
+        if getattr(config, 'preprocessor', None) is not None:
+            raise ValueError('the checkpoint looper cannot be used with a preprocessor')
+        fineSplit = getattr(self.cfg_comp, 'fineSplit', None)
+        if fineSplit and fineSplit[1] > 1:
+            raise ValueError('the checkpoint looper cannot be used on fine-split components')
+        checkpointFile = '/'.join([name, 'checkpoints', 'checkpoint.json'])
+        if resume and os.path.isfile(checkpointFile):
+            self.name = name
+        else:
+            resume = False
+            self.name = self._prepareOutput(name)
+        self.outDir = self.name
+        self.logger = logging.getLogger(self.name)
+        self.logger.addHandler(logging.FileHandler('/'.join([self.name,
+                                                             'log.txt'])))
+        self.logger.propagate = False
+        if not quiet:
+            self.logger.addHandler(logging.StreamHandler(sys.stdout))
+        self.nPrint = int(nPrint)
+        self.timeReport = timeReport
+        self.quiet = quiet
+        self.memCheckFromEvent = memCheckFromEvent
+        self.stopFlag = stopFlag
+        self.prefetch = prefetch
+        self.checkpointEvents = checkpointEvents
+        self.checkpointTime = checkpointTime
+        self.maxRSS = maxRSS
+        self.outOfMemory = False
+        self.checkpointDir = '/'.join([self.outDir, 'checkpoints'])
+        self.checkpointFile = '/'.join([self.checkpointDir, 'checkpoint.json'])
+        self.firstEvent, self.nEvents = event_range(config, firstEvent, nEvents)
+        self.segments = []
+        self.completed = False
+        if resume:
+            self._load_checkpoint()
+        else:
+            os.mkdir(self.checkpointDir)
+        self.nEvProcessed = sum(seg['nevents'] for seg in self.segments)
+        # number of entries read, larger than the number of events processed
+        # if only the entries selected by an event index are processed
+        self.nEntries = sum(seg.get('entries', seg['nevents']) for seg in self.segments)
+        self.analyzer_counter = Counter('analyzers')
+        for seg in self.segments:
+            self._add_counts(seg['counter'])
+
+    def _load_checkpoint(self):
+        with open(self.checkpointFile) as infile:
+            checkpoint = json.load(infile)
+        if (checkpoint['first'], checkpoint['nevents']) != (self.firstEvent, self.nEvents):
+            raise ValueError('cannot resume from {fname}: it was made for events {first} to {last}'.format(
+                fname=self.checkpointFile,
+                first=checkpoint['first'],
+                last=checkpoint['first'] + checkpoint['nevents'] - 1))
+        self.segments = checkpoint['segments']
+        self.completed = checkpoint['completed']
+        # removing the segment being processed when the job was killed
+        recorded = set(seg['name'] for seg in self.segments)
+        for dirname in os.listdir(self.checkpointDir):
+            path = '/'.join([self.checkpointDir, dirname])
+            if os.path.isdir(path) and dirname not in recorded:
+                shutil.rmtree(path)
+        self.logger.info('resuming from {fname}: {nseg} segments, {nev} events processed'.format(
+            fname=self.checkpointFile,
+            nseg=len(self.segments),
+            nev=sum(seg['nevents'] for seg in self.segments)))
+
+    def _save_checkpoint(self):
+        '''Write the checkpoint file atomically.'''
+        checkpoint = dict(first=self.firstEvent,
+                          nevents=self.nEvents,
+                          segments=self.segments,
+                          completed=self.completed)
+        fd, tmpfname = tempfile.mkstemp(dir=self.checkpointDir)
+        with os.fdopen(fd, 'w') as out:
+            json.dump(checkpoint, out, indent=1)
+        os.rename(tmpfname, self.checkpointFile)
+
+    def _add_counts(self, counts):
+        for level, count in counts:
+            if level not in self.analyzer_counter.dico:
+                self.analyzer_counter.register(level)
+            self.analyzer_counter.inc(level, count)
+
+    def segment_dir(self, iseg):
+        '''Output directory of a given segment.'''
+        return '/'.join([self.checkpointDir, 'Segment{i}'.format(i=iseg)])
+
+    def loop(self):
+        '''Process the segments until all events are processed,
+        or until a graceful stop is requested.'''
+        self.logger.info(
+            'starting loop at event {firstEvent} '\
+            'to process {nEvents} events, '\
+            'with checkpoints every {nev} events or {time} s.'.format(
+                firstEvent=self.firstEvent + self.nEntries,
+                nEvents=self.nEvents - self.nEntries,
+                nev=self.checkpointEvents,
+                time=self.checkpointTime))
+        self.logger.info( str( self.cfg_comp ) )
+        config = plain_config(self.config)
+        # the shared services are built once for all segments
+        shared.build(self.config.services, self.cfg_comp, self.outDir)
+        try:
+            while not self.completed:
+                if self.stopFlag and self.stopFlag.value:
+                    break
+                remaining = self.nEvents - self.nEntries
+                if remaining <= 0:
+                    self.completed = True
+                    self._save_checkpoint()
+                    break
+                nevents = remaining
+                if self.checkpointEvents:
+                    nevents = min(nevents, int(self.checkpointEvents))
+                stop = SegmentStop(self.checkpointTime, self.stopFlag, self.maxRSS)
+                iseg = len(self.segments)
+                loop = Looper(self.segment_dir(iseg),
+                              config,
+                              nEvents=nevents,
+                              firstEvent=self.firstEvent + self.nEntries,
+                              nPrint=self.nPrint,
+                              timeReport=self.timeReport,
+                              quiet=True,
+                              memCheckFromEvent=self.memCheckFromEvent,
+                              stopFlag=stop,
+                              prefetch=self.prefetch)
+                loop.loop()
+                loop.write()
+                if stop.expired or stop.interrupted or loop.userStop:
+                    nentries = loop.nextEntry - loop.firstEvent
+                else:
+                    nentries = nevents
+                self.segments.append(dict(name=os.path.basename(loop.name),
+                                          first=loop.firstEvent,
+                                          entries=nentries,
+                                          nevents=loop.nEvProcessed,
+                                          counter=list(loop.analyzer_counter)))
+                self.nEvProcessed += loop.nEvProcessed
+                self.nEntries += nentries
+                self._add_counts(loop.analyzer_counter)
+                if loop.userStop:
+                    # stopped by an analyzer, see UserStop
+                    self.completed = True
+                elif self.nEntries == self.nEvents:
+                    self.completed = True
+                self._save_checkpoint()
+                self.logger.info('checkpoint: {nev} events processed'.format(
+                    nev=self.nEvProcessed))
+                if stop.outOfMemory:
+                    self.outOfMemory = True
+                    self.logger.warning('resident set size above {maxrss} MB, stopping after the checkpoint'.format(
+                        maxrss=self.maxRSS))
+                if stop.interrupted:
+                    break
+        finally:
+            shared.release()
+        self._write_log()
+
+    def _write_log(self):
+        warning = self.logger.warning
+        warning('')
+        warning( self.cfg_comp )
+        warning('')
+        for seg in self.segments:
+            warning('{name}: entries {first} to {last}, {nev} events processed'.format(
+                name=seg['name'],
+                first=seg['first'],
+                last=seg['first']+seg.get('entries', seg['nevents'])-1,
+                nev=seg['nevents']
+            ))
+        warning('')
+        warning( self.analyzer_counter )
+        if not self.completed:
+            warning('stopped after {nev} events, resume from the checkpoint in {dirname}'.format(
+                nev=self.nEvProcessed,
+                dirname=self.checkpointDir))
+            return
+        # see Looper._write_log
+        logfile = open('/'.join([self.name,'log.txt']),'a')
+        logfile.write('number of events processed: {nEv}\n'.format(
+            nEv=self.nEvProcessed)
+        )
+        logfile.close()
+
+    def process(self, iEv):
+        raise TypeError('CheckpointLooper cannot process a single event, use a Looper.')
+
+    def write(self):
+        '''If all events have been processed, merge the outputs of the
+        segments into the output directory, and remove the checkpoints.
+        If the merge fails, the checkpoints are kept.
+        '''
+        if not self.completed or not self.segments:
+            return
+        merge_outputs(self.outDir,
+                      [self.segment_dir(iseg) for iseg in range(len(self.segments))])
+        shutil.rmtree(self.checkpointDir)
@@ -0,0 +1,418 @@
+'''Scheduling of the chunks of several components on a pool of workers.'''
+
+import os
+import sys
+import copy
+import shutil
+import time
+import multiprocessing
+
+from heppy.framework.looper import Looper
+from heppy.framework.parallel_looper import plain_config, merge_outputs
+from heppy.framework.entries import EntryCounts
+from heppy.statistics.timing import TimingReport
+
+# The scheduler currently running its workers.
+# It is set just before the creation of the worker pool,
+# so that the forked workers inherit the configuration and the
+# shared table of pieces, which cannot be pickled.
+_scheduler = None
+
+# fields of a piece in the shared table
+_CHUNK, _START, _POSITION, _END = range(4)
+_NFIELDS = 4
+
+
+def _run_piece(slot):
+    '''Process a piece of a chunk in a worker process.
+
+    Returns a tuple (output directory, number of processed events).
+    '''
+    sched = _scheduler
+    chunk = sched.chunks[sched.table[slot*_NFIELDS + _CHUNK]]
+    config = copy.copy(sched.config)
+    config.components = [chunk.comp]
+    if not chunk.stealable:
+        # circular import
+        from heppy.framework.heppy_loop import runLoop
+        options = sched.options
+        if chunk.resume:
+            # resuming from the checkpoints of the failed attempt
+            options = copy.copy(options)
+            options.resume = True
+        loop = runLoop(chunk.comp, sched.outDir, config,
+                       sched.cfgFileName, options)
+        return loop.name, loop.nEvProcessed
+    start = sched.table[slot*_NFIELDS + _START]
+    end = sched.table[slot*_NFIELDS + _END]
+    stop = _Steal(sched.table, slot, sched.stopFlag)
+    memcheck = 2 if getattr(sched.options, 'memCheck', False) else -1
+    loop = Looper(sched.piece_dir(chunk, slot),
+                  plain_config(config),
+                  nEvents=end-start,
+                  firstEvent=start,
+                  nPrint=sched.options.nprint,
+                  quiet=sched.options.quiet,
+                  memCheckFromEvent=memcheck,
+                  stopFlag=stop,
+                  prefetch=sched.options.prefetch)
+    stop.looper = loop
+    loop.loop()
+    loop.write()
+    return loop.name, loop.nEvProcessed
+
+
+class _Steal(object):
+    '''Stop flag of the looper processing a piece.
+
+    The L{Looper<heppy.framework.looper.Looper>} checks the value after
+    each event. The value is 1 when the end of the piece is reached,
+    as the end can be moved backward by the scheduler when it steals
+    the remaining events of the piece for an idle worker,
+    or when a graceful stop of the job was requested.
+    '''
+
+    def __init__(self, table, slot, stopFlag=None):
+        self.table = table
+        self.slot = slot
+        self.stopFlag = stopFlag
+        self.looper = None
+        # the looper stops by itself at the initial end of the piece
+        self.end = table[slot*_NFIELDS + _END]
+
+    def _get_value(self):
+        if self.stopFlag and self.stopFlag.value:
+            return 1
+        offset = self.slot * _NFIELDS
+        with self.table.get_lock():
+            position = self.table[offset + _START] + self.looper.nEvProcessed
+            self.table[offset + _POSITION] = position
+            end = self.table[offset + _END]
+            return int(end < self.end and position >= end)
+
+    def _set_value(self, value):
+        if self.stopFlag is not None:
+            self.stopFlag.value = value
+
+    value = property(_get_value, _set_value)
+
+
+class _Chunk(object):
+    '''A component to process, possibly in several pieces.'''
+
+    def __init__(self, index, comp, first, nevents, stealable):
+        self.index = index
+        self.comp = comp
+        self.first = first
+        self.nevents = nevents
+        self.stealable = stealable
+        self.pieces = []
+        self.running = 0
+        self.failures = 0
+        self.failed = False
+        self.completed = False
+        # True if a failed attempt left checkpoints to resume from
+        self.resume = False
+
+
+class ChunkScheduler(object):
+    '''Processes the chunks of several components with a pool of workers.
+
+    The chunks are started longest first, the number of events of each
+    chunk being estimated from the cached number of entries of its files,
+    see L{EntryCounts<heppy.framework.entries.EntryCounts>}.
+    When no chunk is left to start, an idle worker steals the second half
+    of the remaining events of the running piece with the most remaining
+    events. The pieces of a chunk are then merged in event order into
+    the output directory of the chunk.
+
+    A failed piece is processed again, up to retries times.
+    A chunk processed as a whole with checkpoints is then resumed
+    from its last checkpoint.
+
+    While processing, a progress summary is printed every progress seconds,
+    with the total event rate and the estimated time of arrival.
+
+    Chunks are processed as a whole, without stealing, if they are
+    fine-split, use an event index or a preprocessor, or if checkpoints
+    or a ceiling of the resident set size are requested.
+
+    Example::
+
+      scheduler = ChunkScheduler(comps, 'Out', config, 'cfg.py', options, 8)
+      failed = scheduler.run()
+    '''
+
+    def __init__(self, comps, outDir, config, cfgFileName, options,
+                 nworkers, retries=0, stopFlag=None,
+                 min_steal=100, progress=10.):
+        '''
+        @param comps: components to process, e.g. split by L{split<heppy.framework.config.split>}.
+        @param outDir: output directory, containing a directory per component.
+        @param config: configuration, see L{Config<heppy.framework.config.Config>}.
+        @param cfgFileName: configuration file, copied to the output directories.
+        @param options: heppy_loop options.
+        @param nworkers: number of worker processes.
+        @param retries: number of times a failed piece is processed again.
+        @param stopFlag: graceful stop flag, e.g. a multiprocessing.Value.
+        @param min_steal: minimum number of events in a stolen piece.
+        @param progress: period of the progress summary, in seconds.
+          No summary if 0 or None.
+        '''
+        self.outDir = outDir
+        self.config = config
+        self.cfgFileName = cfgFileName
+        self.options = options
+        self.nworkers = max(1, int(nworkers))
+        self.retries = retries
+        self.stopFlag = stopFlag
+        self.min_steal = min_steal
+        self.progress = progress
+        # as in runLoop
+        checkpoints = getattr(options, 'checkpointEvents', None) or \
+                      getattr(options, 'checkpointTime', None) or \
+                      getattr(options, 'resume', False) or \
+                      getattr(options, 'maxRSS', None)
+        counts = EntryCounts()
+        self.chunks = []
+        for comp in comps:
+            first, nevents = self._event_range(comp, counts)
+            fineSplit = getattr(comp, 'fineSplit', None)
+            stealable = not checkpoints and \
+                not getattr(comp, 'event_index', None) and \
+                getattr(config, 'preprocessor', None) is None and \
+                not (fineSplit and fineSplit[1] > 1)
+            if fineSplit and fineSplit[1] > 1:
+                nevents /= fineSplit[1]
+            self.chunks.append(_Chunk(len(self.chunks), comp,
+                                      first, nevents, stealable))
+        counts.save()
+        # at most one piece per range of min_steal events,
+        # and the failed pieces are retried
+        self.maxpieces = len(self.chunks) + \
+            sum(chunk.nevents for chunk in self.chunks) / max(1, min_steal)
+        self.table = multiprocessing.Array(
+            'l', self.maxpieces * (retries + 1) * _NFIELDS)
+        self.pieces = []
+        self.failed = []
+
+    def _event_range(self, comp, counts):
+        '''Returns the first event and the number of events of a chunk.'''
+        ranges = getattr(comp, 'eventRanges', None)
+        if ranges:
+            # see config.split
+            first = ranges[0][1]
+            nevents = sum(nev for fname, firstEvent, nev in ranges)
+        else:
+            first = 0
+            tree_name = getattr(comp, 'tree_name', None)
+            nevents = sum(counts.count(fname, tree_name, self.config.events_class)
+                          for fname in comp.files)
+        if self.options.nevents is not None:
+            nevents = min(nevents, int(self.options.nevents))
+        return first, nevents
+
+    def piece_dir(self, chunk, slot):
+        '''Output directory of a piece of a chunk.'''
+        return '/'.join([self.outDir, chunk.comp.name,
+                         'pieces', 'Piece{slot}'.format(slot=slot)])
+
+    def _add_piece(self, chunk, start, end):
+        '''Adds a piece to the shared table, returns its slot.'''
+        slot = len(self.pieces)
+        offset = slot * _NFIELDS
+        self.table[offset + _CHUNK] = chunk.index
+        self.table[offset + _START] = start
+        self.table[offset + _POSITION] = start
+        self.table[offset + _END] = end
+        self.pieces.append(dict(chunk=chunk, result=None, name=None,
+                                nevents=0, failed=False))
+        return slot
+
+    def _start(self, pool, slot):
+        piece = self.pieces[slot]
+        piece['result'] = pool.apply_async(_run_piece, [slot])
+        piece['chunk'].running += 1
+
+    def _steal(self):
+        '''Steals the second half of the remaining events of
+        the running piece with the most remaining events.
+        Returns the slot of the new piece, or None.'''
+        if len(self.pieces) >= self.maxpieces:
+            return None
+        best = None
+        with self.table.get_lock():
+            for slot, piece in enumerate(self.pieces):
+                if piece['result'] is None or piece['result'].ready() or \
+                   not piece['chunk'].stealable:
+                    continue
+                offset = slot * _NFIELDS
+                remaining = self.table[offset + _END] - self.table[offset + _POSITION]
+                if remaining >= 2 * self.min_steal and \
+                   (best is None or remaining > best[1]):
+                    best = slot, remaining
+            if best is None:
+                return None
+            slot, remaining = best
+            offset = slot * _NFIELDS
+            end = self.table[offset + _END]
+            middle = end - remaining / 2
+            self.table[offset + _END] = middle
+        return self._add_piece(self.pieces[slot]['chunk'], middle, end)
+
+    def _finish(self, pool, slot):
+        '''Collects the result of a piece.
+
+        If the piece failed, it is processed again,
+        and the slot of the new piece is returned.
+        '''
+        piece = self.pieces[slot]
+        chunk = piece['chunk']
+        chunk.running -= 1
+        try:
+            piece['name'], piece['nevents'] = piece['result'].get()
+        except Exception as err:
+            piece['failed'] = True
+            chunk.failures += 1
+            print 'ERROR processing {name}, attempt {n}: {err}'.format(
+                name=chunk.comp.name, n=chunk.failures, err=err)
+            if chunk.stealable:
+                dirname = self.piece_dir(chunk, slot)
+            else:
+                dirname = '/'.join([self.outDir, chunk.comp.name])
+                if os.path.isfile('/'.join([dirname, 'checkpoints', 'checkpoint.json'])):
+                    # kept, to resume from the last checkpoint
+                    chunk.resume = True
+                    dirname = None
+            if dirname and os.path.isdir(dirname):
+                shutil.rmtree(dirname)
+            if chunk.failures > self.retries:
+                chunk.failed = True
+                return None
+            offset = slot * _NFIELDS
+            slot = self._add_piece(chunk, self.table[offset + _START],
+                                   self.table[offset + _END])
+            self._start(pool, slot)
+            return slot
+        chunk.pieces.append(slot)
+        if chunk.running == 0 and not chunk.failed:
+            chunk.completed = True
+            self._merge(chunk)
+        return None
+
+    def _merge(self, chunk):
+        '''Merges the pieces of a chunk in event order.'''
+        if not chunk.stealable:
+            return
+        odir = '/'.join([self.outDir, chunk.comp.name])
+        slots = sorted(chunk.pieces,
+                       key=lambda slot: self.table[slot*_NFIELDS + _START])
+        names = [self.pieces[slot]['name'] for slot in slots]
+        if len(names) == 1:
+            # the timing report is moved last, as it marks the chunk as done
+            fnames = sorted(os.listdir(names[0]),
+                            key=lambda fname: fname == TimingReport.fname)
+            self._copy_cfg(odir)
+            for fname in fnames:
+                shutil.move('/'.join([names[0], fname]), odir)
+            shutil.rmtree('/'.join([odir, 'pieces']))
+            return
+        merge_outputs(odir, names)
+        shutil.rmtree('/'.join([odir, 'pieces']))
+        with open('/'.join([odir, 'log.txt']), 'w') as logfile:
+            for slot in slots:
+                offset = slot * _NFIELDS
+                start = self.table[offset + _START]
+                logfile.write('{name}: events {first} to {last}\n'.format(
+                    name=os.path.basename(self.pieces[slot]['name']),
+                    first=start,
+                    last=start + self.pieces[slot]['nevents'] - 1))
+            logfile.write('number of events processed: {nEv}\n'.format(
+                nEv=sum(self.pieces[slot]['nevents'] for slot in slots)))
+        self._copy_cfg(odir)
+
+    def _copy_cfg(self, odir):
+        '''Copies the configuration file to odir, as done by runLoop.'''
+        shutil.copy(self.cfgFileName, odir)
+        shutil.copy(self.cfgFileName, '/'.join([odir, '__cfg_to_run__.py']))
+
+    def processed(self):
+        '''Returns the number of events processed by all pieces.'''
+        nevents = 0
+        for slot, piece in enumerate(self.pieces):
+            if piece['failed']:
+                continue
+            elif piece['name'] is not None:
+                nevents += piece['nevents']
+            elif piece['chunk'].stealable:
+                offset = slot * _NFIELDS
+                nevents += self.table[offset + _POSITION] - self.table[offset + _START]
+        return nevents
+
+    def _print_progress(self, start_time):
+        total = sum(chunk.nevents for chunk in self.chunks)
+        processed = self.processed()
+        elapsed = time.time() - start_time
+        rate = processed / elapsed if elapsed else 0.
+        eta = '{:.0f} s'.format((total - processed) / rate) if rate else '?'
+        print 'progress: {processed}/{total} events, {rate:.1f} ev/s, ETA {eta}, '\
+            '{done}/{nchunks} chunks done, {running} pieces running'.format(
+                processed=processed, total=total, rate=rate, eta=eta,
+                done=len([chunk for chunk in self.chunks if chunk.completed]),
+                nchunks=len(self.chunks),
+                running=sum(chunk.running for chunk in self.chunks))
+        sys.stdout.flush()
+
+    def run(self):
+        '''Processes all chunks, returns the names of the failed chunks.'''
+        global _scheduler
+        queue = sorted(self.chunks, key=lambda chunk: chunk.nevents, reverse=True)
+        for chunk in self.chunks:
+            if chunk.stealable:
+                os.makedirs('/'.join([self.outDir, chunk.comp.name, 'pieces']))
+        _scheduler = self
+        pool = multiprocessing.Pool(processes=self.nworkers)
+        start_time = time.time()
+        last_progress = start_time
+        try:
+            running = []
+            while True:
+                # longest chunks first
+                while queue and len(running) < self.nworkers:
+                    chunk = queue.pop(0)
+                    if chunk.stealable:
+                        slot = self._add_piece(chunk, chunk.first,
+                                               chunk.first + chunk.nevents)
+                    else:
+                        slot = self._add_piece(chunk, 0, 0)
+                    self._start(pool, slot)
+                    running.append(slot)
+                # idle workers steal events from the running pieces
+                while not queue and len(running) < self.nworkers and \
+                      not (self.stopFlag and self.stopFlag.value):
+                    slot = self._steal()
+                    if slot is None:
+                        break
+                    self._start(pool, slot)
+                    running.append(slot)
+                if not running:
+                    break
+                time.sleep(0.1)
+                for slot in [slot for slot in running
+                             if self.pieces[slot]['result'].ready()]:
+                    running.remove(slot)
+                    retried = self._finish(pool, slot)
+                    if retried is not None:
+                        running.append(retried)
+                if self.progress and time.time() - last_progress > self.progress:
+                    self._print_progress(start_time)
+                    last_progress = time.time()
+            pool.close()
+        finally:
+            pool.terminate()
+            pool.join()
+            _scheduler = None
+        if self.progress:
+            self._print_progress(start_time)
+        self.failed = [chunk.comp.name for chunk in self.chunks if chunk.failed]
+        return self.failed
@@ -5,6 +5,7 @@ from weight import Weight
 import glob
 import analyzer
 import copy
+import importlib
 import dill  # necessary for lambdas in configuration objects
 
 def printComps(comps, details=False):
@@ -31,9 +32,51 @@ def printComps(comps, details=False):
     print '# components with files = ', nCompsWithFiles
     print '# jobs                  = ', nJobs
 
-def split(comps):
+def event_ranges(counts, nevents_per_job):
+    '''Divide a list of files in jobs of similar numbers of events.
+
+    counts is a list of (file name, number of entries).
+    Returns a list of jobs. Each job is a list of (file name, firstEvent, nEvents),
+    and the event ranges of a job are contiguous. 
+    The number of events per job is as close as possible to nevents_per_job,
+    and the numbers of events of two jobs differ by at most 1.
+    '''
+    total = sum(nentries for fname, nentries in counts)
+    if total == 0:
+        return []
+    njobs = max(1, int(total / float(nevents_per_job) + 0.5))
+    size, remainder = divmod(total, njobs)
+    jobs = []
+    ranges = []
+    target = size + 1 if remainder else size
+    injob = 0
+    for fname, nentries in counts:
+        first = 0
+        while first < nentries:
+            nev = min(nentries - first, target - injob)
+            ranges.append( (fname, first, nev) )
+            first += nev
+            injob += nev
+            if injob == target:
+                jobs.append(ranges)
+                ranges = []
+                injob = 0
+                target = size + 1 if len(jobs) < remainder else size
+    return jobs
+
+
+def split(comps, events_class=None, entry_counts=None):
     '''takes a list of components, split the ones that need to be splitted, 
-    and return a new (bigger) list'''
+    and return a new (bigger) list
+
+    The components with an eventsPerJob attribute are split in chunks
+    containing about eventsPerJob events. For each chunk, the eventRanges
+    attribute contains the list of (file, firstEvent, nEvents) 
+    to be processed by the L{Looper<heppy.framework.looper.Looper>}.
+    The number of entries in the files is obtained with the events_class,
+    and cached in entry_counts, 
+    an L{EntryCounts<heppy.framework.entries.EntryCounts>} object. 
+    '''
 
     def chunks(l, n):
         '''split list l in n chunks. The last one can be smaller.'''
@@ -41,7 +84,25 @@ def split(comps):
 
     splitComps = []
     for comp in comps:
-        if hasattr( comp, 'fineSplitFactor') and comp.fineSplitFactor>1:
+        if getattr(comp, 'eventsPerJob', None):
+            if entry_counts is None:
+                from heppy.framework.entries import EntryCounts
+                entry_counts = EntryCounts()
+            counts = [(fname, entry_counts.count(fname, comp.tree_name, events_class))
+                      for fname in comp.files]
+            jobs = event_ranges(counts, comp.eventsPerJob)
+            if not jobs:
+                # no entry in the input files
+                splitComps.append( comp )
+            for ichunk, ranges in enumerate(jobs):
+                newComp = copy.deepcopy(comp)
+                newComp.files = [fname for fname, first, nev in ranges]
+                newComp.eventRanges = ranges
+                newComp.name = '{name}_Chunk{index}'.format(name=newComp.name,
+                                                            index=ichunk)
+                splitComps.append( newComp )
+            entry_counts.save()
+        elif hasattr( comp, 'fineSplitFactor') and comp.fineSplitFactor>1:
             subchunks = range(comp.fineSplitFactor)
             for ichunk, chunk in enumerate([(f,i) for f in comp.files for i in subchunks]):
                 newComp = copy.deepcopy(comp)
@@ -111,6 +172,50 @@ class CFG(object):
             setattr(other, k, v)
         return other
     
+def import_class(class_object):
+    '''Returns the class, importing it if class_object is given as a string,
+    e.g. 'heppy.analyzers.Selector.Selector'.'''
+    if not isinstance(class_object, basestring):
+        return class_object
+    module_name, _, class_name = class_object.rpartition('.')
+    if not module_name:
+        raise ValueError('class given as a string should be of the form module.Class, not {name}'.format(
+            name=class_object))
+    module = importlib.import_module(module_name)
+    return getattr(module, class_name)
+
+
+def class_name_of(class_object):
+    '''Returns the full name module.Class of a class,
+    which can be given as a string.'''
+    if isinstance(class_object, basestring):
+        return class_object
+    return '.'.join([class_object.__module__, class_object.__name__])
+
+
+def check_analyzer_class(class_object):
+    '''Raises ValueError if class_object is not an analyzer class.'''
+    errmsg = None
+    if type(class_object) is not type: 
+        errmsg = 'The first argument should be a class'
+    elif not analyzer.Analyzer in class_object.__mro__:
+        try:
+            #TODO: we also should be able to use analyzers
+            #TODO: in PhysicsTools.HeppyCore...
+            #TODO: a bit of a hack anyway, can we do something cleaner?
+            from PhysicsTools.Heppy.analyzers.core.Analyzer import Analyzer as CMSBaseAnalyzer
+            if CMSBaseAnalyzer in class_object.__mro__:
+                errmsg = None
+        except: 
+            errmsg = 'The first argument should be a class inheriting from {anaclass}'.format(anaclass=analyzer.Analyzer)
+    if errmsg: 
+        msg = 'Error creating {selfclass} object. {errmsg}. Instead, you gave {classobjectclass}'.format( 
+            selfclass=Analyzer,
+            errmsg=errmsg, 
+            classobjectclass=class_object )
+        raise ValueError(msg)
+
+
 class Analyzer( CFG ):
     '''Base analyzer configuration, see constructor'''
     names = set()
@@ -138,6 +243,12 @@ class Analyzer( CFG ):
         It should inherit from heppy.framework.analyzer.Analyser (standalone)
         or from PhysicsTools.HeppyCore.framework.analyzer (in CMS)
 
+        The class can also be given as a string, e.g. 
+        'heppy.analyzers.ZMuMuAnalyzer.ZMuMuAnalyzer'. 
+        In this case, the module of the class is only imported 
+        when the looper builds the analyzer, which speeds up the 
+        loading of the configuration file. 
+
         The second argument is optional.
         If you have several analyzers of the same class, 
         e.g. ZEleEleAna and ZMuMuAna, 
@@ -152,25 +263,8 @@ class Analyzer( CFG ):
         as self.cfg_ana in your ZMuMuAnalyzer.
         '''
         super(Analyzer, self).__init__(**kwargs)
-        errmsg = None
-        if type(class_object) is not type: 
-            errmsg = 'The first argument should be a class'
-        elif not analyzer.Analyzer in class_object.__mro__:
-            try:
-                #TODO: we also should be able to use analyzers
-                #TODO: in PhysicsTools.HeppyCore...
-                #TODO: a bit of a hack anyway, can we do something cleaner?
-                from PhysicsTools.Heppy.analyzers.core.Analyzer import Analyzer as CMSBaseAnalyzer
-                if CMSBaseAnalyzer in class_object.__mro__:
-                    errmsg = None
-            except: 
-                errmsg = 'The first argument should be a class inheriting from {anaclass}'.format(anaclass=analyzer.Analyzer)
-        if errmsg: 
-            msg = 'Error creating {selfclass} object. {errmsg}. Instead, you gave {classobjectclass}'.format( 
-                selfclass=self.__class__,
-                errmsg=errmsg, 
-                classobjectclass=class_object )
-            raise ValueError(msg)
+        if not isinstance(class_object, basestring):
+            check_analyzer_class(class_object)
         self.class_object = class_object
         self.instance_label = instance_label # calls _build_name
         self.verbose = verbose
@@ -183,8 +277,7 @@ class Analyzer( CFG ):
             self.name = self._build_name()   
 
     def _build_name(self):
-        class_name = '.'.join([self.class_object.__module__, 
-                               self.class_object.__name__])
+        class_name = class_name_of(self.class_object)
         while 1:
             # if class_name == 'heppy.analyzers.ResonanceBuilder.ResonanceBuilder':
             #    import pdb; pdb.set_trace()
@@ -211,12 +304,27 @@ class Analyzer( CFG ):
             other.name = other._build_name()
         return other
 
+    def load_class(self):
+        '''Returns the analyzer class, 
+        importing it if it was given as a string.'''
+        if isinstance(self.class_object, basestring):
+            class_object = import_class(self.class_object)
+            check_analyzer_class(class_object)
+            self.class_object = class_object
+        return self.class_object
+
     def __repr__(self):
         baserepr = super(Analyzer, self).__repr__()
         return ':'.join([baserepr, self.name])
 
     
 class Service( CFG ):
+    '''Base service configuration.
+
+    A service configured with shared=True is built once,
+    before forking the worker processes, and shared by all workers,
+    see L{shared<heppy.framework.services.shared>}.
+    '''
     
     def __init__(self, class_object, instance_label='1', 
                  verbose=False, **kwargs):
@@ -227,8 +335,7 @@ class Service( CFG ):
         self.verbose = verbose
 
     def _build_name(self):
-        class_name = '.'.join([self.class_object.__module__, 
-                               self.class_object.__name__])
+        class_name = class_name_of(self.class_object)
         name = '_'.join([class_name, self.instance_label])
         return name 
 
@@ -239,6 +346,13 @@ class Service( CFG ):
         if name == 'instance_label':
             self.name = self._build_name()   
 
+    def load_class(self):
+        '''Returns the service class, 
+        importing it if it was given as a string.'''
+        if isinstance(self.class_object, basestring):
+            self.class_object = import_class(self.class_object)
+        return self.class_object
+
     def clone(self, **kwargs):
         other = super(Service, self).clone(**kwargs)
         if 'class_object' in kwargs and 'name' not in kwargs:
@@ -382,7 +496,10 @@ class Config( object ):
     '''Main configuration object, holds a sequence of analyzers, and
     a list of components.'''
     def __init__(self, components, sequence, services,
-                 events_class,preprocessor=None, versions=None):
+                 events_class,preprocessor=None, versions=None,
+                 free_products=False, optimize_sequence=False,
+                 pickle_statistics=False, batch_size=0,
+                 memory_bounded=False, random_seed=None):
         '''Create the configuration object for a heppy job.
         
         @param components: list of Components to be processed (input)
@@ -394,6 +511,34 @@ class Config( object ):
         @param versions: dictionary listing the version of the software that is used.
         
         versions is an object of the class heppy.utils.versions.Versions 
+
+        @param free_products: if True, the products of the event are deleted
+          as soon as no analyzer further in the sequence reads them,
+          see heppy.framework.products.ProductRegistry
+        @param optimize_sequence: if True, the analyzers declared as pure
+          producers whose outputs are not used are removed from the sequence,
+          and the filters are moved as early as possible,
+          see heppy.framework.scheduler
+        @param pickle_statistics: if True, the counters and averages of each
+          analyzer are also written to pickle and text files in the analyzer
+          directory, as in previous versions. They are always written to
+          summary.npz, see heppy.statistics.summary
+        @param batch_size: if larger than 0, the events are processed by
+          blocks of batch_size events. The analyzers with a process_batch
+          method then process all events of a block at once,
+          see heppy.framework.batch
+        @param memory_bounded: if True, the products of each event are deleted
+          after the last analyzer, and the objects taken from the object pools
+          are recycled in the next events, see heppy.framework.pools.
+          The analyzers must then not keep per-event objects from one event
+          to the next
+        @param random_seed: if set, the random generator of heppy.statistics.rrandom
+          is seeded before each analyzer processes an event, from the random_seed,
+          the component name, the input file, the entry in this file, and the
+          analyzer name. The results of an event then do not depend on the
+          splitting of the component in chunks, or on the number of workers.
+          The analyzers processing blocks of events, with process_batch,
+          are then given the events of a block one by one
         '''
         self.preprocessor = preprocessor
         self.components = components
@@ -401,6 +546,12 @@ class Config( object ):
         self.services = services
         self.events_class = events_class
         self.versions = versions
+        self.free_products = free_products
+        self.optimize_sequence = optimize_sequence
+        self.pickle_statistics = pickle_statistics
+        self.batch_size = batch_size
+        self.memory_bounded = memory_bounded
+        self.random_seed = random_seed
 
     def __str__(self):
         comp = '\n'.join(map(str, self.components))
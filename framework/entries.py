@@ -0,0 +1,97 @@
+'''Number of entries in input files, cached on disk.'''
+
+import os
+import json
+import tempfile
+
+
+def cache_dir():
+    '''Directory where heppy caches information about the input files.
+
+    Set by the HEPPY_CACHE environment variable, defaults to ~/.heppy.
+    '''
+    return os.environ.get('HEPPY_CACHE', os.path.expanduser('~/.heppy'))
+
+
+class EntryCounts(object):
+    '''Keeps track of the number of entries in input files.
+
+    The number of entries in a file is computed only once.
+    It is then stored in a json cache file, with the modification time
+    of the input file, so that the count is updated if the file changes.
+
+    Example::
+
+      counts = EntryCounts()
+      nentries = counts.count('ee_Z_ddbar.root', 'events')
+      counts.save()
+    '''
+
+    def __init__(self, fname=None):
+        '''
+        @param fname: path to the cache file.
+          defaults to entries.json in the L{cache_dir}.
+        '''
+        if fname is None:
+            fname = '/'.join([cache_dir(), 'entries.json'])
+        self.fname = fname
+        self.cache = dict()
+        self.modified = False
+        if os.path.isfile(self.fname):
+            try:
+                with open(self.fname) as infile:
+                    self.cache = json.load(infile)
+            except ValueError:
+                # corrupted cache, will be rebuilt
+                self.cache = dict()
+
+    @staticmethod
+    def _key(fname, tree_name):
+        if os.path.isfile(fname):
+            fname = os.path.abspath(fname)
+        return '::'.join([fname, str(tree_name)])
+
+    @staticmethod
+    def _mtime(fname):
+        '''modification time of fname, or None for remote files.'''
+        if os.path.isfile(fname):
+            return os.path.getmtime(fname)
+        return None
+
+    def count(self, fname, tree_name=None, events_class=None):
+        '''Returns the number of entries in fname.
+
+        @param fname: input file
+        @param tree_name: name of the tree, passed to the events_class
+        @param events_class: class used to read fname, as in
+          L{Config<heppy.framework.config.Config>}.
+          Defaults to L{Chain<heppy.framework.chain.Chain>}.
+        '''
+        key = self._key(fname, tree_name)
+        mtime = self._mtime(fname)
+        cached = self.cache.get(key)
+        if cached is not None and cached['mtime'] == mtime:
+            return cached['entries']
+        if events_class is None:
+            from heppy.framework.chain import Chain as events_class
+        nentries = len(events_class([fname], tree_name))
+        self.cache[key] = dict(mtime=mtime, entries=nentries)
+        self.modified = True
+        return nentries
+
+    def save(self):
+        '''Write the cache file, if needed.
+
+        The file is replaced atomically, so that several processes
+        can share the same cache.
+        '''
+        if not self.modified:
+            return
+        dirname = os.path.dirname(os.path.abspath(self.fname))
+        if not os.path.isdir(dirname):
+            os.makedirs(dirname)
+        fd, tmpfname = tempfile.mkstemp(dir=dirname)
+        with os.fdopen(fd, 'w') as out:
+            json.dump(self.cache, out, indent=1)
+        os.rename(tmpfname, self.fname)
+        self.modified = False
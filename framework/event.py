@@ -3,7 +3,6 @@ import copy
 import collections
 import fnmatch
 
-from ROOT import TChain
 
 class Event(object):
     '''Event class.
@@ -37,26 +36,125 @@ class Event(object):
       input: input, as determined by the looper
       analyzers: list of analyzers that processed this event, with their result, in the form:
           [(analyzer_name, result?), ...]
-    #TODO: provide a clear interface for access control (put, get, del products) - we should keep track of the name and id of the analyzer.
+
+    Products:
+      Any other attribute is a product, stored in a product store.
+      Products can be handled as attributes, or with L{put}, L{get} and L{delete}:
+        event.jets = jets            # or event.put('jets', jets)
+        jets = event.jets            # or event.get('jets')
+        del event.jets               # or event.delete('jets')
+      When the event is created by the L{Looper<heppy.framework.looper.Looper>},
+      the analyzers putting and getting each product are recorded in a
+      L{ProductRegistry<heppy.framework.products.ProductRegistry>}.
     '''
 
+    __slots__ = ('iEv', 'input', 'setup', 'eventWeight', 'analyzers',
+                 '_products', '_registry', '_freed')
+
     print_nstrip = 10
     print_patterns = ['*']
 
-    def __init__(self, iEv, input_data=None, setup=None, eventWeight=1):
+    def __init__(self, iEv, input_data=None, setup=None, eventWeight=1,
+                 registry=None):
+        self._products = dict()
+        self._registry = registry
+        self._freed = None
         self.iEv = iEv
         self.input = input_data
         self.setup = setup
         self.eventWeight = eventWeight
         self.analyzers = []
 
+    def __setattr__(self, name, value):
+        if name in Event.__slots__:
+            object.__setattr__(self, name, value)
+        else:
+            self.put(name, value)
+
+    def __getattr__(self, name):
+        # only called if name is not a core attribute
+        if name.startswith('__') or name in Event.__slots__:
+            raise AttributeError(name)
+        return self.get(name)
+
+    def __delattr__(self, name):
+        if name in Event.__slots__:
+            object.__delattr__(self, name)
+        else:
+            self.delete(name)
+
+    def put(self, name, value):
+        '''Add or replace product name.'''
+        self._products[name] = value
+        if self._registry is not None:
+            self._registry.put(name)
+
+    def get(self, name, *default):
+        '''Returns product name.
+
+        If the product does not exist, returns default if provided,
+        and raises AttributeError otherwise.
+        '''
+        try:
+            value = self._products[name]
+        except KeyError:
+            if default:
+                return default[0]
+            if self._freed and name in self._freed:
+                raise AttributeError(
+                    "product '{name}' was freed after analyzer {ana}, "
+                    "as no analyzer read it later in the first events. "
+                    "Set free_products to False in the configuration.".format(
+                        name=name, ana=self._freed[name]))
+            raise AttributeError(
+                "'{cls}' object has no attribute '{name}'".format(
+                    cls=self.__class__.__name__, name=name))
+        if self._registry is not None:
+            self._registry.get(name)
+        return value
+
+    def delete(self, name):
+        '''Remove product name.'''
+        try:
+            del self._products[name]
+        except KeyError:
+            raise AttributeError(name)
+
+    def free(self, name, analyzer_name):
+        '''Remove product name, if present, recording that it was freed
+        after analyzer analyzer_name.'''
+        if name in self._products:
+            del self._products[name]
+            if self._freed is None:
+                self._freed = dict()
+            self._freed[name] = analyzer_name
+
+    def clear(self):
+        '''Remove all products, e.g. once the event has been processed.'''
+        self._products.clear()
+
+    def products(self):
+        '''Returns the names of the products.'''
+        return self._products.keys()
+
+    def __contains__(self, name):
+        return name in self._products
+
+    def __getstate__(self):
+        return dict((name, getattr(self, name)) for name in Event.__slots__)
+
+    def __setstate__(self, state):
+        for name, value in state.iteritems():
+            object.__setattr__(self, name, value)
+
     def _get_print_attrs(self, subname=""):
         '''returns a dict of printable information of an event
         arguments
         * subname is used when called recursively and is the name of the parent object'''
-        selected_attrs = copy.copy(self.__dict__) #initial selection of what we can print
-        selected_attrs.pop('setup') #get rid of some bits
-        selected_attrs.pop('input')
+        selected_attrs = copy.copy(self._products) #initial selection of what we can print
+        selected_attrs.update(iEv=self.iEv,
+                              eventWeight=self.eventWeight,
+                              analyzers=self.analyzers)
         
         # Colin: the following are unused: 
         matched_attrs = dict() #this applies pattern matching to obtain a subset of selected_attrs
@@ -0,0 +1,146 @@
+'''Index of selected events, to process only these events in a later run.'''
+
+import os
+import numpy
+
+
+def _key(fname):
+    if os.path.isfile(fname):
+        return os.path.abspath(fname)
+    return fname
+
+
+class EventIndex(object):
+    '''Selected entries of a set of input files.
+
+    The index is written by the L{EventIndexWriter<heppy.analyzers.EventIndexWriter.EventIndexWriter>}
+    analyzer, and used by the L{Looper<heppy.framework.looper.Looper>} to process
+    only the selected entries, when the event_index attribute of the component is
+    set to the path of the index file::
+
+      comp.event_index = 'Outdir/comp/zh_index/event_index.npz'
+
+    The selected entries are stored for each input file, as a sorted array of
+    entry numbers, or as a bitmap if more than 1/64 of the entries are selected.
+
+    Indices can be added, e.g. to merge the indices of all chunks of a component.
+    '''
+
+    fname = 'event_index.npz'
+
+    def __init__(self, tree_name=None):
+        self.tree_name = tree_name
+        self.files = []
+        self.nentries = []
+        self.entries = []
+
+    @classmethod
+    def from_entries(cls, entries, files, nentries, tree_name=None):
+        '''Create an index from entry numbers in the chain of files.
+
+        @param entries: selected entry numbers in the chain.
+        @param files: files of the chain.
+        @param nentries: number of entries in each file.
+        '''
+        index = cls(tree_name)
+        entries = numpy.unique(numpy.asarray(entries, dtype=numpy.int64))
+        offset = 0
+        for fname, nent in zip(files, nentries):
+            selected = entries[(entries >= offset) & (entries < offset + nent)]
+            index.add_file(fname, nent, selected - offset)
+            offset += nent
+        return index
+
+    def add_file(self, fname, nentries, entries):
+        '''Add the selected entries of a file, or merge them
+        with the ones already present for this file.'''
+        entries = numpy.asarray(entries, dtype=numpy.int64)
+        keys = [_key(f) for f in self.files]
+        if _key(fname) in keys:
+            i = keys.index(_key(fname))
+            if self.nentries[i] != nentries:
+                raise ValueError('{fname}: {n1} entries in the index, {n2} given'.format(
+                    fname=fname, n1=self.nentries[i], n2=nentries))
+            self.entries[i] = numpy.union1d(self.entries[i], entries)
+        else:
+            self.files.append(fname)
+            self.nentries.append(nentries)
+            self.entries.append(numpy.unique(entries))
+
+    def selected(self, fname):
+        '''Sorted array of the selected entries in fname,
+        or None if fname is not in the index.'''
+        keys = [_key(f) for f in self.files]
+        if _key(fname) not in keys:
+            return None
+        return self.entries[keys.index(_key(fname))]
+
+    def chain_entries(self, files, count):
+        '''Returns the sorted array of the selected entry numbers
+        in the chain of files.
+
+        @param files: files of the chain.
+        @param count: function returning the number of entries of a file,
+          e.g. L{EntryCounts.count<heppy.framework.entries.EntryCounts.count>}.
+        '''
+        result = []
+        offset = 0
+        for fname in files:
+            selected = self.selected(fname)
+            if selected is not None:
+                result.append(selected + offset)
+            offset += count(fname)
+        if not result:
+            return numpy.zeros(0, dtype=numpy.int64)
+        return numpy.concatenate(result)
+
+    def __len__(self):
+        return sum(len(entries) for entries in self.entries)
+
+    def __add__(self, other):
+        '''Merge two indices.'''
+        for fname, nentries, entries in zip(other.files, other.nentries, other.entries):
+            self.add_file(fname, nentries, entries)
+        return self
+
+    def __iadd__(self, other):
+        return self.__add__(other)
+
+    def write(self, fname):
+        '''Write the index to fname, in numpy npz format.'''
+        arrays = dict(files=numpy.array(self.files, dtype=str),
+                      nentries=numpy.array(self.nentries, dtype=numpy.int64),
+                      tree_name=numpy.array(self.tree_name or '', dtype=str))
+        for i, (nentries, entries) in enumerate(zip(self.nentries, self.entries)):
+            if len(entries) * 64 > nentries:
+                mask = numpy.zeros(nentries, dtype=numpy.bool_)
+                mask[entries] = True
+                arrays['bits_{i}'.format(i=i)] = numpy.packbits(mask)
+            else:
+                arrays['entries_{i}'.format(i=i)] = entries
+        with open(fname, 'wb') as out:
+            numpy.savez_compressed(out, **arrays)
+
+    @classmethod
+    def load(cls, fname):
+        '''Load an index written with L{write}.'''
+        data = numpy.load(fname)
+        index = cls(str(data['tree_name']) or None)
+        for i, (fname, nentries) in enumerate(zip(data['files'], data['nentries'])):
+            bits = 'bits_{i}'.format(i=i)
+            if bits in data.files:
+                mask = numpy.unpackbits(data[bits])[:nentries]
+                entries = numpy.flatnonzero(mask)
+            else:
+                entries = data['entries_{i}'.format(i=i)]
+            index.add_file(str(fname), int(nentries), entries)
+        data.close()
+        return index
+
+    def __str__(self):
+        lines = ['EventIndex: {n} selected entries'.format(n=len(self))]
+        for fname, nentries, entries in zip(self.files, self.nentries, self.entries):
+            lines.append('\t{fname}: {nsel}/{n}'.format(fname=fname,
+                                                         nsel=len(entries),
+                                                         n=nentries))
+        return '\n'.join(lines)
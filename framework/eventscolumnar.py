@@ -0,0 +1,182 @@
+'''Columnar events backend for flat trees.'''
+
+import numpy
+
+from heppy.framework.chain import Chain
+
+# numpy type of the values read from a leaf, per ROOT type name.
+# other leaf types are read as double precision floats.
+_dtypes = {
+    'Bool_t': numpy.bool_,
+    'Char_t': numpy.int8,
+    'UChar_t': numpy.uint8,
+    'Short_t': numpy.int16,
+    'UShort_t': numpy.uint16,
+    'Int_t': numpy.int32,
+    'UInt_t': numpy.uint32,
+    'Long64_t': numpy.int64,
+    'ULong64_t': numpy.uint64,
+    'Float_t': numpy.float32,
+}
+
+
+def _to_array(buf, nvalues, dtype):
+    '''Copy the first nvalues doubles of a ROOT buffer to a numpy array.'''
+    if nvalues == 0:
+        return numpy.zeros(0, dtype)
+    if hasattr(buf, 'SetSize'):
+        # PyROOT buffer
+        buf.SetSize(nvalues)
+    elif hasattr(buf, 'reshape'):
+        # cppyy low level view
+        buf.reshape((nvalues,))
+    values = numpy.frombuffer(buf, dtype=numpy.float64, count=nvalues)
+    # astype copies, so that the buffer can be reused
+    return values.astype(dtype)
+
+
+class EventView(object):
+    '''Entry of a columnar L{Events} backend.
+
+    The value of a branch is accessed as an attribute, e.g. event.var1.
+    The branch is read from the input tree on first access.
+    '''
+    __slots__ = ('_events', '_index')
+
+    def __init__(self, events, index):
+        self._events = events
+        self._index = index
+
+    def __getattr__(self, name):
+        if name.startswith('__'):
+            raise AttributeError(name)
+        return self._events.value(name, self._index)
+
+    def __dir__(self):
+        return sorted(self._events.branches)
+
+    def __repr__(self):
+        return 'EventView: entry {index}'.format(index=self._index)
+
+
+class Events(object):
+    '''Columnar events backend for flat trees, i.e. trees with
+    one value per branch and per entry.
+
+    Only the branches read by the analyzers are read from the input files.
+    A branch is read by clusters of cluster_size entries, into a numpy array.
+
+    Example::
+
+      from heppy.framework.eventscolumnar import Events
+      config = cfg.Config( components = selectedComponents,
+                           sequence = sequence,
+                           services = services,
+                           events_class = Events )
+
+    The analyzers see a per-event L{view<EventView>} of the input data,
+    event.input, on which the branches are accessed as attributes::
+
+      x = event.input.var1
+
+    The backend itself is available as event.input._events,
+    to access the arrays of the current cluster::
+
+      arrays, start = event.input._events.cluster_arrays(event.iEv)
+      var1_values = arrays['var1']
+
+    And any range of entries can be read with L{arrays}.
+    '''
+
+    cluster_size = 10000
+
+    def __init__(self, files, tree_name=None, options=None):
+        '''
+        @param files: list of input files, or wildcard pattern.
+        @param tree_name: name of the tree in the input files.
+          if None, the name of the only tree in the files.
+        @param options: unused
+        '''
+        self.chain = Chain(files, tree_name)
+        self.tree = self.chain.chain
+        self.branches = set(branch.GetName()
+                            for branch in self.tree.GetListOfBranches())
+        self.nentries = len(self.chain)
+        # branches read so far
+        self.touched_branches = set()
+        # first and last+1 entries of the current cluster
+        self.start = 0
+        self.stop = 0
+        self.columns = dict()
+
+    def __len__(self):
+        return self.nentries
+
+    def __iter__(self):
+        for index in xrange(self.nentries):
+            yield self[index]
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += self.nentries
+        if not 0 <= index < self.nentries:
+            raise IndexError('entry {index} out of range'.format(index=index))
+        return EventView(self, index)
+
+    def value(self, name, index):
+        '''Value of branch name for a given entry.'''
+        if not self.start <= index < self.stop:
+            self._load_cluster(index)
+        column = self.columns.get(name)
+        if column is None:
+            column = self._read(name, self.start, self.stop)
+            self.columns[name] = column
+        return column[index - self.start]
+
+    def _load_cluster(self, index):
+        self.start = index - index % self.cluster_size
+        self.stop = min(self.start + self.cluster_size, self.nentries)
+        self.columns = dict()
+
+    def cluster_arrays(self, index, branches=None):
+        '''Returns the arrays of the cluster containing entry index,
+        and the first entry of this cluster.
+
+        @param branches: branches to be read, in addition
+          to the ones already read for this cluster.
+        '''
+        if not self.start <= index < self.stop:
+            self._load_cluster(index)
+        if branches is not None:
+            for name in branches:
+                if name not in self.columns:
+                    self.columns[name] = self._read(name, self.start, self.stop)
+        return self.columns, self.start
+
+    def arrays(self, branches, start=0, stop=None):
+        '''Returns a dictionary of numpy arrays, one for each branch,
+        for the entries between start and stop (excluded).
+        '''
+        if stop is None or stop > self.nentries:
+            stop = self.nentries
+        return dict( (name, self._read(name, start, stop))
+                     for name in branches )
+
+    def _read(self, name, start, stop):
+        '''Read branch name between entries start and stop into a numpy array.'''
+        if name not in self.branches:
+            raise AttributeError('no branch {name} in tree {tree}'.format(
+                name=name, tree=self.tree.GetName()))
+        self.touched_branches.add(name)
+        nentries = stop - start
+        if nentries <= 0:
+            return numpy.zeros(0)
+        leaf = self.tree.GetBranch(name).GetListOfLeaves()[0]
+        dtype = _dtypes.get(leaf.GetTypeName(), numpy.float64)
+        if self.tree.GetEstimate() < nentries + 1:
+            self.tree.SetEstimate(nentries + 1)
+        nvalues = self.tree.Draw(name, '', 'goff', nentries, start)
+        if nvalues != nentries:
+            raise ValueError('branch {name} does not have one value per entry'.format(
+                name=name))
+        return _to_array(self.tree.GetV1(), nvalues, dtype)
@@ -1,16 +1,75 @@
+import bisect
 from pyLCIO import IOIMPL
 
+from heppy.framework.offsetindex import OffsetIndex
+
+
+def _reader(fname):
+    reader = IOIMPL.LCFactory.getInstance().createLCReader()
+    reader.open(fname)
+    return reader
+
+
+def read_keys(fname):
+    '''Returns the run and event numbers of all events in LCIO file fname.'''
+    reader = _reader(fname)
+    keys = []
+    try:
+        event = reader.readNextEvent()
+        while event:
+            keys.append((event.getRunNumber(), event.getEventNumber()))
+            event = reader.readNextEvent()
+    finally:
+        reader.close()
+    return keys
+
+
 class Events(object):
-    
-    def __init__(self, filename, dummy):
-        self.reader = IOIMPL.LCFactory.getInstance().createLCReader() 
-        self.reader.open(filename)
-        
+    '''Events of a list of LCIO files.
+
+    The events can be accessed by index, like the events of ROOT files,
+    so that the samples can be split in chunks, and processed in parallel.
+    To this end, the run and event numbers of the events of each file
+    are stored in an L{OffsetIndex<heppy.framework.offsetindex.OffsetIndex>},
+    built the first time the file is read. The events are then read
+    with LCReader.readEvent, or sequentially when consecutive events
+    are requested.
+    '''
+
+    def __init__(self, files, tree_name=None, options=None):
+        if isinstance(files, basestring):
+            files = [files]
+        self.files = files
+        self.indices = [OffsetIndex.get(fname, read_keys) for fname in files]
+        self.offsets = [0]
+        for index in self.indices:
+            self.offsets.append(self.offsets[-1] + len(index))
+        self.reader = None
+        self.ifile = None
+        self.last = None
+
     def __len__(self):
-        return self.reader.getNumberOfEvents()
+        return self.offsets[-1]
 
-    def __getattr__(self, key):
-        return getattr(self.events, key)
+    def __getitem__(self, iEv):
+        if iEv < 0 or iEv >= len(self):
+            raise IndexError('event {iEv} out of range'.format(iEv=iEv))
+        ifile = bisect.bisect_right(self.offsets, iEv) - 1
+        if ifile != self.ifile:
+            if self.reader is not None:
+                self.reader.close()
+            self.reader = _reader(self.files[ifile])
+            self.ifile = ifile
+            self.last = None
+        entry = iEv - self.offsets[ifile]
+        if self.last is not None and entry == self.last + 1:
+            event = self.reader.readNextEvent()
+        else:
+            run, event_number = self.indices[ifile][entry]
+            event = self.reader.readEvent(run, event_number)
+        self.last = entry
+        return event
 
     def __iter__(self):
-        return iter(self.reader)
+        for iEv in xrange(len(self)):
+            yield self[iEv]
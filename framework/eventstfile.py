@@ -1,13 +1,13 @@
 # Copyright (C) 2014 Colin Bernet
 # https://github.com/cbernet/heppy/blob/master/LICENSE
 
-from ROOT import TFile
+from heppy.framework.lazyroot import ROOT
 
 class Events(object):
     '''Event list from a tree in a root file.
     '''
     def __init__(self, filename, treename, options=None):
-        self.file = TFile(filename)
+        self.file = ROOT.TFile(filename)
         if self.file.IsZombie():
             raise ValueError('file {fnam} does not exist'.format(fnam=filename))
         self.tree = self.file.Get(treename)
@@ -2,10 +2,17 @@
 # Copyright (C) 2014 Colin Bernet
 # https://github.com/cbernet/heppy/blob/master/LICENSE
 
+import sys
+
+# the import profile is started before importing anything else
+from heppy.framework.importprofile import ImportProfile
+import_profile = ImportProfile()
+if "--import-profile" in sys.argv:
+    import_profile.start()
+
 import os
 import shutil
 import glob
-import sys
 import imp
 import copy
 import multiprocessing 
@@ -13,15 +20,16 @@ from pprint import pprint
 
 from heppy.utils.versions import Versions
 from heppy.framework.looper import Looper
+from heppy.framework.parallel_looper import ParallelLooper
+from heppy.framework.checkpoint_looper import CheckpointLooper
+from heppy.framework.chunk_scheduler import ChunkScheduler
 from heppy.framework.config import split
+from heppy.framework import lazyroot
+import heppy.framework.services.shared as shared
 
-# import root in batch mode if "-i" is not among the options
-if "-i" not in sys.argv:
-    oldv = sys.argv[:]
-    sys.argv = [ "-b-"]
-    import ROOT
-    ROOT.gROOT.SetBatch(True)
-    sys.argv = oldv
+# ROOT is imported when needed,
+# in batch mode if "-i" is not among the options
+lazyroot.batch = "-i" not in sys.argv
 
 
 # global, to be used interactively when only one component is processed.
@@ -52,14 +60,52 @@ def runLoop( comp, outDir, config, cfgFileName, options):
     # import pdb; pdb.set_trace()
     config.components = [comp]
     memcheck = 2 if getattr(options,'memCheck',False) else -1
-    loop = Looper( fullName,
-                   config,
-                   options.nevents, 0,
-                   nPrint = options.nprint, 
-                   quiet = options.quiet,
-                   memCheckFromEvent = memcheck,
-                   stopFlag = _globalGracefulStopFlag
-                   )
+    nworkers = getattr(options, 'nworkers', 1)
+    checkpoints = getattr(options, 'checkpointEvents', None) or \
+                  getattr(options, 'checkpointTime', None) or \
+                  getattr(options, 'resume', False) or \
+                  getattr(options, 'maxRSS', None)
+    if checkpoints and options.iEvent is None:
+        if nworkers > 1:
+            print "WARNING: checkpointing, ignoring the number of workers."
+        loop = CheckpointLooper( fullName,
+                                 config,
+                                 options.nevents, 0,
+                                 nPrint = options.nprint,
+                                 quiet = options.quiet,
+                                 memCheckFromEvent = memcheck,
+                                 stopFlag = _globalGracefulStopFlag,
+                                 prefetch = options.prefetch,
+                                 checkpointEvents = options.checkpointEvents,
+                                 checkpointTime = options.checkpointTime,
+                                 resume = options.resume,
+                                 maxRSS = getattr(options, 'maxRSS', None)
+                                 )
+    elif nworkers > 1 and options.iEvent is None:
+        loop = ParallelLooper( fullName,
+                               config,
+                               nworkers,
+                               options.nevents, 0,
+                               nPrint = options.nprint,
+                               quiet = options.quiet,
+                               memCheckFromEvent = memcheck,
+                               stopFlag = _globalGracefulStopFlag,
+                               prefetch = options.prefetch
+                               )
+    else:
+        loop = Looper( fullName,
+                       config,
+                       options.nevents, 0,
+                       nPrint = options.nprint, 
+                       quiet = options.quiet,
+                       memCheckFromEvent = memcheck,
+                       stopFlag = _globalGracefulStopFlag,
+                       prefetch = options.prefetch
+                       )
+    if import_profile.active():
+        # startup done: configuration loaded, and analyzers built
+        import_profile.stop()
+        print import_profile
     shutil.copy( cfgFileName, loop.outDir )
     shutil.copy( cfgFileName, '/'.join([loop.outDir, '__cfg_to_run__.py'] ) )            
     # print loop
@@ -152,26 +198,39 @@ def main( options, args, parser ):
                            cfgFileName, file)
     
     selComps = [comp for comp in cfg.config.components if len(comp.files)>0]
-    selComps = split(selComps)
+    selComps = split(selComps, cfg.config.events_class)
+    if len(selComps)>1 and import_profile.active():
+        # startup done: the analyzers are built in the worker processes
+        import_profile.stop()
+        print import_profile
 
     # track the versions
     versions = None
     cfg.config.versions = Versions(cfgFileName)
     if len(selComps)>options.ntasks:
         print "WARNING: too many threads {tnum}, will just use a maximum of {jnum}.".format(tnum=len(selComps),jnum=options.ntasks)
-    if not createOutputDir(outDir, selComps, options.force):
+    if not createOutputDir(outDir, selComps, options.force or options.resume):
         print 'exiting'
         sys.exit(1)
+    if len(selComps)>1 and options.nworkers>1:
+        print "WARNING: several jobs to run, ignoring the number of workers per job."
+        options.nworkers = 1
     if len(selComps)>1:
-        pool = multiprocessing.Pool(processes=min(len(selComps),options.ntasks))
-        ## workaround for a scoping problem in ipython+multiprocessing
-        import heppy.framework.heppy_loop as ML 
-        for comp in selComps:
-            pool.apply_async( ML.runLoopAsync,
-                              [comp, outDir, '__cfg_to_run__', cfgFileName, options],
-                              callback=ML.callBack)
-        pool.close()
-        pool.join()
+        # the shared services are built once, and inherited by the jobs
+        shared.build(cfg.config.services, None, outDir)
+        scheduler = ChunkScheduler(selComps, outDir, cfg.config, cfgFileName,
+                                   options, options.ntasks,
+                                   retries=options.retries,
+                                   stopFlag=_globalGracefulStopFlag,
+                                   progress=options.progress)
+        try:
+            failed = scheduler.run()
+        finally:
+            shared.release()
+        if failed:
+            print 'ERROR: failed to process {n} chunks: {names}'.format(
+                n=len(failed), names=', '.join(failed))
+            sys.exit(4)
     else:
         # when running only one loop, do not use multiprocessor module.
         # then, the exceptions are visible -> use only one sample for testing
@@ -232,6 +291,51 @@ def create_parser():
                       type="int",
                       help="number of parallel tasks to span",
                       default=10)
+    parser.add_option("-w", "--nworkers",
+                      dest="nworkers",
+                      type="int",
+                      help="number of worker processes sharing the events of a single job. ignored if several jobs are run.",
+                      default=1)
+    parser.add_option("--retries",
+                      dest="retries",
+                      type="int",
+                      help="number of times a failed chunk is processed again",
+                      default=0)
+    parser.add_option("--progress",
+                      dest="progress",
+                      type="float",
+                      help="period of the progress summary in seconds, when several jobs are run. 0 to disable.",
+                      default=10.)
+    parser.add_option("--prefetch",
+                      dest="prefetch",
+                      type="int",
+                      help="number of events to read in advance in a background thread",
+                      default=0)
+    parser.add_option("--checkpoint-events",
+                      dest="checkpointEvents",
+                      type="int",
+                      help="save a checkpoint every given number of events",
+                      default=None)
+    parser.add_option("--checkpoint-time",
+                      dest="checkpointTime",
+                      type="float",
+                      help="save a checkpoint every given number of seconds",
+                      default=None)
+    parser.add_option("--resume",
+                      dest="resume",
+                      action='store_true',
+                      help="resume the processing from the last checkpoint in the output directory",
+                      default=False)
+    parser.add_option("--max-rss",
+                      dest="maxRSS",
+                      type="float",
+                      help="maximum resident set size in MB. When exceeded, the processing stops after saving a checkpoint, and can be resumed with --resume",
+                      default=None)
+    parser.add_option("--import-profile",
+                      dest="importProfile",
+                      action='store_true',
+                      help="print the time spent importing modules during the startup",
+                      default=False)
     parser.add_option("--memcheck", 
                       dest="memCheck",
                       action='store_true',
@@ -0,0 +1,96 @@
+'''Measures the time spent importing modules, see heppy_loop --import-profile.'''
+
+import __builtin__
+import sys
+import time
+
+
+class ImportProfile(object):
+    '''Records, for each imported module:
+     - the cumulative time, including the imports done by this module.
+     - the self time, excluding these imports.
+
+    Example::
+
+      profile = ImportProfile()
+      profile.start()
+      import heppy.framework.looper
+      profile.stop()
+      print profile
+    '''
+
+    def __init__(self):
+        self.times = dict()
+        self.total = 0.
+        self._import = None
+        self._nested = []
+        self._start = None
+
+    def start(self):
+        '''Starts recording the imports.'''
+        if self._import is not None:
+            return
+        self._import = __builtin__.__import__
+        __builtin__.__import__ = self._timed_import
+        self._start = time.time()
+
+    def stop(self):
+        '''Stops recording the imports.'''
+        if self._import is None:
+            return
+        __builtin__.__import__ = self._import
+        self._import = None
+        self.total += time.time() - self._start
+
+    def active(self):
+        return self._import is not None
+
+    def _timed_import(self, name, globals=None, locals=None,
+                      fromlist=None, level=-1):
+        if name in sys.modules:
+            return self._import(name, globals, locals, fromlist, level)
+        self._nested.append(0.)
+        start = time.time()
+        try:
+            return self._import(name, globals, locals, fromlist, level)
+        finally:
+            elapsed = time.time() - start
+            nested = self._nested.pop()
+            if self._nested:
+                self._nested[-1] += elapsed
+            module = self._module_name(name, globals, level)
+            cumulative, selftime = self.times.get(module, (0., 0.))
+            self.times[module] = (cumulative + elapsed,
+                                  selftime + elapsed - nested)
+
+    def _module_name(self, name, globals, level):
+        '''Full name of the imported module,
+        also for implicit relative imports.'''
+        if level == 0 or not globals or not name:
+            return name
+        package = globals.get('__package__')
+        if not package:
+            package = globals.get('__name__', '')
+            if '__path__' not in globals:
+                package = package.rpartition('.')[0]
+        if package:
+            fullname = '.'.join([package, name])
+            if sys.modules.get(fullname) is not None:
+                return fullname
+        return name
+
+    def report(self, nmodules=20):
+        '''Returns a list of (module, cumulative time, self time)
+        for the nmodules modules with the largest self time.'''
+        report = [(module, cumulative, selftime)
+                  for module, (cumulative, selftime) in self.times.iteritems()]
+        report.sort(key=lambda entry: entry[2], reverse=True)
+        return report[:nmodules]
+
+    def __str__(self):
+        lines = ['import profile: {total:.3f} s, {n} modules'.format(
+            total=self.total, n=len(self.times))]
+        lines.append('{:>10} {:>10}  {}'.format('self [s]', 'cumul [s]', 'module'))
+        for module, cumulative, selftime in self.report():
+            lines.append('{:10.3f} {:10.3f}  {}'.format(selftime, cumulative, module))
+        return '\n'.join(lines)
@@ -0,0 +1,89 @@
+'''Lazy access to ROOT.
+
+Importing ROOT takes several seconds, which dominates the processing time
+of short jobs. Modules use the ROOT object defined here instead of
+importing ROOT at module import time::
+
+  from heppy.framework.lazyroot import ROOT
+
+  def p4(self):
+      return ROOT.TLorentzVector()
+
+ROOT is imported at the first access to one of its attributes.
+
+Modules importing ROOT directly, e.g. analyzers doing
+from ROOT import TLorentzVector, go through L{load} as well,
+so that ROOT is always set up in the same way:
+the command line options are not passed to ROOT,
+and the batch mode is set if L{batch} is True.
+'''
+
+import sys
+
+# set to True to import ROOT in batch mode, see heppy_loop
+batch = False
+
+_module = None
+
+
+def load():
+    '''Imports ROOT if needed, and returns the ROOT module.'''
+    global _module
+    if _module is None:
+        argv = sys.argv
+        if batch:
+            # prevents ROOT from opening the graphics
+            sys.argv = ['-b-']
+        _finder.loading = True
+        try:
+            import ROOT as module
+        finally:
+            sys.argv = argv
+            _finder.loading = False
+        module.PyConfig.IgnoreCommandLineOptions = True
+        if batch:
+            module.gROOT.SetBatch(True)
+        _module = module
+    return _module
+
+
+def loaded():
+    '''True if ROOT was imported.'''
+    return _module is not None
+
+
+class _ROOT(object):
+    '''Stands for the ROOT module, and imports it when needed.'''
+
+    def __getattr__(self, name):
+        attr = getattr(load(), name)
+        if isinstance(attr, type):
+            # next accesses to the class do not go through __getattr__.
+            # globals like gPad can change and are not cached.
+            self.__dict__[name] = attr
+        return attr
+
+    def __repr__(self):
+        if loaded():
+            return repr(_module)
+        return '<ROOT, not imported yet>'
+
+
+class _Finder(object):
+    '''Import hook sending the first import ROOT to L{load}.'''
+
+    loading = False
+
+    def find_module(self, fullname, path=None):
+        if fullname == 'ROOT' and not self.loading and _module is None:
+            return self
+        return None
+
+    def load_module(self, fullname):
+        return load()
+
+
+ROOT = _ROOT()
+
+_finder = _Finder()
+sys.meta_path.append(_finder)
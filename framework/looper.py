@@ -1,12 +1,11 @@
 # Copyright (C) 2014 Colin Bernet
 # https://github.com/cbernet/heppy/blob/master/LICENSE
 
-import ROOT 
-ROOT.PyConfig.IgnoreCommandLineOptions = True
-
 import os
+import re
 import sys
 import imp
+import bisect
 import logging
 import pprint
 from math import ceil
@@ -18,8 +17,20 @@ import pickle
 import copy
 
 from event import Event
+from heppy.framework.products import ProductRegistry
+from heppy.framework.scheduler import schedule
 from heppy.framework.exceptions import UserStop
+from heppy.framework.prefetch import Prefetcher
+from heppy.framework.profiler import AnalyzerProfiler
+from heppy.framework.eventindex import EventIndex
+from heppy.framework.entries import EntryCounts
+from heppy.framework.batch import EventBatch, ReleasedInput
+import heppy.framework.pools as pools
+import heppy.statistics.rrandom as random
+import heppy.framework.services.shared as shared
 from heppy.statistics.counter import Counter
+from heppy.statistics.timing import TimingReport
+from heppy.statistics.summary import Summary
 
 class Setup(object):
     '''The Looper creates a Setup object to hold information relevant during 
@@ -48,11 +59,16 @@ class Setup(object):
         '''
         self.config = config
         self.services = services
+        # counters and averages of the analyzers, see Analyzer.write
+        self.summary = Summary()
         
     def close(self):
         '''Stop all services'''
-        for service in self.services.values():
-            service.stop()
+        for name, service in self.services.iteritems():
+            if shared.is_shared(name):
+                shared.close(name)
+            else:
+                service.stop()
         
 
 class Looper(object):
@@ -66,7 +82,8 @@ class Looper(object):
                   timeReport=True,
                   quiet=False,
                   memCheckFromEvent=-1,
-                  stopFlag = None):
+                  stopFlag = None,
+                  prefetch = 0):
         """Handles the processing of an event sample.
         An Analyzer is built for each Config.Analyzer present
         in sequence. The Looper can then be used to process an event,
@@ -84,6 +101,10 @@ class Looper(object):
                   a graceful job termination. In this case, the looper will also
                   set up a signal handler for SIGUSR2.
                   (if set to None, nothing of all this happens)
+
+        prefetch: number of events to read in advance in a background thread,
+                  see L{Prefetcher<heppy.framework.prefetch.Prefetcher>}.
+                  No prefetching if set to 0.
         """
 
         self.config = config
@@ -105,15 +126,33 @@ class Looper(object):
         # and in a dict for easy user access
         self._analyzer_dict = dict()
         self.analyzer_counter = Counter('analyzers')
-        for anacfg in self.config.sequence:
+        sequence = self.config.sequence
+        if getattr(self.config, 'optimize_sequence', False):
+            sequence, report = schedule(sequence)
+            for name in report['removed']:
+                self.logger.warning('analyzer {name} removed, as its outputs are not used'.format(name=name))
+            for name, old, new in report['moved']:
+                self.logger.info('filter {name} moved from position {old} to {new}'.format(
+                    name=name, old=old, new=new))
+        for anacfg in sequence:
             anaobj = self._build(anacfg)
             self._analyzers.append(anaobj)
             self._analyzer_dict[anacfg.name] = anaobj
             self.analyzer_counter.register(anacfg.name)
+        # producers and readers of the event products
+        self.products = ProductRegistry([ana.name for ana in self._analyzers])
+        self.freeProducts = getattr(config, 'free_products', False)
+        # profilers of the analyzers with profile=True in their configuration
+        self.profilers = [
+            AnalyzerProfiler(ana.name, getattr(ana.cfg_ana, 'profile_sample', 100))
+            if getattr(ana.cfg_ana, 'profile', False) else None
+            for ana in self._analyzers
+        ]
         self.nEvents = nEvents
         self.firstEvent = firstEvent
         self.nPrint = int(nPrint)
         self.timeReport = [ {'time':0.0,'events':0} for a in self._analyzers ] if timeReport else False
+        self.timing = TimingReport([ana.name for ana in self._analyzers]) if timeReport else None
         self.memReportFirstEvent = memCheckFromEvent
         self.memLast=0
         self.stopFlag = stopFlag
@@ -134,13 +173,36 @@ class Looper(object):
                                                     self.outDir,
                                                     firstEvent,
                                                     nEvents)
+        def make_events():
+            if hasattr(self.cfg_comp,"options"):
+                return config.events_class(self.cfg_comp.files,
+                                           tree_name,
+                                           options=self.cfg_comp.options)
+            else :
+                return config.events_class(self.cfg_comp.files, tree_name)
         if hasattr(self.cfg_comp,"options"):
             print self.cfg_comp.files,self.cfg_comp.options
-            self.events = config.events_class(self.cfg_comp.files,
-                                              tree_name,
-                                              options=self.cfg_comp.options)
-        else :
-            self.events = config.events_class(self.cfg_comp.files, tree_name)
+        self.events = make_events()
+        if prefetch:
+            if hasattr(self.events, '__getitem__'):
+                self.events = Prefetcher(self.events, make_events, prefetch)
+            else:
+                self.logger.warning('events backend does not support indexing, prefetching disabled')
+        # number of events processed at once, see _run_analyzers_on_batch
+        self.batchSize = getattr(config, 'batch_size', 0)
+        # events released after processing, see _release
+        self.memoryBounded = getattr(config, 'memory_bounded', False)
+        if self.batchSize and not hasattr(self.events, '__getitem__'):
+            self.logger.warning('events backend does not support indexing, batch processing disabled')
+            self.batchSize = 0
+        # the analyzers before the first one with a process_batch method
+        # read the input, and process each event as soon as it is read,
+        # see _loop_batches
+        self.batchInput = len(self._analyzers)
+        for i, analyzer in enumerate(self._analyzers):
+            if hasattr(analyzer, 'process_batch'):
+                self.batchInput = i
+                break
         if hasattr(self.cfg_comp, 'fineSplit'):
             fineSplitIndex, fineSplitFactor = self.cfg_comp.fineSplit
             if fineSplitFactor > 1:
@@ -152,11 +214,53 @@ class Looper(object):
                 if self.firstEvent + self.nEvents >= totevents:
                     self.nEvents = totevents - self.firstEvent 
                 #print "For component %s will process %d events starting from the %d one, ending at %d excluded" % (self.cfg_comp.name, self.nEvents, self.firstEvent, self.nEvents + self.firstEvent)
+        if hasattr(self.cfg_comp, 'eventRanges'):
+            # contiguous event ranges in the input files, see config.split
+            ranges = self.cfg_comp.eventRanges
+            if [fname for fname, first, nev in ranges] != list(self.cfg_comp.files) or \
+               any(first != 0 for fname, first, nev in ranges[1:]):
+                raise ValueError('event ranges not contiguous in the files of {name}: {ranges}'.format(
+                    name=self.cfg_comp.name, ranges=ranges))
+            totevents = sum(nev for fname, first, nev in ranges)
+            if nEvents and int(nEvents) not in [-1,0]:
+                totevents = min(totevents, int(nEvents))
+            self.firstEvent = firstEvent + ranges[0][1]
+            self.nEvents = totevents
+        self.eventIndex = None
+        if getattr(self.cfg_comp, 'event_index', None):
+            # only the entries selected in the event index are processed
+            if not hasattr(self.events, '__getitem__'):
+                raise ValueError('cannot use an event index with {evclass}, which does not support indexing'.format(
+                    evclass=config.events_class))
+            self.eventIndex = EventIndex.load(self.cfg_comp.event_index)
+            counts = EntryCounts()
+            self.selectedEntries = self.eventIndex.chain_entries(
+                self.cfg_comp.files,
+                lambda fname: counts.count(fname, tree_name, config.events_class)
+            )
+            counts.save()
+        # random streams of the analyzers, see _random_stream
+        self.randomSeed = getattr(config, 'random_seed', None)
+        if self.randomSeed is not None:
+            # the name of the component before splitting in chunks
+            self.randomComponent = re.sub('_Chunk[0-9]+$', '', self.cfg_comp.name)
+            # entry number of the first event of each file
+            self.fileOffsets = [0]
+            if len(self.cfg_comp.files) > 1:
+                counts = EntryCounts()
+                for fname in self.cfg_comp.files[:-1]:
+                    self.fileOffsets.append(self.fileOffsets[-1] + counts.count(
+                        fname, tree_name, config.events_class))
+                counts.save()
         # self.event is set in self.process
         self.event = None
         services = dict()
         for cfg_serv in config.services:
-            service = self._build(cfg_serv)
+            if getattr(cfg_serv, 'shared', False):
+                # possibly built before forking this process
+                service = shared.service(cfg_serv, self.cfg_comp, self.outDir)
+            else:
+                service = self._build(cfg_serv)
             services[cfg_serv.name] = service
         # would like to provide a copy of the config to the setup,
         # so that analyzers cannot modify the config of other analyzers. 
@@ -209,6 +313,9 @@ The looper is trying to build an analyzer configured by {errfgmt}.
 Make sure that the configuration object is of class cfg.Analyzer.
             '''.format(errfgmt=errfgmt)
             raise ValueError(err)
+        if isinstance(theClass, basestring):
+            # class given by name in the configuration, imported now
+            theClass = cfg.load_class()
         obj = theClass( cfg, self.cfg_comp, self.outDir )
         return obj
       
@@ -254,12 +361,17 @@ Make sure that the configuration object is of class cfg.Analyzer.
                     self.start_time = timeit.default_timer()
                     self.start_time_event = iEv
                 else:
-                    self.logger.warning( 'event %d (%.1f ev/s)' % (iEv, (iEv-self.start_time_event)/float(timeit.default_timer() - self.start_time)) )
+                    # the throughput over time is recorded in timing.json
+                    self.logger.info( 'event %d (%.1f ev/s)' % (iEv, (iEv-self.start_time_event)/float(timeit.default_timer() - self.start_time)) )
 
         nEvents = self.nEvents
         firstEvent = self.firstEvent
         iEv = firstEvent
         self.nEvProcessed = 0
+        # entry following the last processed event,
+        # and whether the loop was stopped by an analyzer
+        self.nextEntry = firstEvent
+        self.userStop = False
         if nEvents is None or int(nEvents)-firstEvent > len(self.events) :
             nEvents = len(self.events) - firstEvent
         else:
@@ -269,22 +381,36 @@ Make sure that the configuration object is of class cfg.Analyzer.
                 'to process {nEvents} events.'.format(firstEvent=firstEvent,
                                                         nEvents=nEvents))
         self.logger.info( str( self.cfg_comp ) )
+        if self.eventIndex is not None:
+            self.logger.info( str( self.eventIndex ) )
         for analyzer in self._analyzers:
             analyzer.beginLoop(self.setup)
-
-        if hasattr(self.events, '__getitem__'):
+        if self.timing:
+            self.timing.start()
+        if self.memoryBounded:
+            pools.enable()
+
+        if self.batchSize:
+            self._loop_batches(self._entries(firstEvent, nEvents),
+                               initialize_timer)
+        elif hasattr(self.events, '__getitem__'):
             # events backend supports indexing, e.g. CMS, FCC, bare root
-            for iEv in range(firstEvent, firstEvent+nEvents):
+            for iEv in self._entries(firstEvent, nEvents):
                 initialize_timer(iEv)
                 try:
                     self.process( iEv )
                     self.nEvProcessed += 1
+                    self.nextEntry = iEv + 1
+                    if self.timing:
+                        self.timing.tick()
                     if iEv<self.nPrint:
                         self.logger.info(self.event.__str__())
+                    self._release([self.event])
                     if self.stopFlag and self.stopFlag.value:
                         print 'stopping gracefully at event %d' % (iEv)
                         break
                 except UserStop as err:
+                    self.userStop = True
                     print 'Stopped loop following a UserStop exception:'
                     print err
                     break
@@ -297,23 +423,119 @@ Make sure that the configuration object is of class cfg.Analyzer.
                 initialize_timer(iEv)
                 iEv += 1
                 try:
-                    self.event = Event(iEv, event, self.setup)
+                    self.event = Event(iEv, event, self.setup,
+                                       registry=self.products)
                     self.iEvent = iEv
                     self._run_analyzers_on_event()
                     self.nEvProcessed += 1
+                    self.nextEntry = ii + 1
+                    if self.timing:
+                        self.timing.tick()
                     if iEv<self.nPrint:
                         self.logger.info(self.event.__str__())
+                    self._release([self.event])
                     if self.stopFlag and self.stopFlag.value:
                         print 'stopping gracefully at event %d' % (iEv)
                         break
                 except UserStop as err:
+                    self.userStop = True
                     print 'Stopped loop following a UserStop exception:'
                     print err
                     break            
+        if isinstance(self.events, Prefetcher):
+            self.events.stop()
+        if self.memoryBounded:
+            pools.enable(False)
         for analyzer in self._analyzers:
             analyzer.endLoop(self.setup)            
+        for profiler in self.profilers:
+            if profiler:
+                profiler.endLoop()
         self._write_log()
 
+    def _loop_batches(self, entries, initialize_timer):
+        '''Process the entries by blocks of self.batchSize events.
+
+        Most events backends return the same object for all entries,
+        positioned on the entry being read. Each event is therefore processed
+        by the analyzers reading the input, the analyzers placed before
+        the first one with a process_batch method, as soon as it is read.
+        The input of the event is then replaced by a
+        L{ReleasedInput<heppy.framework.batch.ReleasedInput>},
+        unless the backend declares independent_entries = True,
+        and the other analyzers process the block.
+
+        The stop flag is checked after each event is read, as when processing
+        events one by one, and the block read so far is then processed.
+        The events of a block are counted as processed once all analyzers
+        are done with the block. If a UserStop is raised during a block,
+        the events of this block are not counted, and self.nextEntry is
+        the first entry of the block.
+        '''
+        independent = getattr(self.events, 'independent_entries', False)
+        entries = iter(entries)
+        stop = False
+        while not stop:
+            events = []
+            readTime = 0.
+            try:
+                for iEv in entries:
+                    initialize_timer(iEv)
+                    start = timeit.default_timer()
+                    event = Event(iEv, self.events[iEv], self.setup,
+                                  registry=self.products)
+                    events.append(event)
+                    self._run_stages([event], 0, self.batchInput)
+                    if not independent:
+                        event.input = ReleasedInput(iEv)
+                    readTime += timeit.default_timer() - start
+                    if self.stopFlag and self.stopFlag.value:
+                        print 'stopping gracefully at event %d' % (iEv)
+                        stop = True
+                        break
+                    if len(events) == self.batchSize:
+                        break
+                if not events:
+                    break
+                self._run_analyzers_on_batch(events, readTime)
+                self.nEvProcessed += len(events)
+                self.nextEntry = events[-1].iEv + 1
+            except UserStop as err:
+                self.userStop = True
+                print 'Stopped loop following a UserStop exception:'
+                print err
+                break
+            for event in events:
+                if self.timing:
+                    self.timing.tick()
+                if event.iEv<self.nPrint:
+                    self.logger.info(event.__str__())
+            self._release(events)
+
+    def _release(self, events):
+        '''In memory-bounded mode, deletes the products of the processed events,
+        and gives back the objects taken from the pools during these events.'''
+        if not self.memoryBounded:
+            return
+        for event in events:
+            event.clear()
+        pools.release_all()
+
+    def _entries(self, firstEvent, nEvents):
+        '''Returns the entries to be processed, from firstEvent
+        to firstEvent+nEvents (excluded).
+
+        If an event index is used, only the selected entries are returned.
+        '''
+        if self.eventIndex is None:
+            return xrange(firstEvent, firstEvent+nEvents)
+        selected = self.selectedEntries
+        selected = selected[(selected >= firstEvent) &
+                            (selected < firstEvent+nEvents)].tolist()
+        if isinstance(self.events, Prefetcher):
+            self.events.set_entries(selected)
+        return selected
+
     def _write_log(self):
         warning = self.logger.warning
         warning('')
@@ -336,7 +558,24 @@ Make sure that the configuration object is of class cfg.Analyzer.
             warning("%9s   %9s    %9s   %9s   %s" % ("---------","--------","---------", "---------", "-------------"))
             warning("%9d   %9d   %10.2f  %10.2f %5.1f%%   %s" % ( passev, allev, 1000*totPerProcEv, 1000*totPerAllEv, 100.0, "TOTAL"))
             warning("")
+            warning( self.timing )
+            warning("")
+            if isinstance(self.events, Prefetcher):
+                report = self.events.report()
+                stallPerEv = report['stall_time']/report['entries'] if report['entries'] else 0
+                warning("      ---- Prefetch (depth %d) ---- " % report['depth'])
+                warning("mean queue depth  %6.2f" % report['mean_queue_depth'])
+                warning("stall time        %6.2f ms/event, %.1f s in total" % (1000*stallPerEv, report['stall_time']))
+                warning("restarts          %6d" % report['restarts'])
+                warning("")
         warning( self.analyzer_counter )
+        warning( self.products )
+        if self.memoryBounded:
+            warning("      ---- Object pools ---- ")
+            warning("%16s %10s %10s" % ("pool", "created", "reused"))
+            for name, created, reused in pools.report():
+                warning("%16s %10d %10d" % (name, created, reused))
+            warning("")
         # the following must be printed to the log file in all cases,
         # as the heppy batch scripts rely on this line to decide whether
         # processing is succesful.
@@ -362,24 +601,128 @@ However, you may still iterate on your events using Loop.loop,
 possibly skipping a number of events at the beginning.
 '''.format(evclass=self.events.__class__)
             raise TypeError(msg)
-        self.event = Event(iEv, self.events[iEv], self.setup)            
+        self.event = Event(iEv, self.events[iEv], self.setup,
+                           registry=self.products)
         self.iEvent = iEv
         return self._run_analyzers_on_event()
 
+    def _run_analyzers_on_batch(self, events, readTime=0.):
+        '''Run the analyzers on a block of events,
+        already processed by the analyzers reading the input, see L{_loop_batches}.
+
+        The analyzers with a process_batch method process all events
+        at once, see L{EventBatch<heppy.framework.batch.EventBatch>},
+        and the other analyzers process the events one by one.
+        Each analyzer only gets the events selected by the previous ones.
+
+        readTime is the time spent reading and processing the events
+        in _loop_batches.
+        '''
+        eventStart = timeit.default_timer()
+        selected = [event for event in events
+                    if all(ret for analyzer, ret in event.analyzers)]
+        self._run_stages(selected, self.batchInput, len(self._analyzers))
+        for event in events:
+            self.products.end_event()
+        if self.timing:
+            elapsed = timeit.default_timer() - eventStart + readTime
+            for event in events:
+                self.timing.event.add(elapsed / len(events))
+        self.event = events[-1]
+
+    def _run_stages(self, events, first, last):
+        '''Run the analyzers from position first to last (excluded)
+        in the sequence on events, and returns the selected events.'''
+        active = events
+        for i in xrange(first, last):
+            analyzer = self._analyzers[i]
+            if not active:
+                break
+            if not analyzer.beginLoopCalled:
+                analyzer.beginLoop(self.setup)
+            start = timeit.default_timer()
+            profiler = self.profilers[i]
+            if profiler:
+                profiler.start()
+            self.products.current = analyzer.name
+            try:
+                if hasattr(analyzer, 'process_batch') and self.randomSeed is not None:
+                    # each event gets its own random stream,
+                    # whatever the size of the block
+                    rets = []
+                    for event in active:
+                        self._random_stream(event.iEv, analyzer)
+                        ret = analyzer.process_batch(EventBatch([event]))
+                        rets.append(True if ret is None else ret[0])
+                elif hasattr(analyzer, 'process_batch'):
+                    rets = analyzer.process_batch(EventBatch(active))
+                    if rets is None:
+                        rets = [True] * len(active)
+                else:
+                    rets = []
+                    for event in active:
+                        self.event = event
+                        self.iEvent = event.iEv
+                        if self.randomSeed is not None:
+                            self._random_stream(event.iEv, analyzer)
+                        rets.append(analyzer.process(event))
+                rets = [True if ret is None else bool(ret) for ret in rets]
+            finally:
+                self.products.current = None
+                if profiler:
+                    profiler.stop()
+            if self.timeReport:
+                elapsed = timeit.default_timer() - start
+                self.timeReport[i]['events'] += len(active)
+                self.timeReport[i]['time'] += elapsed
+                for event in active:
+                    self.timing.analyzers[i].add(elapsed / len(active))
+            for event, ret in zip(active, rets):
+                event.analyzers.append((analyzer, ret))
+            active = [event for event, ret in zip(active, rets) if ret]
+            self.analyzer_counter.inc(analyzer.name, len(active))
+            if self.freeProducts and not self.products.learning():
+                for name in self.products.unused_after(i):
+                    for event in active:
+                        event.free(name, analyzer.name)
+        return active
+
+    def _random_stream(self, iEv, analyzer):
+        '''Starts the random stream of analyzer for event iEv.
+
+        The stream is identified by the input file and the entry of the event
+        in this file, so that it does not depend on the splitting in chunks.
+        The full path of the file is used, as files with the same name
+        may be in different directories.
+        '''
+        ifile = bisect.bisect_right(self.fileOffsets, iEv) - 1
+        random.stream(self.randomSeed,
+                      self.randomComponent,
+                      os.path.normpath(self.cfg_comp.files[ifile]),
+                      iEv - self.fileOffsets[ifile],
+                      analyzer.name)
+
     def _run_analyzers_on_event(self):
         '''Run all analysers on the current event, self.event. 
         Returns a tuple (success?, last_analyzer_name).
         '''
+        eventStart = timeit.default_timer()
         for i,analyzer in enumerate(self._analyzers):
             if not analyzer.beginLoopCalled:
                 analyzer.beginLoop(self.setup)
             start = timeit.default_timer()
-            if self.memReportFirstEvent >=0 and iEv >= self.memReportFirstEvent:           
+            if self.memReportFirstEvent >=0 and self.iEvent >= self.memReportFirstEvent:           
                 memNow=resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
                 if memNow > self.memLast :
-                    print  "Mem Jump detected before analyzer %s at event %s. RSS(before,after,difference) %s %s %s "%( analyzer.name, iEv, self.memLast, memNow, memNow-self.memLast)
+                    print  "Mem Jump detected before analyzer %s at event %s. RSS(before,after,difference) %s %s %s "%( analyzer.name, self.iEvent, self.memLast, memNow, memNow-self.memLast)
                 self.memLast=memNow
             ret = False
+            profiler = self.profilers[i]
+            if profiler:
+                profiler.start()
+            self.products.current = analyzer.name
+            if self.randomSeed is not None:
+                self._random_stream(self.event.iEv, analyzer)
             try:
                 ret = analyzer.process( self.event )
                 ret = True if ret is None else ret
@@ -396,20 +739,32 @@ possibly skipping a number of events at the beginning.
 ##                    )
                     pass
                 raise 
-            if self.memReportFirstEvent >=0 and iEv >= self.memReportFirstEvent:           
+            finally:
+                self.products.current = None
+                if profiler:
+                    profiler.stop()
+            if self.memReportFirstEvent >=0 and self.iEvent >= self.memReportFirstEvent:           
                 memNow=resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
                 if memNow > self.memLast :
-                    print "Mem Jump detected in analyzer %s at event %s. RSS(before,after,difference) %s %s %s "%( analyzer.name, iEv, self.memLast, memNow, memNow-self.memLast)
+                    print "Mem Jump detected in analyzer %s at event %s. RSS(before,after,difference) %s %s %s "%( analyzer.name, self.iEvent, self.memLast, memNow, memNow-self.memLast)
                 self.memLast=memNow
             if self.timeReport:
+                elapsed = timeit.default_timer() - start
                 self.timeReport[i]['events'] += 1
                 if self.timeReport[i]['events'] > 0:
-                    self.timeReport[i]['time'] += timeit.default_timer() - start                  
+                    self.timeReport[i]['time'] += elapsed
+                self.timing.analyzers[i].add(elapsed)
             if ret == False:
-                return (False, analyzer.name)
+                break
             else:
                 self.analyzer_counter.inc(analyzer.name)                
-        return (True, analyzer.name)
+            if self.freeProducts and not self.products.learning():
+                for name in self.products.unused_after(i):
+                    self.event.free(name, analyzer.name)
+        self.products.end_event()
+        if self.timing:
+            self.timing.event.add(timeit.default_timer() - eventStart)
+        return (ret != False, analyzer.name)
 
     def write(self):
         """Writes the configuration, the software versions,
@@ -417,9 +772,17 @@ possibly skipping a number of events at the beginning.
 
         See Analyzer.Write for more information.
         """
-        for analyzer in self._analyzers:
+        for analyzer, profiler in zip(self._analyzers, self.profilers):
             analyzer.write(self.setup)
+            if profiler:
+                profiler.write(analyzer.dirName)
         self.setup.close()
+        self.setup.summary.write(self.outDir)
+        self.products.write(self.outDir)
+        # written last, so that its presence indicates
+        # that all outputs have been written.
+        if self.timing:
+            self.timing.write(self.outDir)
         
         
 
@@ -444,6 +807,48 @@ if __name__ == '__main__':
           help="number of events to process",
           default=None
     )    
+    parser.add_option(
+        "-w", "--nworkers",
+          dest="nworkers",
+          type="int",
+          help="number of worker processes sharing the events",
+          default=1
+    )
+    parser.add_option(
+        "--prefetch",
+          dest="prefetch",
+          type="int",
+          help="number of events to read in advance in a background thread",
+          default=0
+    )
+    parser.add_option(
+        "--checkpoint-events",
+          dest="checkpointEvents",
+          type="int",
+          help="save a checkpoint every given number of events",
+          default=None
+    )
+    parser.add_option(
+        "--checkpoint-time",
+          dest="checkpointTime",
+          type="float",
+          help="save a checkpoint every given number of seconds",
+          default=None
+    )
+    parser.add_option(
+        "--resume",
+          dest="resume",
+          action='store_true',
+          help="resume the processing from the last checkpoint",
+          default=False
+    )
+    parser.add_option(
+        "--max-rss",
+          dest="maxRSS",
+          type="float",
+          help="maximum resident set size in MB, stop after a checkpoint when exceeded",
+          default=None
+    )
     (options,args) = parser.parse_args()
 
     if options.options!='':
@@ -469,7 +874,24 @@ if __name__ == '__main__':
     comp = config.components[0]
     events_class = config.events_class
 
-    looper = Looper( 'Loop', config, nPrint = 5, nEvents=options.nevents)
+    if options.checkpointEvents or options.checkpointTime or options.resume or \
+       options.maxRSS:
+        from heppy.framework.checkpoint_looper import CheckpointLooper
+        looper = CheckpointLooper( 'Loop', config,
+                                   nPrint = 5, nEvents=options.nevents,
+                                   prefetch=options.prefetch,
+                                   checkpointEvents=options.checkpointEvents,
+                                   checkpointTime=options.checkpointTime,
+                                   resume=options.resume,
+                                   maxRSS=options.maxRSS)
+    elif options.nworkers > 1:
+        from heppy.framework.parallel_looper import ParallelLooper
+        looper = ParallelLooper( 'Loop', config, options.nworkers,
+                                 nPrint = 5, nEvents=options.nevents,
+                                 prefetch=options.prefetch)
+    else:
+        looper = Looper( 'Loop', config, nPrint = 5, nEvents=options.nevents,
+                         prefetch=options.prefetch)
     looper.loop()
     looper.write()
 
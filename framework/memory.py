@@ -0,0 +1,20 @@
+'''Memory usage of the current process.'''
+
+import os
+import resource
+
+_page_size = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+
+
+def rss():
+    '''Returns the resident set size of the current process in MB.
+
+    Read from /proc/self/statm when available. Otherwise, the maximum
+    resident set size reached so far is returned.
+    '''
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * _page_size / 1024. / 1024.
+    except (IOError, IndexError, ValueError):
+        # ru_maxrss is in kB on linux
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.
@@ -0,0 +1,100 @@
+'''Index of the events in sequential input files, for random access.'''
+
+import os
+import numpy
+
+from heppy.framework.entries import cache_dir
+
+
+class OffsetIndex(object):
+    '''Keys locating each event of a file that can only be read sequentially,
+    e.g. the run and event numbers of the events of an LCIO file.
+
+    The index is built once, by reading the whole file, and stored next
+    to the file, in <fname>.heppyidx.npz. If the directory of the file
+    is not writable, the index is stored in the
+    L{cache directory<heppy.framework.entries.cache_dir>}.
+    The index is rebuilt if the file is modified::
+
+      index = OffsetIndex.get('events.slcio', read_keys)
+      run, event = index[1000]
+
+    @param read_keys: function taking the file name, and returning the
+      key of each event in the file, as a tuple of integers.
+    '''
+
+    suffix = '.heppyidx.npz'
+
+    def __init__(self, fname, keys):
+        self.fname = fname
+        self.keys = numpy.asarray(keys, dtype=numpy.int64)
+        if self.keys.ndim != 2:
+            # one integer per event, or no event
+            self.keys = self.keys.reshape(len(self.keys), 1 if len(self.keys) else 0)
+
+    @classmethod
+    def paths(cls, fname):
+        '''Possible paths of the index of fname, next to fname first.'''
+        fname = os.path.abspath(fname)
+        cached = fname.strip('/').replace('/', '%')
+        return [fname + cls.suffix,
+                '/'.join([cache_dir(), 'offsets', cached + cls.suffix])]
+
+    @staticmethod
+    def _stamp(fname):
+        stat = os.stat(fname)
+        return numpy.array([stat.st_mtime, stat.st_size], dtype=numpy.float64)
+
+    @classmethod
+    def load(cls, fname):
+        '''Returns the stored index of fname,
+        or None if there is none, or if fname was modified since.'''
+        stamp = cls._stamp(fname)
+        for path in cls.paths(fname):
+            if not os.path.isfile(path):
+                continue
+            try:
+                with numpy.load(path) as arrays:
+                    if numpy.array_equal(arrays['stamp'], stamp):
+                        return cls(fname, arrays['keys'])
+            except (IOError, KeyError, ValueError):
+                # corrupted index, will be rebuilt
+                pass
+        return None
+
+    @classmethod
+    def get(cls, fname, read_keys):
+        '''Returns the index of fname, building it if needed.'''
+        index = cls.load(fname)
+        if index is None:
+            index = cls(fname, list(read_keys(fname)))
+            index.write()
+        return index
+
+    def write(self):
+        '''Stores the index next to the file, or in the cache directory.'''
+        stamp = self._stamp(self.fname)
+        for path in self.paths(self.fname):
+            dirname = os.path.dirname(path)
+            if not os.path.isdir(dirname):
+                try:
+                    os.makedirs(dirname)
+                except OSError:
+                    continue
+            if not os.access(dirname, os.W_OK):
+                continue
+            # written to a temporary file first, as several processes
+            # may build the index at the same time
+            tmpname = '{path}.{pid}'.format(path=path, pid=os.getpid())
+            with open(tmpname, 'wb') as out:
+                numpy.savez(out, keys=self.keys, stamp=stamp)
+            os.rename(tmpname, path)
+            return path
+        return None
+
+    def __len__(self):
+        return len(self.keys)
+
+    def __getitem__(self, i):
+        '''Key of event i, as a tuple.'''
+        return tuple(self.keys[i].tolist())
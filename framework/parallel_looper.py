@@ -0,0 +1,274 @@
+# Copyright (C) 2014 Colin Bernet
+# https://github.com/cbernet/heppy/blob/master/LICENSE
+'''Event-level parallel processing of a single component.'''
+
+import os
+import sys
+import shutil
+import copy
+import logging
+import multiprocessing
+
+from heppy.framework.looper import Looper
+from heppy.statistics.counter import Counter
+from heppy.statistics.timing import TimingReport
+import heppy.framework.services.shared as shared
+import heppy.bin.heppy_hadd as heppy_hadd
+
+# The looper currently running its workers.
+# It is set just before the creation of the worker pool,
+# so that the forked workers inherit the configuration
+# instead of receiving a pickled copy of it.
+_parallel_looper = None
+
+
+def _run_worker(iworker):
+    '''Process a shard of events in a worker process.
+
+    Returns a tuple (output directory, number of processed events,
+    analyzer counter), used by the parent to merge the results.
+    '''
+    ploop = _parallel_looper
+    first, nevents = ploop.shards[iworker]
+    loop = Looper(ploop.worker_dir(iworker),
+                  plain_config(ploop.config),
+                  nEvents=nevents,
+                  firstEvent=first,
+                  nPrint=ploop.nPrint,
+                  timeReport=ploop.timeReport,
+                  quiet=ploop.quiet,
+                  memCheckFromEvent=ploop.memCheckFromEvent,
+                  stopFlag=ploop.stopFlag,
+                  prefetch=ploop.prefetch)
+    loop.loop()
+    loop.write()
+    return loop.name, loop.nEvProcessed, loop.analyzer_counter
+
+
+def event_range(config, firstEvent=0, nEvents=None):
+    '''Returns the first event and the number of events to be processed
+    for the component of config, taking into account its event ranges, if any.
+    '''
+    cfg_comp = config.components[0]
+    ranges = getattr(cfg_comp, 'eventRanges', None)
+    if ranges:
+        # see config.split
+        firstEvent += ranges[0][1]
+        nentries = firstEvent + sum(nev for fname, first, nev in ranges)
+    else:
+        tree_name = getattr(cfg_comp, 'tree_name', None)
+        if hasattr(cfg_comp, 'options'):
+            events = config.events_class(cfg_comp.files,
+                                         tree_name,
+                                         options=cfg_comp.options)
+        else:
+            events = config.events_class(cfg_comp.files, tree_name)
+        nentries = len(events)
+    if nEvents is None or firstEvent + int(nEvents) > nentries:
+        nEvents = nentries - firstEvent
+    return firstEvent, max(0, int(nEvents))
+
+
+def plain_config(config):
+    '''Returns config, or a copy of it in which the event ranges
+    of the component have been removed.
+
+    To be used for loopers processing a range given by L{event_range}.
+    '''
+    cfg_comp = config.components[0]
+    if not hasattr(cfg_comp, 'eventRanges'):
+        return config
+    config = copy.copy(config)
+    comp = copy.copy(cfg_comp)
+    del comp.eventRanges
+    config.components = [comp]
+    return config
+
+
+def merge_outputs(odir, idirs):
+    '''Merge the output directories idirs into odir.
+
+    The merging is done in the order of idirs, so that the
+    output trees contain the events in the order of the inputs.
+    The directory structure of idirs[0] is recreated in odir,
+    which may already exist.
+    See L{heppy_hadd<heppy.bin.heppy_hadd>} for the treatment
+    of each type of file.
+    The timing reports are merged last, as their presence indicates
+    that all outputs have been written.
+    Raises RuntimeError if a merge fails. The timing reports
+    are then not merged.
+    '''
+    timing_files = []
+    failed = []
+    for root, dirs, files in os.walk(idirs[0]):
+        for dirname in dirs:
+            dirname = '/'.join([root, dirname]).replace(idirs[0], odir)
+            if not os.path.isdir(dirname):
+                os.mkdir(dirname)
+        for fname in files:
+            if fname == TimingReport.fname:
+                timing_files.append('/'.join([root, fname]))
+                continue
+            fname = '/'.join([root, fname])
+            if heppy_hadd.hadd(fname, odir, idirs):
+                failed.append(fname.replace(idirs[0], odir))
+    if failed:
+        raise RuntimeError('failed to merge {fnames}, the inputs are kept in {idirs}'.format(
+            fnames=failed, idirs=idirs))
+    for fname in timing_files:
+        heppy_hadd.hadd(fname, odir, idirs)
+
+
+class ParallelLooper(Looper):
+    '''Processes a single component with several worker processes.
+
+    The event range of the component is divided in nWorkers contiguous
+    shards. Each worker runs its own L{Looper<heppy.framework.looper.Looper>},
+    with its own copy of the analyzer sequence, on one of the shards.
+    The outputs of the workers (counters, averages, root files)
+    are merged in event order when L{write} is called.
+
+    Example::
+
+      loop = ParallelLooper('Out', config, nWorkers=8)
+      loop.loop()
+      loop.write()
+
+    The workers are forked from the current process,
+    which must therefore not be a daemon process, e.g. a
+    worker of a multiprocessing.Pool.
+    '''
+
+    def __init__(self, name,
+                 config,
+                 nWorkers,
+                 nEvents=None,
+                 firstEvent=0,
+                 nPrint=0,
+                 timeReport=True,
+                 quiet=False,
+                 memCheckFromEvent=-1,
+                 stopFlag=None,
+                 prefetch=0):
+        '''Create the parallel looper.
+
+        The parameters are the same as for the L{Looper<heppy.framework.looper.Looper>},
+        except for:
+
+        @param nWorkers: number of worker processes.
+        '''
+        self.config = config
+        self.name = self._prepareOutput(name)
+        self.outDir = self.name
+        self.logger = logging.getLogger(self.name)
+        self.logger.addHandler(logging.FileHandler('/'.join([self.name,
+                                                             'log.txt'])))
+        self.logger.propagate = False
+        if not quiet:
+            self.logger.addHandler(logging.StreamHandler(sys.stdout))
+        self.cfg_comp = config.components[0]
+        if len(self.cfg_comp.files)==0:
+            errmsg = 'please provide at least an input file in the files attribute of this component\n' + str(self.cfg_comp)
+            raise ValueError( errmsg )
+        if getattr(config, 'preprocessor', None) is not None:
+            raise ValueError('the parallel looper cannot be used with a preprocessor')
+        fineSplit = getattr(self.cfg_comp, 'fineSplit', None)
+        if fineSplit and fineSplit[1] > 1:
+            raise ValueError('the parallel looper cannot be used on fine-split components')
+        self.nWorkers = int(nWorkers)
+        self.nPrint = int(nPrint)
+        self.timeReport = timeReport
+        self.quiet = quiet
+        self.memCheckFromEvent = memCheckFromEvent
+        self.stopFlag = stopFlag
+        self.prefetch = prefetch
+        self.workersDir = '/'.join([self.outDir, 'workers'])
+        self.workerNames = []
+        self.nEvProcessed = 0
+        self.analyzer_counter = Counter('analyzers')
+        self.firstEvent, self.nEvents = event_range(config, firstEvent, nEvents)
+        self.shards = self._shards(self.firstEvent, self.nEvents, self.nWorkers)
+
+    @staticmethod
+    def _shards(first, nevents, nworkers):
+        '''Returns a list of (firstEvent, nEvents) for each worker.
+
+        The shards are contiguous, and their sizes differ by at most one event.
+        '''
+        nworkers = max(1, min(nworkers, nevents))
+        size, remainder = divmod(nevents, nworkers)
+        shards = []
+        for iworker in range(nworkers):
+            nev = size + 1 if iworker < remainder else size
+            shards.append((first, nev))
+            first += nev
+        return shards
+
+    def worker_dir(self, iworker):
+        '''Output directory of a given worker.'''
+        return '/'.join([self.workersDir, 'Worker{i}'.format(i=iworker)])
+
+    def loop(self):
+        '''Process all shards in parallel, and wait for the workers to finish.'''
+        global _parallel_looper
+        self.logger.info(
+            'starting loop at event {firstEvent} '\
+            'to process {nEvents} events '\
+            'with {nWorkers} workers.'.format(firstEvent=self.firstEvent,
+                                              nEvents=self.nEvents,
+                                              nWorkers=len(self.shards)))
+        self.logger.info( str( self.cfg_comp ) )
+        os.mkdir(self.workersDir)
+        _parallel_looper = self
+        # the shared services are built once, and inherited by the workers
+        shared.build(self.config.services, self.cfg_comp, self.outDir)
+        pool = multiprocessing.Pool(processes=len(self.shards))
+        try:
+            results = [pool.apply_async(_run_worker, [iworker])
+                       for iworker in range(len(self.shards))]
+            pool.close()
+            # getting the results in worker order re-raises
+            # the exception of a failed worker, if any.
+            results = [result.get() for result in results]
+        finally:
+            pool.terminate()
+            pool.join()
+            _parallel_looper = None
+            shared.release()
+        for name, nevents, counter in results:
+            self.workerNames.append(name)
+            self.nEvProcessed += nevents
+            self.analyzer_counter += counter
+        self._write_log()
+
+    def _write_log(self):
+        warning = self.logger.warning
+        warning('')
+        warning( self.cfg_comp )
+        warning('')
+        for (first, nevents), name in zip(self.shards, self.workerNames):
+            warning('{name}: events {first} to {last}'.format(
+                name=os.path.basename(name),
+                first=first,
+                last=first+nevents-1
+            ))
+        warning('')
+        warning( self.analyzer_counter )
+        # see Looper._write_log
+        logfile = open('/'.join([self.name,'log.txt']),'a')
+        logfile.write('number of events processed: {nEv}\n'.format(
+            nEv=self.nEvProcessed)
+        )
+        logfile.close()
+
+    def process(self, iEv):
+        raise TypeError('ParallelLooper cannot process a single event, use a Looper.')
+
+    def write(self):
+        '''Merge the outputs of the workers into the output directory,
+        and remove the worker directories.
+        If the merge fails, the worker directories are kept.
+        '''
+        merge_outputs(self.outDir, self.workerNames)
+        shutil.rmtree(self.workersDir)
@@ -0,0 +1,108 @@
+'''Pools of objects recycled from one event to the next.
+
+In the memory-bounded mode of the L{Looper<heppy.framework.looper.Looper>},
+see the memory_bounded parameter of the L{Config<heppy.framework.config.Config>},
+the objects created with L{ObjectPool.get} during an event are given back
+to their pool after the last analyzer, and reused in the next events,
+instead of being left to the python and ROOT garbage collectors.
+The number of objects then stays bounded by the number of objects needed
+in a single event.
+
+Objects obtained from a pool must therefore not be kept after the end
+of the event. When the pools are not enabled, L{ObjectPool.get} simply
+creates a new object.
+
+Example::
+
+  from heppy.framework.pools import vectors3
+  position = vectors3.get(x, y, z)   # instead of TVector3(x, y, z)
+'''
+
+from heppy.framework.lazyroot import ROOT
+
+_pools = []
+_enabled = False
+
+
+class ObjectPool(object):
+    '''Pool of objects of a given type.'''
+
+    def __init__(self, name, factory, reset):
+        '''
+        @param name: name of the pool, for the L{report}.
+        @param factory: function creating a new object from the arguments of L{get}.
+        @param reset: function taking a recycled object and the arguments of L{get},
+          and setting the object as if it had been created by factory.
+        '''
+        self.name = name
+        self.factory = factory
+        self.reset = reset
+        self.free = []
+        self.used = []
+        self.created = 0
+        self.reused = 0
+        _pools.append(self)
+
+    def get(self, *args):
+        '''Returns an object built from args,
+        recycled if possible when the pools are enabled.'''
+        if not _enabled:
+            return self.factory(*args)
+        if self.free:
+            obj = self.free.pop()
+            self.reset(obj, *args)
+            self.reused += 1
+        else:
+            obj = self.factory(*args)
+            self.created += 1
+        self.used.append(obj)
+        return obj
+
+    def release(self):
+        '''Gives back all objects obtained since the last release.'''
+        self.free.extend(self.used)
+        del self.used[:]
+
+    def clear(self):
+        '''Forgets all objects.'''
+        del self.free[:]
+        del self.used[:]
+
+
+def enable(flag=True):
+    '''Enables or disables the recycling of objects in all pools.'''
+    global _enabled
+    _enabled = flag
+    if not flag:
+        for pool in _pools:
+            pool.clear()
+
+
+def enabled():
+    return _enabled
+
+
+def release_all():
+    '''Gives back the objects of all pools, at the end of an event.'''
+    for pool in _pools:
+        pool.release()
+
+
+def report():
+    '''Returns the list of (name, objects created, objects reused) for all pools.'''
+    return [(pool.name, pool.created, pool.reused) for pool in _pools]
+
+
+def _set_xyz(vector, x=0., y=0., z=0.):
+    vector.SetXYZ(x, y, z)
+
+def _set_xyzt(vector, x=0., y=0., z=0., t=0.):
+    vector.SetXYZT(x, y, z, t)
+
+vectors3 = ObjectPool('TVector3',
+                      lambda *args: ROOT.TVector3(*args),
+                      _set_xyz)
+
+lorentz_vectors = ObjectPool('TLorentzVector',
+                             lambda *args: ROOT.TLorentzVector(*args),
+                             _set_xyzt)
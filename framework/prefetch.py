@@ -0,0 +1,194 @@
+'''Read-ahead of the events in a background thread.'''
+
+import threading
+import Queue
+import timeit
+import bisect
+
+import heppy.framework.lazyroot as lazyroot
+
+
+def enable_root_thread_safety():
+    '''Makes ROOT safe for the reading thread, if ROOT is used.
+
+    The backends reading ROOT files, e.g. L{Chain<heppy.framework.chain.Chain>},
+    import ROOT when they are created. ROOT is not imported otherwise.
+    '''
+    if not lazyroot.loaded():
+        return
+    # not available in ROOT 5
+    enable = getattr(getattr(lazyroot.load(), 'ROOT', None),
+                     'EnableThreadSafety', None)
+    if enable is not None:
+        enable()
+
+
+class Prefetcher(object):
+    '''Reads the next entries of an indexable events backend
+    in a background thread, while the analyzers process the current entry.
+
+    Most backends, e.g. L{Chain<heppy.framework.chain.Chain>}, return the
+    same object for all entries, and this object is modified when a new entry
+    is read. The prefetcher therefore uses depth+2 instances of the backend,
+    each of them holding one of the entries: the entry being processed by the
+    analyzers, up to depth entries read in advance and waiting in a bounded
+    queue, and the entry being read. An instance of the backend is reused only
+    after the analyzers are done with its entry.
+
+    Example::
+
+      events = Prefetcher(Chain(files, tree_name),
+                          lambda : Chain(files, tree_name),
+                          depth=2)
+      for iev in range(len(events)):
+          event = events[iev]
+
+    The reading thread runs in parallel to the analyzers while it does not hold
+    the python global interpreter lock, e.g. while waiting for I/O.
+    The thread safety of ROOT is enabled before the thread is started,
+    see L{enable_root_thread_safety}.
+
+    Entries should be accessed in sequence, or in the order given
+    with L{set_entries}. Accessing an entry out of sequence
+    is possible, but the queue is then flushed and the reading restarted.
+
+    The statistics of the prefetcher are given by L{report}.
+    '''
+
+    def __init__(self, events, events_factory, depth=2):
+        '''
+        @param events: the events backend. Must support indexing.
+        @param events_factory: callable with no argument,
+          returning a new instance of the backend for the same input.
+        @param depth: maximum number of entries read in advance.
+        '''
+        if not hasattr(events, '__getitem__'):
+            raise ValueError('cannot prefetch events from {evclass}, which does not support indexing'.format(
+                evclass=events.__class__))
+        self.depth = int(depth)
+        self.slots = [events]
+        self.slots.extend( events_factory() for i in range(self.depth + 1) )
+        self.queue = Queue.Queue(maxsize=self.depth)
+        self.thread = None
+        self.stopping = False
+        self.next_index = None
+        # sorted entries to be read, all entries if None
+        self.entries = None
+        # statistics
+        self.nread = 0
+        self.nrestarts = 0
+        self.depth_sum = 0
+        self.stall_time = 0.
+
+    def __len__(self):
+        return len(self.slots[0])
+
+    def __getattr__(self, attr):
+        '''All attributes of the primary backend are made available.'''
+        if attr == 'slots':
+            raise AttributeError(attr)
+        return getattr(self.slots[0], attr)
+
+    def __getitem__(self, index):
+        '''Returns the entry at position index.'''
+        if not 0 <= index < len(self):
+            raise IndexError('entry {index} out of range'.format(index=index))
+        if index != self.next_index:
+            self._restart(index)
+        self.depth_sum += self.queue.qsize()
+        start = timeit.default_timer()
+        read_index, entry, err = self.queue.get()
+        self.stall_time += timeit.default_timer() - start
+        if err is not None:
+            self.next_index = None
+            raise err
+        assert(read_index == index)
+        self.nread += 1
+        self.next_index = self._following(index)
+        return entry
+
+    def set_entries(self, entries):
+        '''Read only the given entries in advance.
+
+        @param entries: sorted list of entries, e.g. the entries selected
+          in an L{EventIndex<heppy.framework.eventindex.EventIndex>}.
+        '''
+        self.stop()
+        self.entries = list(entries)
+
+    def _following(self, index):
+        '''Entry expected after index.'''
+        if self.entries is None:
+            return index + 1
+        pos = bisect.bisect_right(self.entries, index)
+        if pos < len(self.entries):
+            return self.entries[pos]
+        return None
+
+    def _upcoming(self, first):
+        '''Entries to be read, starting at first.'''
+        if self.entries is None:
+            return xrange(first, len(self))
+        pos = bisect.bisect_left(self.entries, first)
+        if pos < len(self.entries) and self.entries[pos] == first:
+            return self.entries[pos:]
+        # entry not in the list
+        return [first]
+
+    def _read(self, first):
+        '''Read entries from first on, in the background thread.'''
+        nslots = len(self.slots)
+        for iread, index in enumerate(self._upcoming(first)):
+            try:
+                entry = self.slots[iread % nslots][index]
+                item = (index, entry, None)
+            except Exception as err:
+                item = (index, None, err)
+            while not self.stopping:
+                try:
+                    self.queue.put(item, timeout=0.1)
+                    break
+                except Queue.Full:
+                    pass
+            if self.stopping or item[2] is not None:
+                return
+
+    def _restart(self, index):
+        '''Flush the queue and start reading at index.'''
+        if self.thread is not None:
+            self.nrestarts += 1
+        self.stop()
+        self.stopping = False
+        enable_root_thread_safety()
+        self.thread = threading.Thread(target=self._read, args=(index,))
+        self.thread.daemon = True
+        self.thread.start()
+
+    def stop(self):
+        '''Stop the background thread, discarding the entries read in advance.'''
+        if self.thread is None:
+            return
+        self.stopping = True
+        self.thread.join()
+        self.thread = None
+        while not self.queue.empty():
+            self.queue.get()
+        self.next_index = None
+
+    def report(self):
+        '''Returns a dictionary with the statistics of the prefetcher:
+
+         - depth: maximum number of entries read in advance
+         - entries: number of entries delivered
+         - mean_queue_depth: average number of entries waiting in the queue
+           when an entry is requested
+         - stall_time: total time spent waiting for an entry, in seconds
+         - restarts: number of times the reading was restarted
+           because of an access out of sequence
+        '''
+        mean_depth = self.depth_sum / float(self.nread) if self.nread else 0.
+        return dict(depth=self.depth,
+                    entries=self.nread,
+                    mean_queue_depth=mean_depth,
+                    stall_time=self.stall_time,
+                    restarts=self.nrestarts)
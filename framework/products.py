@@ -0,0 +1,143 @@
+'''Registry of the products put on and read from the events by the analyzers.'''
+
+import json
+
+
+class ProductRegistry(object):
+    '''Records, for each product, the analyzers that put it on the event
+    and the analyzers that read it.
+
+    The L{Looper<heppy.framework.looper.Looper>} sets current to the name
+    of the analyzer being run, and passes the registry to the
+    L{events<heppy.framework.event.Event>}, which call L{put} and L{get}.
+
+    The registry is used to:
+     - free the products that are not read anymore by the next analyzers
+       in the sequence, see L{unused_after}.
+       This is enabled by setting free_products=True in the
+       L{Config<heppy.framework.config.Config>}. Products are freed only
+       after learning_events events, as a product read only for some events
+       would otherwise be freed too early.
+     - find the analyzers whose products are never read, see L{report}.
+    '''
+
+    learning_events = 100
+    fname = 'products.json'
+
+    def __init__(self, analyzer_names):
+        self.analyzers = list(analyzer_names)
+        self.position = dict( (name, i) for i, name in enumerate(self.analyzers) )
+        self.current = None
+        self.producers = dict()
+        self.readers = dict()
+        self.nevents = 0
+        self._unused = dict()
+
+    def put(self, name):
+        '''Product name was put on the event by the current analyzer.'''
+        if self.current is None:
+            return
+        producers = self.producers.setdefault(name, set())
+        if self.current not in producers:
+            producers.add(self.current)
+            self._unused = dict()
+
+    def get(self, name):
+        '''Product name was read by the current analyzer.'''
+        if self.current is None:
+            return
+        readers = self.readers.setdefault(name, set())
+        if self.current not in readers:
+            readers.add(self.current)
+            self._unused = dict()
+
+    def end_event(self):
+        '''Called by the looper at the end of each event.'''
+        self.nevents += 1
+
+    def learning(self):
+        '''True as long as fewer than learning_events events were processed.'''
+        return self.nevents < self.learning_events
+
+    def unused_after(self, position):
+        '''Returns the names of the products that are not read or put
+        by any analyzer after the analyzer at a given position in the sequence.
+        '''
+        unused = self._unused.get(position)
+        if unused is None:
+            unused = []
+            for name, producers in self.producers.iteritems():
+                users = producers | self.readers.get(name, set())
+                if max(self.position[ana] for ana in users) <= position:
+                    unused.append(name)
+            self._unused[position] = unused
+        return unused
+
+    def report(self):
+        '''Returns a dictionary with:
+         - products: producers and readers of each product
+         - unread: products that are never read
+         - dead_weight: analyzers putting products, none of which is ever read
+        '''
+        products = dict()
+        for name in set(self.producers) | set(self.readers):
+            products[name] = dict(
+                producers=sorted(self.producers.get(name, []),
+                                 key=self.position.get),
+                readers=sorted(self.readers.get(name, []),
+                               key=self.position.get)
+            )
+        unread = sorted(name for name in self.producers
+                        if not self.readers.get(name))
+        dead_weight = []
+        for ana in self.analyzers:
+            products_of_ana = [name for name, producers in self.producers.iteritems()
+                               if ana in producers]
+            if products_of_ana and \
+               all(name in unread for name in products_of_ana):
+                dead_weight.append(ana)
+        return dict(analyzers=self.analyzers,
+                    products=products,
+                    unread=unread,
+                    dead_weight=dead_weight)
+
+    def __add__(self, other):
+        '''Merge two registries, e.g. from two chunks of a component.'''
+        if self.analyzers != other.analyzers:
+            raise ValueError('cannot add product registries for different analyzer sequences')
+        for name, producers in other.producers.iteritems():
+            self.producers.setdefault(name, set()).update(producers)
+        for name, readers in other.readers.iteritems():
+            self.readers.setdefault(name, set()).update(readers)
+        self.nevents += other.nevents
+        self._unused = dict()
+        return self
+
+    def __iadd__(self, other):
+        return self.__add__(other)
+
+    def write(self, dirname):
+        '''Dump the report to products.json in dirname.'''
+        with open('/'.join([dirname, self.fname]), 'w') as out:
+            json.dump(self.report(), out, indent=1, sort_keys=True)
+
+    @classmethod
+    def load(cls, fname):
+        '''Load a registry from a report written with L{write}.'''
+        with open(fname) as infile:
+            report = json.load(infile)
+        registry = cls(report['analyzers'])
+        for name, users in report['products'].iteritems():
+            if users['producers']:
+                registry.producers[name] = set(users['producers'])
+            if users['readers']:
+                registry.readers[name] = set(users['readers'])
+        return registry
+
+    def __str__(self):
+        report = self.report()
+        lines = ['ProductRegistry: {n} products'.format(n=len(report['products']))]
+        lines.append('\tnever read: {unread}'.format(unread=', '.join(report['unread'])))
+        lines.append('\tanalyzers with no product read: {dead}'.format(
+            dead=', '.join(report['dead_weight'])))
+        return '\n'.join(lines)
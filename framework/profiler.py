@@ -0,0 +1,179 @@
+'''Profiling of the analyzers.'''
+
+import os
+import json
+import pstats
+import cProfile
+import resource
+import timeit
+
+try:
+    # standard library from python 3.4,
+    # available for python 2 with the pytracemalloc package
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+
+class AnalyzerProfiler(object):
+    '''Profiles the process method of an analyzer.
+
+    The profiling is enabled for a given analyzer in the configuration::
+
+      ana = cfg.Analyzer(
+          Selector,
+          'sel_muons',
+          output = 'sel_muons',
+          input_objects = 'muons',
+          filter_func = lambda ptc : ptc.pt() > 10,
+          profile = True,
+          profile_sample = 100
+      )
+
+    The L{Looper<heppy.framework.looper.Looper>} calls L{start}
+    and L{stop} around each call to the process method of the analyzer.
+    A single cProfile profile is accumulated over all events.
+
+    If tracemalloc is available, the memory allocated during each call
+    is recorded, and the allocations are sampled by source line
+    every profile_sample events (default: 100, 0 to disable sampling).
+    Otherwise, the increase of the maximum resident set size is recorded.
+
+    The tracing of tracemalloc is started at the first call if needed,
+    and stopped by L{endLoop}.
+
+    L{write} creates in the output directory of the analyzer:
+     - profile.pstats: the cProfile statistics, to be read with pstats
+       or any pstats viewer. The statistics are empty if the analyzer
+       did not process any event.
+     - profile.json: a summary, see L{summary}
+    '''
+
+    def __init__(self, name, sample=100, nfunctions=50):
+        '''
+        @param name: name of the analyzer
+        @param sample: allocations are sampled by source line every sample calls.
+          no sampling if 0 or if tracemalloc is not available.
+        @param nfunctions: number of functions in the json summary.
+        '''
+        self.name = name
+        self.sample = sample
+        self.nfunctions = nfunctions
+        self.profile = cProfile.Profile()
+        self.ncalls = 0
+        self.time = 0.
+        self.alloc = 0
+        self.alloc_max = 0
+        self.rss_increase = 0
+        self.allocations = dict()
+        self.nsamples = 0
+        # True if this profiler started the tracing of tracemalloc
+        self.tracing = False
+        # state of the current call
+        self._start = None
+        self._mem = None
+        self._snapshot = None
+
+    def _sampling(self):
+        return tracemalloc is not None and \
+               self.sample and \
+               self.ncalls % self.sample == 0
+
+    def start(self):
+        '''Start profiling a call.'''
+        self._snapshot = None
+        if tracemalloc is not None:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self.tracing = True
+            if self._sampling():
+                self._snapshot = tracemalloc.take_snapshot()
+            self._mem = tracemalloc.get_traced_memory()[0]
+        else:
+            self._mem = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        self._start = timeit.default_timer()
+        self.profile.enable()
+
+    def stop(self):
+        '''Stop profiling a call.'''
+        self.profile.disable()
+        self.time += timeit.default_timer() - self._start
+        if tracemalloc is not None:
+            alloc = tracemalloc.get_traced_memory()[0] - self._mem
+            self.alloc += alloc
+            self.alloc_max = max(self.alloc_max, alloc)
+            if self._snapshot is not None:
+                self._add_sample(tracemalloc.take_snapshot())
+        else:
+            rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            self.rss_increase += rss - self._mem
+        self.ncalls += 1
+
+    def endLoop(self):
+        '''Stop the tracing of tracemalloc, if started by this profiler.'''
+        if self.tracing:
+            tracemalloc.stop()
+            self.tracing = False
+
+    def _add_sample(self, snapshot):
+        '''Accumulate the allocations by source line
+        since the snapshot taken in L{start}.'''
+        self.nsamples += 1
+        for diff in snapshot.compare_to(self._snapshot, 'lineno'):
+            if diff.size_diff == 0 and diff.count_diff == 0:
+                continue
+            frame = diff.traceback[0]
+            key = '{fname}:{line}'.format(fname=frame.filename,
+                                          line=frame.lineno)
+            size, count = self.allocations.get(key, (0, 0))
+            self.allocations[key] = (size + diff.size_diff,
+                                     count + diff.count_diff)
+        self._snapshot = None
+
+    def summary(self):
+        '''Returns a dictionary with:
+         - analyzer: name of the analyzer
+         - calls: number of calls to process
+         - time: total time spent in process, in seconds
+         - memory: allocations in bytes if tracemalloc is available
+           (total, maximum per call, and sampled allocations by source line),
+           otherwise the increase of the maximum resident set size in kB.
+         - functions: the functions with the largest cumulative time
+        '''
+        memory = dict(tracemalloc=tracemalloc is not None)
+        if tracemalloc is not None:
+            memory['allocated'] = self.alloc
+            memory['allocated_max'] = self.alloc_max
+            memory['samples'] = self.nsamples
+            lines = sorted(self.allocations.iteritems(),
+                           key=lambda item: -abs(item[1][0]))
+            memory['lines'] = [dict(line=key, size=size, count=count)
+                               for key, (size, count) in lines[:self.nfunctions]]
+        else:
+            memory['rss_increase'] = self.rss_increase
+        functions = []
+        if self.ncalls:
+            stats = pstats.Stats(self.profile).stats
+            this_module = os.path.splitext(os.path.abspath(__file__))[0]
+            for (fname, line, func), (cc, nc, tt, ct, callers) in stats.iteritems():
+                if fname.startswith(this_module) or '_lsprof.Profiler' in func:
+                    # calls of the profiler itself
+                    continue
+                functions.append(dict(function=func,
+                                      file=fname,
+                                      line=line,
+                                      calls=nc,
+                                      tottime=tt,
+                                      cumtime=ct))
+            functions.sort(key=lambda func: -func['cumtime'])
+        return dict(analyzer=self.name,
+                    calls=self.ncalls,
+                    time=self.time,
+                    memory=memory,
+                    functions=functions[:self.nfunctions])
+
+    def write(self, dirname):
+        '''Write profile.pstats and profile.json to dirname.'''
+        self.profile.dump_stats('/'.join([dirname, 'profile.pstats']))
+        with open('/'.join([dirname, 'profile.json']), 'w') as out:
+            json.dump(self.summary(), out, indent=1)
@@ -0,0 +1,147 @@
+'''Dependency-aware scheduling of the analyzer sequence.
+
+The inputs and outputs of each analyzer are inferred from its configuration:
+
+ - the outputs are the values of the parameters named output or output_*,
+   e.g. output = 'sel_iso_leptons'.
+ - the inputs are the values of all other string parameters, or strings in
+   list, tuple or dict parameters, e.g. input_objects = 'rec_particles'.
+   An input matches the output of a previous analyzer if it has the same name,
+   or if it starts with this name followed by an underscore,
+   e.g. zeds_legs matches zeds.
+
+They can be given explicitly with the inputs and outputs parameters, e.g. for
+an analyzer reading products with fixed names::
+
+  selection = cfg.Analyzer(
+    Selection,
+    instance_label='cuts',
+    inputs=['zeds', 'higgses']
+  )
+
+The inputs cannot be inferred for analyzers reading products with fixed
+names, and an analyzer can reject events or modify its inputs whatever its
+outputs. The scheduler therefore only acts on pure producers, i.e. analyzers
+declaring that they only put their outputs on the event, with pure_producer
+set to True in their class or in their configuration, like the
+L{Selector<heppy.analyzers.Selector.Selector>}.
+
+A pure producer is removed from the sequence if none of its outputs is
+read by the analyzers run after it, unless it is configured with keep=True.
+All other analyzers are always run.
+
+Filters, i.e. analyzers with is_filter set to True in their class or in their
+configuration, like the L{EventFilter<heppy.analyzers.EventFilter.EventFilter>},
+are moved before the pure producers that they do not depend on,
+together with the pure producers they depend on,
+so that the rejected events are not processed by the other analyzers.
+Filters are never moved before other analyzers.
+
+The scheduling is enabled with optimize_sequence=True in the
+L{Config<heppy.framework.config.Config>}.
+'''
+
+from heppy.framework.config import import_class
+
+# parameters that are never inputs
+_not_inputs = set(['name', 'instance_label', 'class_object', 'verbose',
+                   'log_level', 'inputs', 'outputs', 'keep', 'is_filter',
+                   'pure_producer'])
+
+
+def _strings(value):
+    '''Returns the strings in value.'''
+    if isinstance(value, basestring):
+        return [value]
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        return [val for val in value if isinstance(val, basestring)]
+    elif isinstance(value, dict):
+        return [val for val in value.values() if isinstance(val, basestring)]
+    return []
+
+
+def _matches(name, product):
+    return name == product or name.startswith(product + '_')
+
+
+class Node(object):
+    '''An analyzer configuration, with its inputs and outputs.'''
+
+    def __init__(self, cfg_ana):
+        self.cfg_ana = cfg_ana
+        params = vars(cfg_ana)
+        if 'outputs' in params:
+            self.outputs = set(_strings(params['outputs']))
+        else:
+            self.outputs = set()
+            for key, value in params.iteritems():
+                if key == 'output' or key.startswith('output_'):
+                    self.outputs.update(_strings(value))
+        if 'inputs' in params:
+            self.inputs = set(_strings(params['inputs']))
+        else:
+            self.inputs = set()
+            for key, value in params.iteritems():
+                if key in _not_inputs or \
+                   key == 'output' or key.startswith('output_'):
+                    continue
+                self.inputs.update(_strings(value))
+        self.keep = getattr(cfg_ana, 'keep', False)
+        class_object = import_class(cfg_ana.class_object)
+        self.is_filter = getattr(cfg_ana, 'is_filter',
+                                 getattr(class_object, 'is_filter', False))
+        self.declared_pure = getattr(cfg_ana, 'pure_producer',
+                                     getattr(class_object, 'pure_producer', False))
+
+    def reads(self, products):
+        '''True if this analyzer reads one of the products.'''
+        return any(_matches(name, product)
+                   for name in self.inputs for product in products)
+
+    def pure_producer(self):
+        '''True if this analyzer declares that it only puts its outputs on the event.'''
+        return bool(self.outputs) and not self.is_filter and self.declared_pure
+
+
+def schedule(sequence):
+    '''Returns the optimized sequence, and a report in the form of a dictionary:
+     - removed: names of the pure producers removed from the sequence
+     - moved: list of (name, old position, new position) for the filters
+       moved earlier in the sequence.
+    '''
+    nodes = [Node(cfg_ana) for cfg_ana in sequence]
+    # removing the pure producers whose outputs are not read,
+    # starting from the end of the sequence
+    kept = []
+    removed = []
+    for node in reversed(nodes):
+        if not node.pure_producer() or node.keep or \
+           any(other.reads(node.outputs) for other in kept):
+            kept.append(node)
+        else:
+            removed.append(node.cfg_ana.name)
+    kept.reverse()
+    removed.reverse()
+    # moving the filters, together with the producers they depend on,
+    # before the producers they do not depend on
+    original = dict( (node.cfg_ana.name, i) for i, node in enumerate(kept) )
+    for node in [node for node in kept if node.is_filter]:
+        block = [node]
+        start = kept.index(node)
+        while start > 0:
+            previous = kept[start-1]
+            if not previous.pure_producer():
+                break
+            if any(member.reads(previous.outputs) for member in block):
+                # dependency of the filter
+                block.insert(0, previous)
+            elif any(previous.reads(member.outputs) for member in block):
+                break
+            else:
+                del kept[start-1]
+                kept.insert(start-1+len(block), previous)
+            start -= 1
+    moved = [(node.cfg_ana.name, original[node.cfg_ana.name], i)
+             for i, node in enumerate(kept)
+             if node.is_filter and original[node.cfg_ana.name] != i]
+    return [node.cfg_ana for node in kept], dict(removed=removed, moved=moved)
@@ -0,0 +1,102 @@
+'''Services built once, and shared by the processes forked afterwards.
+
+Building some services is expensive, e.g. when they read large tables.
+When processing with several worker processes, a service configured
+with shared=True is built once in the parent process, before the workers
+are forked::
+
+  trackres = cfg.Service(
+    TableService,
+    'trackres',
+    fname='fccee_trackres.csv',
+    shared=True
+  )
+
+The workers then use the service built by the parent.
+The memory pages of the service are shared by all processes as long as
+they are not modified, so shared services must be read-only.
+Large numerical data should be stored with L{shared_array}:
+the memory of the array is then shared even if the array object
+is accessed, which is not the case for python lists or dictionaries.
+
+A shared service is built once for all components and workers,
+and should not depend on the component or output directory
+it is built with.
+'''
+
+import os
+import multiprocessing
+import numpy
+
+# name -> [service, pid of the process that built it, held]
+_services = dict()
+
+
+def shared_array(values, dtype=float):
+    '''Returns a read-only copy of values, as a numpy array
+    in memory shared with the processes forked afterwards.'''
+    values = numpy.asarray(values, dtype=dtype)
+    if values.size == 0:
+        array = values.copy()
+    else:
+        buf = multiprocessing.RawArray('b', values.nbytes)
+        array = numpy.frombuffer(buf, dtype=values.dtype).reshape(values.shape)
+        array[...] = values
+    array.flags.writeable = False
+    return array
+
+
+def service(cfg_serv, comp, outdir):
+    '''Returns the shared service configured by cfg_serv,
+    building it if needed.
+
+    Called by the L{Looper<heppy.framework.looper.Looper>}
+    for the services with shared=True.
+    '''
+    entry = _services.get(cfg_serv.name)
+    if entry is None:
+        service_class = cfg_serv.load_class()
+        entry = [service_class(cfg_serv, comp, outdir), os.getpid(), False]
+        _services[cfg_serv.name] = entry
+    return entry[0]
+
+
+def build(services, comp, outdir):
+    '''Builds the shared services among the service configurations
+    services, before forking the worker processes.
+
+    The services are held until L{release} is called,
+    and are not stopped by the loopers.
+    '''
+    for cfg_serv in services:
+        if getattr(cfg_serv, 'shared', False):
+            service(cfg_serv, comp, outdir)
+            _services[cfg_serv.name][2] = True
+
+
+def is_shared(name):
+    '''True if the service with this name is shared.'''
+    return name in _services
+
+
+def close(name):
+    '''Stops the shared service with this name,
+    unless it is held or was built by another process.'''
+    entry = _services.get(name)
+    if entry is None:
+        return
+    service, pid, held = entry
+    if held:
+        return
+    del _services[name]
+    if pid == os.getpid():
+        service.stop()
+
+
+def release():
+    '''Stops the shared services built by this process,
+    and forgets all shared services.'''
+    for name, (service, pid, held) in _services.items():
+        del _services[name]
+        if pid == os.getpid():
+            service.stop()
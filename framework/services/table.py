@@ -0,0 +1,46 @@
+'''Table service, to read a numerical table common to all analyzers.
+'''
+
+import csv
+
+from heppy.framework.services.service import Service
+from heppy.framework.services.shared import shared_array
+
+class TableService(Service):
+    """Table service.
+
+    Reads a table of numbers from a csv file with a header line,
+    e.g. a resolution table. The table is stored in a read-only
+    numpy array, that can be shared by the worker processes,
+    see L{shared<heppy.framework.services.shared>}.
+
+    Example::
+
+        trackres = cfg.Service(
+          TableService,
+          'trackres',
+          fname='fccee_trackres.csv',
+          decimal=',',
+          shared=True
+        )
+
+    In an analyzer::
+
+        table = setup.services[trackres.name]
+        momenta = table.column('x')
+
+    @param fname: Name of the csv file.
+    @param decimal: Decimal separator, defaults to '.'.
+    """
+    def __init__(self, cfg, comp, outdir):
+        decimal = getattr(cfg, 'decimal', '.')
+        with open(cfg.fname) as csvfile:
+            reader = csv.reader(csvfile)
+            self.titles = next(reader)
+            rows = [[float(value.replace(decimal, '.')) for value in row]
+                    for row in reader if row]
+        self.table = shared_array(rows)
+
+    def column(self, title):
+        '''Returns the column with a given title.'''
+        return self.table[:, self.titles.index(title)]
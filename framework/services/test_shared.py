@@ -0,0 +1,79 @@
+import unittest
+import os
+import multiprocessing
+
+import heppy.framework.config as cfg
+from heppy.framework.services.service import Service
+import shared
+from shared import shared_array
+from table import TableService
+
+class Stopped(Service):
+    def __init__(self, cfg, comp, outdir):
+        self.stopped = False
+    def stop(self):
+        self.stopped = True
+
+# set before forking the workers, see test_shared_array
+_array = None
+
+def _child_sum(dummy):
+    return _array.sum()
+
+class SharedTestCase(unittest.TestCase):
+
+    def tearDown(self):
+        shared.release()
+
+    def test_shared_array(self):
+        global _array
+        array = shared_array([[1, 2], [3, 4]])
+        self.assertEqual(array.shape, (2, 2))
+        self.assertEqual(array.dtype, float)
+        self.assertFalse(array.flags.writeable)
+        self.assertRaises(ValueError, array.__setitem__, (0, 0), 5)
+        self.assertEqual(len(shared_array([])), 0)
+        # inherited by forked processes
+        _array = array
+        pool = multiprocessing.Pool(2)
+        try:
+            sums = pool.map(_child_sum, range(2))
+        finally:
+            pool.terminate()
+            pool.join()
+            _array = None
+        self.assertEqual(sums, [10., 10.])
+
+    def test_build_release(self):
+        cfg_serv = cfg.Service(Stopped, 'test_build', shared=True)
+        shared.build([cfg_serv], None, None)
+        service = shared.service(cfg_serv, None, None)
+        self.assertTrue(shared.is_shared(cfg_serv.name))
+        # held, not stopped by the loopers
+        shared.close(cfg_serv.name)
+        self.assertFalse(service.stopped)
+        self.assertIs(shared.service(cfg_serv, None, None), service)
+        shared.release()
+        self.assertTrue(service.stopped)
+        self.assertFalse(shared.is_shared(cfg_serv.name))
+
+    def test_not_held(self):
+        cfg_serv = cfg.Service(Stopped, 'test_not_held', shared=True)
+        service = shared.service(cfg_serv, None, None)
+        shared.close(cfg_serv.name)
+        self.assertTrue(service.stopped)
+        self.assertFalse(shared.is_shared(cfg_serv.name))
+
+    def test_table(self):
+        fname = '/'.join([os.environ['HEPPY'],
+                          'papas/detectors/fccee_trackres.csv'])
+        cfg_serv = cfg.Service(TableService, 'trackres',
+                               fname=fname, decimal=',')
+        table = TableService(cfg_serv, None, None)
+        self.assertEqual(table.titles, ['x', '10', '30', '50', '90'])
+        self.assertAlmostEqual(table.column('x')[0], 2.19644)
+        self.assertFalse(table.table.flags.writeable)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -2,7 +2,7 @@
 '''
 
 from heppy.framework.services.service import Service
-from ROOT import TFile
+from heppy.framework.lazyroot import ROOT
 
 class TFileService(Service):
     """TFile service.
@@ -36,7 +36,7 @@ class TFileService(Service):
         make use of the component information, eg. the component name. 
         """
         fname = '/'.join([outdir, cfg.fname])
-        self.file = TFile(fname, cfg.option)
+        self.file = ROOT.TFile(fname, cfg.option)
         
     def stop(self):
         '''Write and close the file.'''
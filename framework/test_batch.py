@@ -0,0 +1,153 @@
+import unittest
+import tempfile
+import shutil
+import logging
+
+import heppy.framework.config as cfg
+from heppy.framework.analyzer import Analyzer
+from heppy.framework.looper import Looper
+from heppy.framework.exceptions import UserStop
+from heppy.analyzers.Selector import Selector
+from heppy.analyzers.EventFilter import EventFilter
+from event import Event
+from batch import EventBatch
+
+class Obj(object):
+    def __init__(self, e):
+        self.energy = e
+    def e(self):
+        return self.energy
+
+class Entry(object):
+    '''entry i contains i%4 objects'''
+    def __init__(self, i=None):
+        self.i = i
+    def objects(self):
+        return [Obj(self.i + j) for j in range(self.i % 4)]
+
+class Events(object):
+    '''returns a new entry each time'''
+    independent_entries = True
+    def __init__(self, files, tree_name=None):
+        pass
+    def __len__(self):
+        return 50
+    def __getitem__(self, i):
+        return Entry(i)
+
+class ChainEvents(Events):
+    '''returns the same entry each time, positioned on entry i, like Chain'''
+    independent_entries = False
+    def __init__(self, files, tree_name=None):
+        self.entry = Entry()
+    def __getitem__(self, i):
+        self.entry.i = i
+        return self.entry
+
+class Reader(Analyzer):
+    def process(self, event):
+        event.objects = event.input.objects()
+
+class Recorder(Analyzer):
+    def beginLoop(self, setup):
+        super(Recorder, self).beginLoop(setup)
+        self.selected = []
+    def process(self, event):
+        self.selected.append((event.iEv, [obj.e() for obj in event.selected]))
+        if event.iEv == self.cfg_ana.stop_at:
+            raise UserStop('stop at event {iev}'.format(iev=event.iEv))
+
+
+class EventBatchTestCase(unittest.TestCase):
+
+    def test_columns(self):
+        events = []
+        for i, energies in enumerate([[1., 2.], [], [3.]]):
+            event = Event(i)
+            event.objects = [Obj(e) for e in energies]
+            events.append(event)
+        batch = EventBatch(events)
+        objects = batch.columns('objects')
+        self.assertEqual(len(objects), 3)
+        self.assertEqual(objects.counts.tolist(), [2, 0, 1])
+        self.assertEqual(objects['e'].tolist(), [1., 2., 3.])
+        self.assertEqual(objects['energy'].tolist(), [1., 2., 3.])
+        self.assertEqual(objects.sum(objects['e']).tolist(), [3., 0., 3.])
+        selected = objects.split(objects['e'] > 1.5)
+        self.assertEqual([[obj.e() for obj in coll] for coll in selected],
+                         [[2.], [], [3.]])
+        batch.put('n', [2, 0, 1])
+        self.assertEqual(events[1].n, 0)
+        self.assertRaises(ValueError, batch.put, 'n', [1])
+
+
+class LooperBatchTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.outdir = tempfile.mkdtemp()
+        logging.disable(logging.CRITICAL)
+
+    def tearDown(self):
+        shutil.rmtree(self.outdir)
+        logging.disable(logging.NOTSET)
+
+    def run_looper(self, batch_size, events_class=Events, stop_at=None,
+                   **selector_params):
+        sequence = cfg.Sequence([
+            cfg.Analyzer(Reader),
+            cfg.Analyzer(Selector,
+                         output='selected',
+                         input_objects='objects',
+                         filter_func=lambda obj: obj.e() % 2 == 0,
+                         nmax=1,
+                         **selector_params),
+            cfg.Analyzer(EventFilter,
+                         input_objects='selected',
+                         min_number=1,
+                         veto=False),
+            cfg.Analyzer(Recorder, stop_at=stop_at)
+        ])
+        config = cfg.Config(components=[cfg.Component('test', files=['dummy'])],
+                            sequence=sequence, services=[],
+                            events_class=events_class, batch_size=batch_size)
+        looper = Looper('/'.join([self.outdir, 'looper']), config,
+                        nEvents=45, quiet=True)
+        looper.loop()
+        return looper
+
+    def test_same_results(self):
+        ref = self.run_looper(0)
+        for looper in [self.run_looper(7),
+                       self.run_looper(100, batch_filter_func=lambda objs: objs['e'] % 2 == 0)]:
+            self.assertEqual(looper.nEvProcessed, 45)
+            self.assertEqual(looper._analyzers[-1].selected,
+                             ref._analyzers[-1].selected)
+            self.assertEqual(str(looper._analyzers[2].counters),
+                             str(ref._analyzers[2].counters))
+            self.assertEqual([count for level, count in looper.analyzer_counter],
+                             [count for level, count in ref.analyzer_counter])
+
+    def test_reused_input(self):
+        ref = self.run_looper(0, ChainEvents)
+        looper = self.run_looper(7, ChainEvents)
+        self.assertEqual(looper._analyzers[-1].selected,
+                         ref._analyzers[-1].selected)
+        self.assertEqual(ref._analyzers[-1].selected,
+                         self.run_looper(0)._analyzers[-1].selected)
+        # input read after an analyzer processing the blocks
+        looper.batchInput = 0
+        self.assertRaises(RuntimeError, looper.loop)
+
+    def test_user_stop(self):
+        ref = self.run_looper(0, stop_at=10)
+        self.assertEqual(ref.nEvProcessed, 10)
+        self.assertEqual(ref.nextEntry, 10)
+        # only the events of the completed blocks are counted
+        looper = self.run_looper(7, stop_at=10)
+        self.assertTrue(looper.userStop)
+        self.assertEqual(looper.nEvProcessed, 7)
+        self.assertEqual(looper.nextEntry, 7)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -2,6 +2,7 @@ import unittest
 import os
 import shutil
 import copy
+import tempfile
 
 import config as cfg
 from analyzer import Analyzer 
@@ -18,6 +19,25 @@ class ConfigTestCase(unittest.TestCase):
         # to make sure the output directory name does not contain a subdirectory
         self.assertTrue( '/' not in ana1.name )
 
+    def test_analyzer_by_name(self):
+        # the class is loaded from the heppy package,
+        # which may not be the config and analyzer modules imported above
+        import heppy.framework.config as cfg
+        from heppy.framework.analyzer import Analyzer
+        ana = cfg.Analyzer(
+            'heppy.framework.analyzer.Analyzer',
+            'by_name'
+            )
+        self.assertEqual(ana.name, 'heppy.framework.analyzer.Analyzer_by_name')
+        self.assertIs(ana.load_class(), Analyzer)
+        self.assertIs(ana.class_object, Analyzer)
+        # not an analyzer, found when loading the class
+        ana = cfg.Analyzer(
+            'heppy.framework.config.Component',
+            'not_an_analyzer'
+            )
+        self.assertRaises(ValueError, ana.load_class)
+
     def test_MCComponent(self):
         DYJets = cfg.MCComponent(
             name = 'DYJets',
@@ -88,6 +108,37 @@ class ConfigTestCase(unittest.TestCase):
         with open(tmpfname) as infile:
             ana2 = pickle.load(infile)
             self.assertEqual(ana2.fun(1), 1)
+
+    def test_event_ranges(self):
+        counts = [('a', 10), ('b', 0), ('c', 5), ('d', 10)]
+        jobs = cfg.event_ranges(counts, 8)
+        self.assertEqual(len(jobs), 3)
+        self.assertEqual([sum(nev for f, first, nev in job) for job in jobs],
+                         [9, 8, 8])
+        self.assertEqual(jobs[0], [('a', 0, 9)])
+        self.assertEqual(jobs[1], [('a', 9, 1), ('c', 0, 5), ('d', 0, 2)])
+        self.assertEqual(jobs[2], [('d', 2, 8)])
+        self.assertEqual(cfg.event_ranges([('a', 0)], 8), [])
+
+    def test_split_events(self):
+        from heppy.framework.entries import EntryCounts
+        class Events(object):
+            nentries = dict(a=100, b=50)
+            def __init__(self, files, tree_name=None):
+                self.files = files
+            def __len__(self):
+                return self.nentries[self.files[0]]
+        fd, cache_fname = tempfile.mkstemp()
+        os.close(fd)
+        os.remove(cache_fname)
+        comp = cfg.Component('comp', files=['a', 'b'], eventsPerJob=60)
+        comps = cfg.split([comp], Events, EntryCounts(cache_fname))
+        self.assertEqual(len(comps), 3)
+        self.assertEqual(comps[1].name, 'comp_Chunk1')
+        self.assertEqual(comps[1].files, ['a'])
+        self.assertEqual(comps[1].eventRanges, [('a', 50, 50)])
+        self.assertEqual(comps[2].eventRanges, [('b', 0, 50)])
+        os.remove(cache_fname)
         
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,56 @@
+import unittest
+import os
+import tempfile
+import shutil
+
+from entries import EntryCounts
+
+class Events(object):
+    '''Dummy events class, counting how many times files are opened.'''
+    nopen = 0
+    def __init__(self, files, tree_name=None):
+        Events.nopen += 1
+        with open(files[0]) as infile:
+            self.nentries = len(infile.readlines())
+    def __len__(self):
+        return self.nentries
+
+
+class EntryCountsTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.fname = '/'.join([self.tmpdir, 'input.txt'])
+        with open(self.fname, 'w') as out:
+            out.write('1\n2\n3\n')
+        self.cache_fname = '/'.join([self.tmpdir, 'cache', 'entries.json'])
+        Events.nopen = 0
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_count(self):
+        counts = EntryCounts(self.cache_fname)
+        self.assertEqual(counts.count(self.fname, 'tree', Events), 3)
+        self.assertEqual(counts.count(self.fname, 'tree', Events), 3)
+        self.assertEqual(Events.nopen, 1)
+        counts.save()
+        self.assertTrue(os.path.isfile(self.cache_fname))
+        # reading from the cache file
+        counts = EntryCounts(self.cache_fname)
+        self.assertEqual(counts.count(self.fname, 'tree', Events), 3)
+        self.assertEqual(Events.nopen, 1)
+
+    def test_modified_file(self):
+        counts = EntryCounts(self.cache_fname)
+        counts.count(self.fname, 'tree', Events)
+        with open(self.fname, 'a') as out:
+            out.write('4\n')
+        mtime = os.path.getmtime(self.fname) + 10
+        os.utime(self.fname, (mtime, mtime))
+        self.assertEqual(counts.count(self.fname, 'tree', Events), 4)
+        self.assertEqual(Events.nopen, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,6 +1,7 @@
 import unittest
 import pprint
 from event import Event
+from products import ProductRegistry
 
 class LongPrintout(object):
     def __init__(self, value):
@@ -41,6 +42,35 @@ class EventTest(unittest.TestCase):
         self.assertTrue(True)
         str(self.pevent)
         self.assertTrue(True)        
+
+    def test_products(self):
+        event = Event(0)
+        event.put('jets', [1, 2])
+        self.assertEqual(event.jets, [1, 2])
+        event.muons = []
+        self.assertEqual(event.get('muons'), [])
+        self.assertEqual(sorted(event.products()), ['jets', 'muons'])
+        self.assertTrue('jets' in event)
+        del event.jets
+        self.assertFalse(hasattr(event, 'jets'))
+        self.assertEqual(event.get('jets', None), None)
+        self.assertRaises(AttributeError, event.delete, 'jets')
+        event.free('muons', 'an_analyzer')
+        self.assertRaises(AttributeError, getattr, event, 'muons')
+        # core attributes are not products
+        event.eventWeight = 2
+        self.assertEqual(sorted(event.products()), [])
+
+    def test_registry(self):
+        registry = ProductRegistry(['producer', 'reader'])
+        event = Event(0, registry=registry)
+        registry.current = 'producer'
+        event.jets = []
+        registry.current = 'reader'
+        event.jets
+        registry.current = None
+        self.assertEqual(registry.producers, {'jets': set(['producer'])})
+        self.assertEqual(registry.readers, {'jets': set(['reader'])})
         
         
         
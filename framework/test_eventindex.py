@@ -0,0 +1,57 @@
+import unittest
+import tempfile
+import shutil
+
+from eventindex import EventIndex
+
+class EventIndexTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.dirname = tempfile.mkdtemp()
+        self.fname = '/'.join([self.dirname, EventIndex.fname])
+
+    def tearDown(self):
+        shutil.rmtree(self.dirname)
+
+    def test_from_entries(self):
+        index = EventIndex.from_entries([5, 1, 12, 5], ['a', 'b'], [10, 5])
+        self.assertEqual(len(index), 3)
+        self.assertEqual(index.selected('a').tolist(), [1, 5])
+        self.assertEqual(index.selected('b').tolist(), [2])
+        self.assertIsNone(index.selected('c'))
+
+    def test_chain_entries(self):
+        index = EventIndex.from_entries([1, 12], ['a', 'b'], [10, 5])
+        sizes = dict(a=10, b=5, c=3)
+        self.assertEqual(index.chain_entries(['a', 'b'], sizes.get).tolist(),
+                         [1, 12])
+        # file a not in the chain
+        self.assertEqual(index.chain_entries(['c', 'b'], sizes.get).tolist(),
+                         [5])
+
+    def test_write_load(self):
+        # sparse selection in a, stored as entries, dense in b, stored as a bitmap
+        index = EventIndex.from_entries([3, 1000, 1001, 1007], ['a', 'b'], [1000, 10],
+                                        tree_name='events')
+        index.write(self.fname)
+        loaded = EventIndex.load(self.fname)
+        self.assertEqual(loaded.tree_name, 'events')
+        self.assertEqual(loaded.files, ['a', 'b'])
+        self.assertEqual(loaded.nentries, [1000, 10])
+        self.assertEqual(loaded.selected('a').tolist(), [3])
+        self.assertEqual(loaded.selected('b').tolist(), [0, 1, 7])
+
+    def test_add(self):
+        index1 = EventIndex.from_entries([1, 12], ['a', 'b'], [10, 5])
+        index2 = EventIndex.from_entries([2, 8], ['b', 'c'], [5, 5])
+        index1 += index2
+        self.assertEqual(index1.files, ['a', 'b', 'c'])
+        self.assertEqual(index1.selected('b').tolist(), [2])
+        self.assertEqual(index1.selected('c').tolist(), [3])
+        self.assertEqual(len(index1), 3)
+        index3 = EventIndex.from_entries([], ['a'], [20])
+        self.assertRaises(ValueError, index1.__add__, index3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,38 @@
+import unittest
+
+from eventscolumnar import Events
+from heppy.utils.testtree import create_tree
+
+testfname = 'test_tree.root'
+
+class EventsColumnarTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.fname = create_tree()
+        self.events = Events([testfname], 'test_tree')
+        self.events.cluster_size = 30
+
+    def test_get(self):
+        self.assertEqual(self.events[2].var1, 2.)
+        self.assertEqual(self.events.touched_branches, set(['var1']))
+        self.assertEqual((self.events.start, self.events.stop), (0, 30))
+        self.assertEqual(self.events[45].var1, 45.)
+        self.assertEqual((self.events.start, self.events.stop), (30, 60))
+
+    def test_iterate(self):
+        for iev, ev in enumerate(self.events):
+            self.assertEqual(iev, ev.var1)
+        self.assertEqual(iev+1, len(self.events))
+
+    def test_arrays(self):
+        arrays = self.events.arrays(['var1'], 10, 20)
+        self.assertEqual(list(arrays['var1']), range(10, 20))
+        columns, start = self.events.cluster_arrays(35, ['var1'])
+        self.assertEqual(start, 30)
+        self.assertEqual(len(columns['var1']), 30)
+
+    def test_bad_branch(self):
+        self.assertRaises(AttributeError, getattr, self.events[0], 'nobranch')
+
+if __name__ == '__main__':
+    unittest.main()
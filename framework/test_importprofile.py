@@ -0,0 +1,27 @@
+import unittest
+import sys
+import __builtin__
+
+from importprofile import ImportProfile
+
+class ImportProfileTestCase(unittest.TestCase):
+
+    def test_profile(self):
+        sys.modules.pop('colorsys', None)
+        builtin_import = __builtin__.__import__
+        profile = ImportProfile()
+        profile.start()
+        self.assertTrue(profile.active())
+        import colorsys
+        profile.stop()
+        self.assertFalse(profile.active())
+        self.assertIs(__builtin__.__import__, builtin_import)
+        self.assertIn('colorsys', profile.times)
+        cumulative, selftime = profile.times['colorsys']
+        self.assertTrue(0 <= selftime <= cumulative <= profile.total)
+        self.assertEqual(profile.report(1)[0][0],
+                         max(profile.times, key=lambda mod: profile.times[mod][1]))
+
+
+if __name__ == '__main__':
+    unittest.main()
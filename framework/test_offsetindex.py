@@ -0,0 +1,76 @@
+import unittest
+import os
+import tempfile
+import shutil
+
+from offsetindex import OffsetIndex
+
+class Reader(object):
+    '''Dummy sequential reader, counting how many times files are read.'''
+    nread = 0
+    def __call__(self, fname):
+        Reader.nread += 1
+        with open(fname) as infile:
+            return [(1, int(line)) for line in infile]
+
+
+class OffsetIndexTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.fname = '/'.join([self.tmpdir, 'input.txt'])
+        with open(self.fname, 'w') as out:
+            out.write('5\n7\n9\n')
+        self.cache = '/'.join([self.tmpdir, 'cache'])
+        self.old_cache = os.environ.get('HEPPY_CACHE')
+        os.environ['HEPPY_CACHE'] = self.cache
+        Reader.nread = 0
+
+    def tearDown(self):
+        if self.old_cache is None:
+            del os.environ['HEPPY_CACHE']
+        else:
+            os.environ['HEPPY_CACHE'] = self.old_cache
+        os.chmod(self.tmpdir, 0o755)
+        shutil.rmtree(self.tmpdir)
+
+    def test_get(self):
+        index = OffsetIndex.get(self.fname, Reader())
+        self.assertEqual(len(index), 3)
+        self.assertEqual(index[1], (1, 7))
+        self.assertTrue(os.path.isfile(self.fname + OffsetIndex.suffix))
+        index = OffsetIndex.get(self.fname, Reader())
+        self.assertEqual(index[2], (1, 9))
+        self.assertEqual(Reader.nread, 1)
+
+    def test_modified_file(self):
+        OffsetIndex.get(self.fname, Reader())
+        with open(self.fname, 'a') as out:
+            out.write('11\n')
+        mtime = os.path.getmtime(self.fname) + 10
+        os.utime(self.fname, (mtime, mtime))
+        index = OffsetIndex.get(self.fname, Reader())
+        self.assertEqual(len(index), 4)
+        self.assertEqual(Reader.nread, 2)
+
+    def test_read_only_directory(self):
+        os.chmod(self.tmpdir, 0o555)
+        if os.access(self.tmpdir, os.W_OK):
+            # running as root
+            return
+        os.chmod(self.tmpdir, 0o755)
+        os.mkdir(self.cache)
+        os.chmod(self.tmpdir, 0o555)
+        index = OffsetIndex.get(self.fname, Reader())
+        self.assertEqual(len(index), 3)
+        self.assertFalse(os.path.isfile(self.fname + OffsetIndex.suffix))
+        OffsetIndex.get(self.fname, Reader())
+        self.assertEqual(Reader.nread, 1)
+
+    def test_empty(self):
+        index = OffsetIndex('empty', [])
+        self.assertEqual(len(index), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
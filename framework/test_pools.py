@@ -0,0 +1,48 @@
+import unittest
+
+import pools
+from pools import ObjectPool
+from memory import rss
+
+class Point(object):
+    def __init__(self, x=0):
+        self.x = x
+
+def reset(point, x=0):
+    point.x = x
+
+
+class ObjectPoolTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.pool = ObjectPool('Point', Point, reset)
+
+    def tearDown(self):
+        pools.enable(False)
+
+    def test_disabled(self):
+        p1 = self.pool.get(1)
+        self.pool.release()
+        p2 = self.pool.get(2)
+        self.assertTrue(p1 is not p2)
+        self.assertEqual(self.pool.created, 0)
+
+    def test_recycling(self):
+        pools.enable()
+        event1 = [self.pool.get(i) for i in range(3)]
+        pools.release_all()
+        event2 = [self.pool.get(i+10) for i in range(4)]
+        self.assertEqual([p.x for p in event2], [10, 11, 12, 13])
+        # the objects of the first event are reused
+        self.assertEqual(len(set(map(id, event1)) & set(map(id, event2))), 3)
+        self.assertEqual((self.pool.created, self.pool.reused), (4, 3))
+        self.assertTrue(('Point', 4, 3) in pools.report())
+        pools.enable(False)
+        self.assertEqual(self.pool.free, [])
+
+    def test_rss(self):
+        self.assertTrue(rss() > 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,68 @@
+import unittest
+
+from prefetch import Prefetcher
+
+class Events(object):
+    '''Backend returning the same object for all entries, like Chain.'''
+
+    def __init__(self, nentries=50, bad_entry=None):
+        self.nentries = nentries
+        self.bad_entry = bad_entry
+        self.current = None
+
+    def __len__(self):
+        return self.nentries
+
+    def __getitem__(self, index):
+        if index == self.bad_entry:
+            raise ValueError('bad entry')
+        self.current = index
+        return self
+
+
+class PrefetcherTestCase(unittest.TestCase):
+
+    def test_sequential(self):
+        events = Prefetcher(Events(), Events, depth=3)
+        self.assertEqual(len(events), 50)
+        for index in range(len(events)):
+            entry = events[index]
+            self.assertEqual(entry.current, index)
+        events.stop()
+        report = events.report()
+        self.assertEqual(report['entries'], 50)
+        self.assertEqual(report['restarts'], 0)
+
+    def test_out_of_sequence(self):
+        events = Prefetcher(Events(), Events, depth=2)
+        self.assertEqual(events[10].current, 10)
+        self.assertEqual(events[3].current, 3)
+        self.assertEqual(events[4].current, 4)
+        events.stop()
+        self.assertEqual(events.report()['restarts'], 1)
+
+    def test_entries(self):
+        events = Prefetcher(Events(), Events, depth=2)
+        entries = range(0, 50, 4)
+        events.set_entries(entries)
+        for index in entries:
+            entry = events[index]
+            self.assertEqual(entry.current, index)
+        events.stop()
+        self.assertEqual(events.report()['restarts'], 0)
+
+    def test_error(self):
+        factory = lambda : Events(bad_entry=5)
+        events = Prefetcher(factory(), factory, depth=2)
+        for index in range(5):
+            events[index]
+        self.assertRaises(ValueError, events.__getitem__, 5)
+        events.stop()
+
+    def test_attributes(self):
+        events = Prefetcher(Events(), Events)
+        self.assertEqual(events.nentries, 50)
+        
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,58 @@
+import unittest
+import tempfile
+import shutil
+
+from products import ProductRegistry
+
+class ProductRegistryTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.registry = ProductRegistry(['source', 'builder', 'unused', 'tree'])
+        for ana, products in [('source', ['particles']),
+                              ('builder', ['jets']),
+                              ('unused', ['leptons'])]:
+            self.registry.current = ana
+            for name in products:
+                self.registry.put(name)
+        self.registry.current = 'builder'
+        self.registry.get('particles')
+        self.registry.current = 'tree'
+        self.registry.get('jets')
+        self.registry.current = None
+
+    def test_unused_after(self):
+        self.assertEqual(self.registry.unused_after(0), [])
+        self.assertEqual(self.registry.unused_after(1), ['particles'])
+        self.assertEqual(sorted(self.registry.unused_after(2)),
+                         ['leptons', 'particles'])
+        self.assertEqual(len(self.registry.unused_after(3)), 3)
+
+    def test_report(self):
+        report = self.registry.report()
+        self.assertEqual(report['unread'], ['leptons'])
+        self.assertEqual(report['dead_weight'], ['unused'])
+        self.assertEqual(report['products']['jets'],
+                         dict(producers=['builder'], readers=['tree']))
+
+    def test_write_load_add(self):
+        dirname = tempfile.mkdtemp()
+        self.registry.write(dirname)
+        loaded = ProductRegistry.load('/'.join([dirname, ProductRegistry.fname]))
+        shutil.rmtree(dirname)
+        self.assertEqual(loaded.report(), self.registry.report())
+        other = ProductRegistry(self.registry.analyzers)
+        other.current = 'tree'
+        other.get('leptons')
+        loaded += other
+        self.assertEqual(loaded.report()['unread'], [])
+        self.assertRaises(ValueError, loaded.__add__, ProductRegistry(['source']))
+
+    def test_learning(self):
+        self.assertTrue(self.registry.learning())
+        for i in range(ProductRegistry.learning_events):
+            self.registry.end_event()
+        self.assertFalse(self.registry.learning())
+
+
+if __name__ == '__main__':
+    unittest.main()
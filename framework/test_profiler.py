@@ -0,0 +1,68 @@
+import unittest
+import tempfile
+import shutil
+import json
+import pstats
+import os
+
+from profiler import AnalyzerProfiler, tracemalloc
+
+def work(n):
+    return [float(i) for i in range(n)]
+
+
+class ProfilerTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.dirname = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.dirname)
+
+    def test_profile(self):
+        profiler = AnalyzerProfiler('ana', sample=2)
+        for i in range(5):
+            profiler.start()
+            work(1000)
+            profiler.stop()
+        summary = profiler.summary()
+        self.assertEqual(summary['analyzer'], 'ana')
+        self.assertEqual(summary['calls'], 5)
+        self.assertTrue(summary['time'] > 0)
+        work_stats = [func for func in summary['functions']
+                      if func['function'] == 'work']
+        self.assertEqual(len(work_stats), 1)
+        self.assertEqual(work_stats[0]['calls'], 5)
+        if summary['memory']['tracemalloc']:
+            # calls 0, 2, 4 are sampled
+            self.assertEqual(summary['memory']['samples'], 3)
+
+    def test_write(self):
+        profiler = AnalyzerProfiler('ana')
+        profiler.start()
+        work(10)
+        profiler.stop()
+        profiler.write(self.dirname)
+        with open('/'.join([self.dirname, 'profile.json'])) as infile:
+            summary = json.load(infile)
+        self.assertEqual(summary['calls'], 1)
+        stats = pstats.Stats('/'.join([self.dirname, 'profile.pstats']))
+        self.assertTrue(stats.total_calls > 0)
+
+    def test_no_call(self):
+        profiler = AnalyzerProfiler('ana')
+        profiler.write(self.dirname)
+        self.assertTrue(os.path.exists('/'.join([self.dirname, 'profile.pstats'])))
+        self.assertEqual(profiler.summary()['functions'], [])
+
+    def test_end_loop(self):
+        profiler = AnalyzerProfiler('ana')
+        profiler.start()
+        profiler.stop()
+        profiler.endLoop()
+        if tracemalloc is not None:
+            self.assertFalse(tracemalloc.is_tracing())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,94 @@
+import unittest
+
+from heppy.framework.analyzer import Analyzer
+import heppy.framework.config as cfg
+from scheduler import schedule, Node
+
+class Producer(Analyzer):
+    pure_producer = True
+
+class Filter(Analyzer):
+    is_filter = True
+
+class TreeProducer(Analyzer):
+    pass
+
+
+class SchedulerTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.source = cfg.Analyzer(Producer, 'source',
+                                   outputs=['rec_particles'], keep=True)
+        self.leptons = cfg.Analyzer(Producer, 'leptons',
+                                    output='leptons',
+                                    input_objects='rec_particles')
+        self.zeds = cfg.Analyzer(Producer, 'zeds',
+                                 output='zeds',
+                                 leg_collection='leptons')
+        self.jets = cfg.Analyzer(Producer, 'jets',
+                                 output='jets',
+                                 particles='rec_particles')
+        self.unused = cfg.Analyzer(Producer, 'unused',
+                                   output='photons',
+                                   input_objects='rec_particles')
+        self.zfilter = cfg.Analyzer(Filter, 'zfilter',
+                                    input_objects='zeds',
+                                    min_number=1)
+        self.tree = cfg.Analyzer(TreeProducer, 'tree',
+                                 zeds='zeds', legs='zeds_legs', jets='jets')
+
+    def test_io(self):
+        node = Node(self.zeds)
+        self.assertEqual(node.outputs, set(['zeds']))
+        self.assertEqual(node.inputs, set(['leptons']))
+        self.assertTrue(Node(self.zfilter).is_filter)
+        self.assertTrue(Node(self.tree).reads(['zeds']))
+        self.assertFalse(Node(self.tree).reads(['leptons']))
+
+    def test_schedule(self):
+        sequence = cfg.Sequence(self.source, self.leptons, self.jets,
+                                self.unused, self.zeds, self.zfilter, self.tree)
+        scheduled, report = schedule(sequence)
+        self.assertEqual(report['removed'], [self.unused.name])
+        # the filter is moved before the jets, but after the zeds it reads
+        self.assertEqual([ana.name for ana in scheduled],
+                         [ana.name for ana in [self.source, self.leptons,
+                                               self.zeds, self.zfilter,
+                                               self.jets, self.tree]])
+        self.assertEqual(report['moved'], [(self.zfilter.name, 4, 3)])
+
+    def test_no_move_before_writer(self):
+        sequence = cfg.Sequence(self.source, self.leptons, self.zeds,
+                                self.jets, self.tree, self.zfilter)
+        scheduled, report = schedule(sequence)
+        self.assertEqual(scheduled[-1].name, self.zfilter.name)
+        self.assertEqual(report['moved'], [])
+
+    def test_explicit_inputs(self):
+        selection = cfg.Analyzer(TreeProducer, 'selection', inputs=['photons'])
+        sequence = cfg.Sequence(self.source, self.unused, selection)
+        scheduled, report = schedule(sequence)
+        self.assertEqual(report['removed'], [])
+
+    def test_undeclared_producer(self):
+        # e.g. a producer rejecting events, or read by name by the tree
+        clusterizer = cfg.Analyzer(TreeProducer, 'clusterizer',
+                                   output='photons',
+                                   input_objects='rec_particles')
+        sequence = cfg.Sequence(self.source, clusterizer, self.jets,
+                                self.zeds, self.zfilter)
+        scheduled, report = schedule(sequence)
+        self.assertEqual(report['removed'], [self.jets.name])
+        self.assertFalse(Node(clusterizer).pure_producer())
+        # the filter is not moved before the clusterizer
+        self.assertEqual([ana.name for ana in scheduled],
+                         [ana.name for ana in [self.source, clusterizer,
+                                               self.zeds, self.zfilter]])
+        self.unused.pure_producer = False
+        sequence = cfg.Sequence(self.source, self.unused)
+        scheduled, report = schedule(sequence)
+        self.assertEqual(report['removed'], [])
+
+
+if __name__ == '__main__':
+    unittest.main()
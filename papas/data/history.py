@@ -0,0 +1,274 @@
+'''Compact history of a papas event'''
+from array import array
+import numpy as np
+
+from heppy.papas.graphtools.unionfind import connected_components
+
+
+class HistoryNode(object):
+    '''Node of a L{History}, with the interface of the DAG Node.
+
+    A HistoryNode is only a view on the arrays of the History,
+    created when needed, eg by history[uid].
+    '''
+
+    __slots__ = ('history', 'index')
+
+    def __init__(self, history, index):
+        self.history = history
+        self.index = index
+
+    @property
+    def value(self):
+        return self.history.ids[self.index]
+
+    def get_value(self):
+        return self.value
+
+    def accept(self, visitor):
+        visitor.visit(self)
+
+    def add_child(self, child):
+        '''add a link from this node to child, a node of any type with a get_value method'''
+        self.history.add_link(self.value, child.get_value())
+
+    def add_parent(self, parent):
+        '''add a link from parent to this node'''
+        self.history.add_link(parent.get_value(), self.value)
+
+    @property
+    def children(self):
+        return self.get_linked_nodes("children")
+
+    @property
+    def parents(self):
+        return self.get_linked_nodes("parents")
+
+    @property
+    def undirected_links(self):
+        return self.get_linked_nodes("undirected")
+
+    def get_linked_nodes(self, type):
+        '''return a list of the linked children/parents/undirected links'''
+        return [HistoryNode(self.history, i)
+                for i in self.history.adjacency(type)[self.index]]
+
+    def __eq__(self, other):
+        return (isinstance(other, HistoryNode) and
+                self.history is other.history and self.index == other.index)
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash((id(self.history), self.index))
+
+    def __repr__(self):
+        return self.__str__()
+
+    def __str__(self):
+        return str('node: {val} {children}'.format(
+            val=self.value,
+            children=self.children
+        ))
+
+
+class History(object):
+    '''History of a papas event: which element (particle, track, cluster, block...)
+    was made from which other elements.
+
+    It can be used as a dict of DAG Nodes indexed by unique id,
+    eg history[uid].add_child(history[childid]), but does not keep a Node per id.
+    Each id is given an integer index, and the links are stored in two arrays
+    of parent and child indices, and in append-only lists of the linked indices
+    of each index, so that adding a link does not require any rebuild.
+    When the history is queried several times without modification,
+    the links are converted to compressed sparse row (CSR) arrays,
+    and the breadth first searches work on whole levels of the graph with numpy.
+    Otherwise, e.g. when links are added between the queries,
+    the breadth first searches go through the lists.
+
+    attributes:
+       ids: list of the unique ids, in order of insertion
+       index: dict giving the integer index of each unique id
+       parents: array of the parent index of each link
+       children: array of the child index of each link
+
+    Usage:
+       history = History()
+       history.add_link(parentid, childid)
+       linked_ids = history.linked_ids(childid, "parents")
+    '''
+
+    # number of queries without modification after which the CSR arrays are built
+    csr_queries = 10
+
+    def __init__(self):
+        self.ids = []
+        self.index = dict()
+        self.parents = array('l')
+        self.children = array('l')
+        self._links = dict(children=[], parents=[], undirected=[])
+        self._csr = dict()
+        self._queries = 0
+
+    def _modified(self):
+        self._csr.clear()
+        self._queries = 0
+
+    def _add(self, uid):
+        index = self.index.get(uid)
+        if index is None:
+            index = len(self.ids)
+            self.index[uid] = index
+            self.ids.append(uid)
+            for links in self._links.itervalues():
+                links.append([])
+            self._modified()
+        return index
+
+    def add_link(self, parentid, childid):
+        '''record that childid was made from parentid, adding the ids if needed'''
+        parent = self._add(parentid)
+        child = self._add(childid)
+        self.parents.append(parent)
+        self.children.append(child)
+        self._links['children'][parent].append(child)
+        self._links['parents'][child].append(parent)
+        self._links['undirected'][parent].append(child)
+        self._links['undirected'][child].append(parent)
+        self._modified()
+
+    def adjacency(self, direction):
+        '''returns the list of the linked indices of each index in a given direction,
+        in the order in which the links were added. The lists must not be modified.
+        @param direction: parents/children/undirected
+        '''
+        try:
+            return self._links[direction]
+        except KeyError:
+            raise ValueError('no such direction: ' + str(direction))
+
+    def csr(self, direction):
+        '''returns the (indptr, indices) CSR arrays of the links in a given direction:
+        the indices linked to index i are indices[indptr[i]:indptr[i+1]],
+        in the order in which the links were added.
+        @param direction: parents/children/undirected
+        '''
+        if direction not in self._csr:
+            parents = np.frombuffer(self.parents, dtype=np.int_) if len(self.parents) else np.zeros(0, dtype=np.int_)
+            children = np.frombuffer(self.children, dtype=np.int_) if len(self.children) else np.zeros(0, dtype=np.int_)
+            order = np.arange(len(parents))
+            if direction == "children":
+                src, dst = parents, children
+            elif direction == "parents":
+                src, dst = children, parents
+            elif direction == "undirected":
+                src = np.concatenate([parents, children])
+                dst = np.concatenate([children, parents])
+                order = np.concatenate([order, order])
+            else:
+                raise ValueError('no such direction: ' + str(direction))
+            sort = np.lexsort((order, src))
+            indptr = np.zeros(len(self.ids) + 1, dtype=np.int_)
+            np.cumsum(np.bincount(src, minlength=len(self.ids)), out=indptr[1:])
+            self._csr[direction] = indptr, dst[sort]
+        return self._csr[direction]
+
+    def linked_ids(self, uid, direction="undirected"):
+        '''returns all ids linked to uid, including uid, in breadth first order,
+        as BreadthFirstSearchIterative.
+        @param uid: unique identifier, KeyError is raised if it is not in the history
+        @param direction: parents/children/undirected
+        '''
+        links = self.adjacency(direction)
+        start = self.index[uid]
+        self._queries += 1
+        if direction not in self._csr and self._queries < self.csr_queries:
+            # the history is being modified, building the CSR arrays is not worth it
+            visited = set([start])
+            indices = [start]
+            # indices grows while iterating, level by level
+            for index in indices:
+                for linked in links[index]:
+                    if linked not in visited:
+                        visited.add(linked)
+                        indices.append(linked)
+            return [self.ids[i] for i in indices]
+        indptr, indices = self.csr(direction)
+        visited = np.zeros(len(self.ids), dtype=bool)
+        visited[start] = True
+        frontier = np.array([start], dtype=np.int_)
+        levels = [frontier]
+        while len(frontier):
+            # all links of the current level, in order
+            begins = indptr[frontier]
+            counts = indptr[frontier + 1] - begins
+            offsets = np.cumsum(counts) - counts
+            links = np.repeat(begins - offsets, counts) + np.arange(counts.sum())
+            linked = indices[links]
+            linked = linked[~visited[linked]]
+            # first occurence of each new index, keeping the order
+            linked, first = np.unique(linked, return_index=True)
+            frontier = linked[np.argsort(first)]
+            visited[frontier] = True
+            levels.append(frontier)
+        return [self.ids[i] for i in np.concatenate(levels)]
+
+    def subgroups(self):
+        '''returns the lists of connected ids, each sorted in decreasing order'''
+        return connected_components(self.ids, ((self.ids[p], self.ids[c])
+                                               for p, c in zip(self.parents, self.children)))
+
+    # dict of Nodes interface
+
+    def __getitem__(self, uid):
+        return HistoryNode(self, self.index[uid])
+
+    def __setitem__(self, uid, node):
+        '''adds uid, and the links of node if it is a DAG Node'''
+        self._add(uid)
+        for child in getattr(node, 'children', []):
+            self.add_link(uid, child.get_value())
+        for parent in getattr(node, 'parents', []):
+            self.add_link(parent.get_value(), uid)
+
+    def setdefault(self, uid, node=None):
+        if uid not in self.index:
+            self[uid] = node
+        return self[uid]
+
+    def get(self, uid, default=None):
+        if uid in self.index:
+            return self[uid]
+        return default
+
+    def __contains__(self, uid):
+        return uid in self.index
+
+    def has_key(self, uid):
+        return uid in self.index
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __iter__(self):
+        return iter(self.ids)
+
+    def keys(self):
+        return list(self.ids)
+
+    def iterkeys(self):
+        return iter(self.ids)
+
+    def itervalues(self):
+        return (HistoryNode(self, i) for i in xrange(len(self.ids)))
+
+    def values(self):
+        return list(self.itervalues())
+
+    def iteritems(self):
+        return ((uid, HistoryNode(self, i)) for i, uid in enumerate(self.ids))
+
+    def items(self):
+        return list(self.iteritems())
@@ -51,6 +51,8 @@ class HistoryHelper(object):
         @param uid: unique identifier
         @param direction: parents/children/undirected
         '''
+        if hasattr(self.history, 'linked_ids'):
+            return self.history.linked_ids(uid, direction)
         BFS = BreadthFirstSearchIterative(self.history[uid], direction)
         return [v.get_value() for v in BFS.result] 
 
@@ -149,10 +151,13 @@ class HistoryHelper(object):
         ''' Divide the event into connected subgroups 
             each subgroup is a list of ids
         '''        
-        self.subgraphs = []
-        for subgraphlist in DAGFloodFill(self.history).subgraphs:
-            element_ids = [node.get_value() for node in subgraphlist]            
-            self.subgraphs.append(sorted(element_ids, reverse = True)) 
+        if hasattr(self.history, 'subgroups'):
+            self.subgraphs = self.history.subgroups()
+        else:
+            self.subgraphs = []
+            for subgraphlist in DAGFloodFill(self.history).subgraphs:
+                element_ids = [node.get_value() for node in subgraphlist]            
+                self.subgraphs.append(sorted(element_ids, reverse = True)) 
         self.subgraphs.sort(key = len, reverse = True) #biggest to smallest group
         return self.subgraphs
     
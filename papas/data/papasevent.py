@@ -1,5 +1,6 @@
 from heppy.papas.data.idcoder import IdCoder
 from heppy.framework.event import Event
+from heppy.papas.data.history import History
 
 
 class PapasEvent(Event):
@@ -38,13 +39,16 @@ class PapasEvent(Event):
              's' simulated (particles)
                  smeared (tracks ecals hcals)
                  split (blocks) 
+
+        The history is a L{History}, which can be used as a dict of DAG Nodes indexed by uniqueid
+        but stores the links in compact arrays.
     '''
     
     def __init__(self, iEv):
         super(PapasEvent, self).__init__(iEv)
         IdCoder.reset()
         self.collections = dict()
-        self.history = dict()    
+        self.history = History()
         
     def add_collection(self, collection):
         '''Add a new collection into the PapasEvent. The collection should contain only one object type
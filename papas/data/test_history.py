@@ -0,0 +1,80 @@
+import unittest
+import random
+from heppy.papas.graphtools.DAG import Node, BreadthFirstSearchIterative, DAGFloodFill
+from history import History
+
+class TestHistory(unittest.TestCase):
+
+    def setUp(self):
+        '''
+        called before every test. Makes the same random graph
+        as a History and as a dict of Nodes
+        '''
+        rnd = random.Random(0xdeadbeef)
+        self.ids = rnd.sample(xrange(1000), 200)
+        self.history = History()
+        self.nodes = dict()
+        for i in range(150):
+            parentid, childid = rnd.sample(self.ids, 2)
+            parent = self.history.setdefault(parentid, Node(parentid))
+            parent.add_child(self.history.setdefault(childid, Node(childid)))
+            parent = self.nodes.setdefault(parentid, Node(parentid))
+            parent.add_child(self.nodes.setdefault(childid, Node(childid)))
+        for uid in self.ids:
+            self.history.setdefault(uid, Node(uid))
+            self.nodes.setdefault(uid, Node(uid))
+
+    def test_dict(self):
+        self.assertEqual(len(self.history), len(self.nodes))
+        self.assertEqual(sorted(self.history.keys()), sorted(self.nodes.keys()))
+        uid = self.ids[0]
+        self.assertEqual(self.history[uid], self.history[uid])
+        self.assertEqual([node.get_value() for node in self.history[uid].undirected_links],
+                         [node.get_value() for node in self.nodes[uid].undirected_links])
+        self.assertRaises(KeyError, self.history.__getitem__, 1000)
+
+    def test_linked_ids(self):
+        for uid in self.ids:
+            for direction in ['children', 'parents', 'undirected']:
+                BFS = BreadthFirstSearchIterative(self.nodes[uid], direction)
+                self.assertEqual(self.history.linked_ids(uid, direction),
+                                 [node.get_value() for node in BFS.result])
+
+    def test_subgroups(self):
+        subgroups = [sorted((node.get_value() for node in subgraph), reverse=True)
+                     for subgraph in DAGFloodFill(self.nodes, dosorting=True).subgraphs]
+        self.assertEqual(self.history.subgroups(), subgroups)
+
+    def test_incremental(self):
+        history = History()
+        history.csr_queries = 0
+        for uid in self.history:
+            history.setdefault(uid, Node(uid))
+        for parent, child in zip(self.history.parents, self.history.children):
+            history.add_link(self.history.ids[parent], self.history.ids[child])
+        rnd = random.Random(1)
+        for i in range(100):
+            parentid, childid = rnd.sample(self.ids[:50], 2)
+            self.history.add_link(parentid, childid)
+            history.add_link(parentid, childid)
+            for direction in ['children', 'parents', 'undirected']:
+                # breadth first search in the lists and in the CSR arrays
+                self.assertEqual(self.history.linked_ids(childid, direction),
+                                 history.linked_ids(childid, direction))
+                self.assertEqual(self.history.linked_ids(parentid, direction),
+                                 history.linked_ids(parentid, direction))
+
+    def test_setitem(self):
+        history = History()
+        node = Node(2)
+        node.add_child(Node(3))
+        history[2] = node
+        history[1] = Node(1)
+        history[1].add_child(history[2])
+        self.assertEqual(history.keys(), [2, 3, 1])
+        self.assertEqual(history.linked_ids(1, 'children'), [1, 2, 3])
+        self.assertEqual(history.linked_ids(3, 'parents'), [3, 2, 1])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,153 @@
+import numpy as np
+
+from heppy.papas.graphtools.edge import Edge
+
+class SparseEdges(object):
+    ''' SparseEdges stores the linked edges between a set of ids.
+        Pairs of ids that are not linked are not stored.
+        Each id is given an integer index, its position in the list of ids,
+        the ends of the linked edges are stored as pairs of indices,
+        and the distances in a numpy array.
+        Edge objects are only created when asked for, eg by linked_edges.
+
+        attributes:
+
+        ids : list of unique identifiers eg of tracks, clusters etc
+        index : dict giving the integer index of each id
+        ends : numpy array of shape (nlinks, 2) with the indices of the ends of each linked edge
+        distances : numpy array of the distances of the linked edges (nan for no distance)
+
+        Usage example:
+            edges = SparseEdges(ids, [(id1, id2)], [0.1])
+            for edge in edges.linked_edges(id1):
+                print edge
+    '''
+    def __init__(self, ids, pairs=(), distances=()):
+        '''
+        ids : list of unique identifiers
+        pairs : list of (id1, id2) tuples, one for each linked edge
+        distances : list of the distances of the linked edges, may contain None
+        '''
+        self.ids = list(ids)
+        self.index = dict((uid, i) for i, uid in enumerate(self.ids))
+        self.ends = np.array([(self.index[id1], self.index[id2]) for id1, id2 in pairs],
+                             dtype=np.int64).reshape(-1, 2)
+        self.distances = np.array([np.nan if dist is None else dist for dist in distances],
+                                  dtype=np.float64)
+        assert len(self.ends) == len(self.distances)
+        # row of each linked edge, built by get_edge when first needed
+        self._rows = None
+
+    @classmethod
+    def from_edges(cls, ids, edges):
+        ''' Creates the SparseEdges from a dict of Edge objects, as used by the SubgraphBuilder.
+            Only the linked edges between the ids are kept.
+        '''
+        index = set(ids)
+        linked = [edge for edge in edges.itervalues()
+                  if edge.linked and edge.id1 in index and edge.id2 in index]
+        return cls(ids,
+                   [(edge.id1, edge.id2) for edge in linked],
+                   [edge.distance for edge in linked])
+
+    def _from_arrays(self, ids, ends, distances):
+        sparse = SparseEdges(ids)
+        sparse.ends = ends
+        sparse.distances = distances
+        return sparse
+
+    def __len__(self):
+        return len(self.distances)
+
+    def linked_pairs(self):
+        ''' returns the list of (id1, id2) of the linked edges'''
+        return [(self.ids[i1], self.ids[i2]) for i1, i2 in self.ends]
+
+    def _edge(self, row):
+        i1, i2 = self.ends[row]
+        dist = self.distances[row]
+        return Edge(self.ids[i1], self.ids[i2], True, None if np.isnan(dist) else float(dist))
+
+    def edges(self):
+        ''' returns a dict of Edge objects for the linked edges, indexed by edge key'''
+        edges = dict()
+        for row in xrange(len(self)):
+            edge = self._edge(row)
+            edges[edge.key] = edge
+        return edges
+
+    def get_edge(self, id1, id2):
+        ''' returns the Edge between id1 and id2.
+            If they are not linked, the edge is not linked and has no distance.
+        '''
+        if self._rows is None:
+            self._rows = dict()
+            for row, (i1, i2) in enumerate(self.ends.tolist()):
+                self._rows[(min(i1, i2), max(i1, i2))] = row
+        i1, i2 = self.index[id1], self.index[id2]
+        row = self._rows.get((min(i1, i2), max(i1, i2)))
+        if row is not None:
+            return self._edge(row)
+        return Edge(id1, id2, False, None)
+
+    def linked_edges(self, uniqueid, edgetype=None):
+        ''' returns the list of the linked edges of uniqueid, of a given edgetype if specified.
+            The list is sorted by increasing distance, edges without distance being last.
+            For equal distances, the edges are in the order of the other ends in ids.
+        '''
+        i = self.index[uniqueid]
+        rows = np.flatnonzero((self.ends[:, 0] == i) | (self.ends[:, 1] == i))
+        others = self.ends[rows].sum(axis=1) - i
+        dists = self.distances[rows]
+        order = np.lexsort((others, dists))  # nan distances are sorted last
+        edges = []
+        for row in rows[order]:
+            edge = self._edge(row)
+            if edgetype is None or edge.edge_type == edgetype:
+                edges.append(edge)
+        return edges
+
+    def linked_ids(self, uniqueid, edgetype=None):
+        ''' returns the list of the ids linked to uniqueid, sorted as in linked_edges'''
+        return [edge.id2 if edge.id1 == uniqueid else edge.id1
+                for edge in self.linked_edges(uniqueid, edgetype)]
+
+    def without(self, pairs):
+        ''' returns a new SparseEdges in which the edges between the given pairs of ids are unlinked'''
+        if not len(pairs):
+            return self._from_arrays(self.ids, self.ends.copy(), self.distances.copy())
+        unlinked = set()
+        for id1, id2 in pairs:
+            i1, i2 = self.index[id1], self.index[id2]
+            unlinked.add((min(i1, i2), max(i1, i2)))
+        keep = np.array([(min(i1, i2), max(i1, i2)) not in unlinked for i1, i2 in self.ends],
+                        dtype=bool)
+        return self._from_arrays(self.ids, self.ends[keep], self.distances[keep])
+
+    def split(self, groups):
+        ''' returns a list of SparseEdges, one for each group of ids.
+            The groups must not overlap, the edges between two groups are dropped.
+        '''
+        group = np.full(len(self.ids), -1, dtype=np.int64)
+        local = np.zeros(len(self.ids), dtype=np.int64)
+        for igroup, ids in enumerate(groups):
+            indices = [self.index[uid] for uid in ids]
+            group[indices] = igroup
+            local[indices] = np.arange(len(indices))
+        edgegroup = group[self.ends[:, 0]]
+        inside = (edgegroup >= 0) & (edgegroup == group[self.ends[:, 1]])
+        rows = np.flatnonzero(inside)
+        rows = rows[np.argsort(edgegroup[rows], kind='mergesort')]
+        bounds = np.searchsorted(edgegroup[rows], np.arange(len(groups) + 1))
+        splitted = []
+        for igroup, ids in enumerate(groups):
+            selected = rows[bounds[igroup]:bounds[igroup + 1]]
+            splitted.append(self._from_arrays(ids, local[self.ends[selected]],
+                                              self.distances[selected]))
+        return splitted
+
+    def __str__(self):
+        return '\n'.join(str(self._edge(row)) for row in xrange(len(self)))
+
+    def __repr__(self):
+        return self.__str__()
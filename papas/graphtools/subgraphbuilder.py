@@ -1,4 +1,6 @@
-from DAG import Node, DAGFloodFill
+from DAG import Node
+from heppy.papas.graphtools.sparseedges import SparseEdges
+from heppy.papas.graphtools.unionfind import connected_components
 from heppy.utils.pdebug import pdebugger
 from heppy.papas.data.idcoder import IdCoder
 import collections
@@ -13,9 +15,11 @@ class SubgraphBuilder(object):
         ids   : list of unique identifiers eg of tracks, clusters etc
         edges : dict of edges which contains all edges between the ids (and maybe more)
                 an edge records the distance between two ids
-        nodes : a set of nodes corresponding to the unique ids which is used to construct a graph
-                and thus find distinct blocks
-        subgraphs : a list of subgraphs, each subgraph is a list of connected ids
+                or SparseEdges containing the linked edges between the ids
+        linked_pairs : list of the (id1, id2) pairs of linked ids
+        nodes : a set of nodes corresponding to the unique ids, built on demand
+        subgraphs : a list of subgraphs, each subgraph is a list of connected ids,
+                    found as the connected components of the linked ids, see unionfind
 
         Usage example:
             graph = SubgraphBuilder(ids, edges)
@@ -26,32 +30,40 @@ class SubgraphBuilder(object):
         ids   : list of unique identifiers eg of tracks, clusters etc
         edges : dict of edges which contains all edges between the ids (and maybe more)
                 an edge records the distance/link between two ids
+                or SparseEdges containing the linked edges between the ids
         '''
         self.ids = ids
         self.edges = edges
         
-        # build the block nodes (separate graph which will use distances between items to determine links)
-        self.nodes = dict((idt, Node(idt)) for idt in ids)
-        for edge in edges.itervalues():
-            #add linkage info into the nodes dictionary
-            if  edge.linked: #this is actually an undirected link - OK for undirected searches 
-                self.nodes[edge.id1].add_child(self.nodes[edge.id2])
+        if isinstance(edges, SparseEdges):
+            self.linked_pairs = edges.linked_pairs()
+        else:
+            self.linked_pairs = [(edge.id1, edge.id2) for edge in edges.itervalues() if edge.linked]
+        self._nodes = None
 
-        # build the subgraphs of connected nodes
-        self.subgraphs = []
-        
-        #sort option  below is needed for consistent orderings and is required for a match with papascpp
-        for subgraph in DAGFloodFill(self.nodes, dosorting=True).subgraphs:
-            # each of the subgraphs returned by floodfill is a list of nodes that are connected
-            # we want the ids of these nodes
-            self.subgraphs.append( sorted((node.get_value() for node in subgraph), reverse=True) )  
+        # build the subgraphs of connected ids with a union-find
+        # the subgraphs are sorted as with DAGFloodFill(dosorting=True),
+        # which is needed for consistent orderings and is required for a match with papascpp
+        self.subgraphs = connected_components(ids, self.linked_pairs)
+
+    @property
+    def nodes(self):
+        ''' dict of nodes corresponding to the unique ids, linked as the ids.
+            Only built when needed, eg to traverse the graph, the subgraphs do not use them.
+        '''
+        if self._nodes is None:
+            self._nodes = dict((idt, Node(idt)) for idt in self.ids)
+            for id1, id2 in self.linked_pairs:
+                #this is actually an undirected link - OK for undirected searches 
+                self._nodes[id1].add_child(self._nodes[id2])
+        return self._nodes
 
     def __str__(self):
         descrip = "{ "
         for subgraph in  self.subgraphs:
             descrip =  descrip +  " ("
             for elemid in  subgraph:
-                descrip = descrip + str(elem) +  " "
+                descrip = descrip + str(elemid) +  " "
             descrip =  descrip +  " )"    
         descrip = descrip + "}\n"
         return descrip  
@@ -0,0 +1,67 @@
+import unittest
+from heppy.papas.data.idcoder import IdCoder
+from edge import Edge
+from sparseedges import SparseEdges
+
+class TestSparseEdges(unittest.TestCase):
+
+    def setUp(self):
+        '''
+        called before every test. Makes this structure:
+
+           t0--h0--t1
+                |
+               h1     e0--t2    e1
+        '''
+        self.t0, self.t1, self.t2 = [IdCoder.make_id(IdCoder.PFOBJECTTYPE.TRACK, i, 's', 10 - i)
+                                     for i in range(3)]
+        self.h0, self.h1 = [IdCoder.make_id(IdCoder.PFOBJECTTYPE.HCALCLUSTER, i, 's', 10 - i)
+                            for i in range(2)]
+        self.e0, self.e1 = [IdCoder.make_id(IdCoder.PFOBJECTTYPE.ECALCLUSTER, i, 's', 10 - i)
+                            for i in range(2)]
+        self.ids = sorted([self.t0, self.t1, self.t2, self.h0, self.h1, self.e0, self.e1],
+                          reverse=True)
+        self.edges = SparseEdges(self.ids,
+                                 [(self.t0, self.h0), (self.h0, self.t1),
+                                  (self.h1, self.h0), (self.e0, self.t2)],
+                                 [0.2, 0.1, None, 0.1])
+
+    def test_linked(self):
+        self.assertEqual(len(self.edges), 4)
+        self.assertEqual(self.edges.linked_ids(self.h0), [self.t1, self.t0, self.h1])
+        self.assertEqual(self.edges.linked_ids(self.h0, 'hcal_track'), [self.t1, self.t0])
+        self.assertEqual(self.edges.linked_ids(self.e1), [])
+        edge = self.edges.get_edge(self.h0, self.t0)
+        self.assertTrue(edge.linked)
+        self.assertEqual(edge.distance, 0.2)
+        self.assertEqual(edge.edge_type, 'hcal_track')
+        self.assertFalse(self.edges.get_edge(self.t0, self.t1).linked)
+        self.assertEqual(self.edges.get_edge(self.h0, self.h1).distance, None)
+        self.assertEqual(sorted(self.edges.edges().keys()),
+                         sorted([Edge.make_key(id1, id2) for id1, id2 in self.edges.linked_pairs()]))
+
+    def test_without(self):
+        edges = self.edges.without([(self.t0, self.h0)])
+        self.assertEqual(len(edges), 3)
+        self.assertEqual(edges.linked_ids(self.h0), [self.t1, self.h1])
+        self.assertEqual(len(self.edges), 4)
+
+    def test_split(self):
+        groups = [[self.t0, self.t1, self.h0, self.h1], [self.t2, self.e0], [self.e1]]
+        splitted = self.edges.split(groups)
+        self.assertEqual([len(edges) for edges in splitted], [3, 1, 0])
+        self.assertEqual(splitted[0].ids, groups[0])
+        self.assertEqual(splitted[0].linked_ids(self.h0), [self.t1, self.t0, self.h1])
+        self.assertEqual(splitted[1].get_edge(self.t2, self.e0).distance, 0.1)
+
+    def test_from_edges(self):
+        edge1 = Edge(self.t0, self.h0, True, 0.3)
+        edge2 = Edge(self.t1, self.h0, False, 0.5)
+        edge3 = Edge(self.t2, self.e0, True, 0.1)
+        edges = SparseEdges.from_edges([self.t0, self.t1, self.h0],
+                                       dict((edge.key, edge) for edge in [edge1, edge2, edge3]))
+        self.assertEqual(edges.linked_pairs(), [(self.t0, self.h0)])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,33 @@
+import unittest
+import random
+from DAG import Node, DAGFloodFill
+from unionfind import UnionFind, connected_components
+
+class TestUnionFind(unittest.TestCase):
+
+    def test_union(self):
+        sets = UnionFind(5)
+        sets.union(0, 2)
+        sets.union(3, 2)
+        self.assertEqual(sets.find(0), sets.find(3))
+        self.assertNotEqual(sets.find(0), sets.find(1))
+        self.assertEqual(sets.size[sets.find(2)], 3)
+
+    def test_components(self):
+        components = connected_components([12, 3, 7, 5, 9], [(12, 5), (7, 3)])
+        self.assertEqual(components, [[7, 3], [12, 5], [9]])
+
+    def test_same_as_floodfill(self):
+        rnd = random.Random(0xdeadbeef)
+        ids = rnd.sample(xrange(1000), 200)
+        pairs = [tuple(rnd.sample(ids, 2)) for i in range(150)]
+        nodes = dict((uid, Node(uid)) for uid in ids)
+        for id1, id2 in pairs:
+            nodes[id1].add_child(nodes[id2])
+        subgraphs = [sorted((node.get_value() for node in subgraph), reverse=True)
+                     for subgraph in DAGFloodFill(nodes, dosorting=True).subgraphs]
+        self.assertEqual(connected_components(ids, pairs), subgraphs)
+
+
+if __name__ == '__main__':
+    unittest.main()
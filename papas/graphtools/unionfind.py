@@ -0,0 +1,63 @@
+class UnionFind(object):
+    ''' UnionFind keeps track of the disjoint sets of the integers 0 to n-1
+        as they are merged, eg to find the connected components of a graph.
+
+        attributes:
+
+        parent : list giving the parent of each integer, the root of a set being its own parent
+
+        Usage example:
+            sets = UnionFind(4)
+            sets.union(0, 2)
+            assert sets.find(2) == sets.find(0)
+    '''
+    def __init__(self, n):
+        self.parent = range(n)
+        self.size = [1] * n
+
+    def find(self, i):
+        ''' returns the root of the set containing i'''
+        parent = self.parent
+        while parent[i] != i:
+            # path halving
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    def union(self, i, j):
+        ''' merges the sets containing i and j'''
+        ri, rj = self.find(i), self.find(j)
+        if ri == rj:
+            return
+        if self.size[ri] < self.size[rj]:
+            ri, rj = rj, ri
+        self.parent[rj] = ri
+        self.size[ri] += self.size[rj]
+
+
+def connected_components(ids, pairs):
+    ''' returns the connected components of the graph of ids linked by pairs.
+
+        @param ids: list of unique identifiers
+        @param pairs: iterable of (id1, id2) linked pairs
+        Each component is a list of ids sorted in decreasing order,
+        and the components are ordered by increasing smallest id.
+        This is the ordering of DAGFloodFill with dosorting=True,
+        which is needed to match papascpp.
+    '''
+    ids = sorted(ids)
+    index = dict((uid, i) for i, uid in enumerate(ids))
+    sets = UnionFind(len(ids))
+    for id1, id2 in pairs:
+        sets.union(index[id1], index[id2])
+    components = []
+    component_of_root = dict()
+    for i, uid in enumerate(ids):
+        root = sets.find(i)
+        if root not in component_of_root:
+            component_of_root[root] = len(components)
+            components.append([])
+        components[component_of_root[root]].append(uid)
+    for component in components:
+        component.reverse()
+    return components
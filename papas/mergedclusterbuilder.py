@@ -1,16 +1,18 @@
-from heppy.papas.graphtools.subgraphbuilder import SubgraphBuilder
-from heppy.papas.graphtools.edge import Edge
+from heppy.papas.graphtools.unionfind import connected_components
 from heppy.papas.graphtools.DAG import Node
 from heppy.papas.pfobjects import MergedCluster
 from heppy.utils.pdebug import pdebugger
 
-class MergedClusterBuilder(SubgraphBuilder):
+class MergedClusterBuilder(object):
     ''' MergedClusterBuilder takes particle flow elements of one cluster type eg ecal_in
         and uses the distances between elements to construct a set of blocks ( of connected clusters).
         The blocks will contain overlapping clusters and then be used to merge the clusters.
+        The blocks are the connected components of the graph of linked clusters,
+        found with a union-find, see heppy.papas.graphtools.unionfind.
         
         attributes:
-             merged - the dictionary of merged clusters.
+             merged_clusters - the dictionary of merged clusters.
+             subgraphs - list of the lists of ids of the clusters to be merged, ordered as by the SubgraphBuilder
         
         Usage example:
              This will return the merged clusters to the event.
@@ -27,6 +29,8 @@ class MergedClusterBuilder(SubgraphBuilder):
                 link_type = 'ecal_ecal'
                 is_link = true/false
                 distance = float
+            If the ruler has a cluster_links method, see Distance.cluster_links,
+            it is used to find all linked pairs of clusters at once.
         @param history_nodes: a dictionary of Nodes : { id:Node1, id: Node2 etc}.
             It could for example contain the simulation history nodes.
             A Node contains the id of a cluster.
@@ -42,18 +46,20 @@ class MergedClusterBuilder(SubgraphBuilder):
         # collate ids of clusters
         uniqueids = list(clusters.keys())
              
-        #make the edges match cpp by using the same approach as cpp
-        edges = dict()
-        for obj1 in  clusters.values():
-            for obj2 in  clusters.values():
-                if obj1.uniqueid < obj2.uniqueid:
-                    link_type, is_linked, distance = ruler(obj1, obj2)
-                    edge = Edge(obj1.uniqueid, obj2.uniqueid, is_linked, distance)
-                    #the edge object is added into the edges dictionary
-                    edges[edge.key] = edge
+        #find the linked pairs of clusters
+        if hasattr(ruler, 'cluster_links'):
+            linked_pairs = ruler.cluster_links(clusters.values())
+        else:
+            linked_pairs = []
+            for obj1 in  clusters.values():
+                for obj2 in  clusters.values():
+                    if obj1.uniqueid < obj2.uniqueid:
+                        link_type, is_linked, distance = ruler(obj1, obj2)
+                        if is_linked:
+                            linked_pairs.append((obj1.uniqueid, obj2.uniqueid))
 
-        #make the subgraphs of clusters
-        super(MergedClusterBuilder, self).__init__(uniqueids, edges)
+        #make the subgraphs of clusters, with the same ordering as cpp
+        self.subgraphs = connected_components(uniqueids, linked_pairs)
         
         #make sure we use the original history and update it as needed
         self.history_nodes = history_nodes
@@ -75,4 +81,4 @@ class MergedClusterBuilder(SubgraphBuilder):
                 self.history_nodes[supercluster.uniqueid] = snode
                 for node_id in subgraph:
                     self.history_nodes[node_id].add_child(snode)
-            pdebugger.info(str('Made {}'.format(supercluster)))
+            pdebugger.info('Made %s', supercluster)
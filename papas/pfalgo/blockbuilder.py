@@ -1,6 +1,7 @@
 from heppy.papas.graphtools.DAG import Node, DAGFloodFill
 from heppy.papas.pfalgo.pfblock import PFBlock
 from heppy.papas.graphtools.subgraphbuilder import SubgraphBuilder
+from heppy.papas.graphtools.sparseedges import SparseEdges
 from heppy.utils.pdebug import pdebugger
 
         
@@ -15,7 +16,7 @@ class BlockBuilder(SubgraphBuilder):
         attributes:
         
         ids   : list of unique identifiers eg of tracks, clusters etc
-        edges : dict of edges which contains all edges between the ids (and maybe more)
+        edges : SparseEdges containing the linked edges between the ids
                 an edge records the distance between two ids
         startindex : the index of the blocks collection into which the new blocks are to be added 
                 (used to create Identifiers for new blocks)
@@ -34,7 +35,8 @@ class BlockBuilder(SubgraphBuilder):
     def __init__(self, ids, edges, startindex, subtype, history = None,):
         '''
         ids   : list of unique identifiers eg of tracks, clusters etc
-        edges : dict of edges which contains all edges between the ids (and maybe more)
+        edges : SparseEdges containing the linked edges between the ids,
+                or dict of edges which contains all edges between the ids (and maybe more)
                 an edge records the distance/link between two ids
         startindex : the index of the blocks collection into which the new blocks are to be added (used to create Identifier)
         subtype :used when creating unique identifiers, normally 'r' reconstructed or 's' split
@@ -43,6 +45,8 @@ class BlockBuilder(SubgraphBuilder):
         self.history = history
         self.subtype = subtype
         self.startindex = startindex
+        if not isinstance(edges, SparseEdges):
+            edges = SparseEdges.from_edges(ids, edges)
         super(BlockBuilder, self).__init__(ids, edges)       
 
         # build the blocks of connected nodes
@@ -54,10 +58,12 @@ class BlockBuilder(SubgraphBuilder):
             to work out which elements are connected
             Each set of connected elements will be used to make a new PFBlock
         ''' 
-        for subgraph in self.subgraphs:
+        #the edges of each subgraph, in one go
+        subgraph_edges = self.edges.split(self.subgraphs)
+        for subgraph, edges in zip(self.subgraphs, subgraph_edges):
             #make the block
-            block = PFBlock(subgraph, self.edges, self.startindex + len(self.blocks), subtype=self.subtype)        
-            pdebugger.info("Made {}".format(block))
+            block = PFBlock(subgraph, edges, self.startindex + len(self.blocks), subtype=self.subtype)        
+            pdebugger.info("Made %s", block)
             #put the block in the dict of blocks            
             self.blocks[block.uniqueid] = block
             
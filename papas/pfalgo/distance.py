@@ -1,3 +1,9 @@
+import math
+import collections
+import numpy as np
+
+from grid import Grid
+
 
 class Distance(object):
     '''Concrete distance calculator.
@@ -29,6 +35,85 @@ class Distance(object):
             raise ValueError('no such link layer:', layers)
         return func(ele1, ele2)        
 
+    def candidates(self, elements):
+        '''returns the set of (uniqueid1, uniqueid2) pairs, with uniqueid1 < uniqueid2,
+        of the elements that may be linked.
+
+        The linked pairs of clusters are given by L{cluster_links}.
+        A cluster and a track can only be linked if the track point lies within the size
+        of a subcluster. These pairs are found with a L{Grid} of the subclusters of each layer,
+        instead of computing the distance between all pairs of elements.
+        The ruler still has to be called on each pair to know if it is linked.
+        '''
+        layers = collections.defaultdict(list)
+        tracks = []
+        for ele in elements:
+            if ele.layer == 'tracker':
+                tracks.append(ele)
+            else:
+                layers[ele.layer].append(ele)
+        pairs = set()
+        for layer, clusters in layers.iteritems():
+            # clusters overlapping in (theta, phi)
+            pairs.update(self.cluster_links(clusters))
+            # tracks going through the clusters
+            subclusters = [(ele, sub) for ele in clusters for sub in ele.subclusters]
+            cellsize = max(sub.size() for ele, sub in subclusters)
+            if cellsize > 0 and tracks:
+                grid = Grid((cellsize, cellsize, cellsize))
+                for ele, sub in subclusters:
+                    grid.add(ele, (sub.position.X(), sub.position.Y(), sub.position.Z()))
+                for track in tracks:
+                    point = track.path.points.get(layer, None)
+                    if point is None:
+                        continue
+                    for ele in grid.neighbours((point.X(), point.Y(), point.Z())):
+                        pairs.add(_pair(ele, track))
+        return pairs
+
+    def cluster_links(self, clusters):
+        '''returns the list of (uniqueid1, uniqueid2) pairs, with uniqueid1 < uniqueid2,
+        of the clusters that are linked, as given by ecal_ecal and hcal_hcal.
+
+        Two clusters of the same layer are linked if two of their subclusters overlap,
+        ie if the deltaR between the subclusters is smaller than the sum of their angular sizes.
+        The theta, phi and angular size of the subclusters are stored in numpy arrays
+        sorted by theta, and only the pairs of subclusters closer in theta than twice
+        the largest angular size are compared, all at once.
+        '''
+        links = set()
+        layers = collections.defaultdict(list)
+        for cluster in clusters:
+            layers[cluster.layer].append(cluster)
+        for layer, layerclusters in layers.iteritems():
+            subclusters = [sub for cluster in layerclusters for sub in cluster.subclusters]
+            if len(subclusters) < 2:
+                continue
+            owner = np.array([i for i, cluster in enumerate(layerclusters)
+                              for sub in cluster.subclusters], dtype=np.int64)
+            theta = np.array([sub.position.Theta() for sub in subclusters], dtype=np.float64)
+            phi = np.array([sub.position.Phi() for sub in subclusters], dtype=np.float64)
+            size = np.array([sub.angular_size() for sub in subclusters], dtype=np.float64)
+            order = np.argsort(theta, kind='mergesort')
+            owner, theta, phi, size = owner[order], theta[order], phi[order], size[order]
+            # each subcluster is compared to the next ones in theta, up to the end of its window
+            end = np.searchsorted(theta, theta + size + size.max(), side='right')
+            first = np.arange(len(theta)) + 1
+            counts = np.maximum(end - first, 0)
+            ind1 = np.repeat(np.arange(len(theta)), counts)
+            starts = np.cumsum(counts) - counts
+            ind2 = np.repeat(first, counts) + np.arange(counts.sum()) - np.repeat(starts, counts)
+            # same computation as deltaR
+            dtheta = theta[ind1] - theta[ind2]
+            dphi = phi[ind1] - phi[ind2]
+            dphi = np.where(dphi > math.pi, dphi - 2 * math.pi, dphi)
+            dphi = np.where(dphi < -math.pi, dphi + 2 * math.pi, dphi)
+            dR = np.sqrt(dtheta * dtheta + dphi * dphi)
+            linked = (dR < size[ind1] + size[ind2]) & (owner[ind1] != owner[ind2])
+            for i1, i2 in zip(owner[ind1[linked]].tolist(), owner[ind2[linked]].tolist()):
+                links.add(_pair(layerclusters[i1], layerclusters[i2]))
+        return sorted(links)
+
     def no_link(self, ele1, ele2):
         return None, False, None
     
@@ -63,4 +148,7 @@ class Distance(object):
 ##        link_ok, dist = ele1.is_inside_clusters(ele2)    
 ##        return ('ecal_in', 'hcal_in'), link_ok, dist 
 
+def _pair(ele1, ele2):
+    return tuple(sorted((ele1.uniqueid, ele2.uniqueid)))
+
 distance = Distance()
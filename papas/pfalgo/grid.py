@@ -0,0 +1,74 @@
+import math
+import itertools
+import collections
+
+class Grid(object):
+    ''' A Grid is a uniform grid of cells, in a space of any dimension,
+        used to find the elements that are close to a given point
+        without computing the distance to all elements.
+
+        Two points that are closer than the cell size along each axis
+        are in the same cell or in adjacent cells.
+        Axes can be periodic, eg phi.
+
+        attributes:
+
+        axes : list of (cell size, number of cells) for each axis,
+               the number of cells being None for non-periodic axes
+        cells : dict of the items in each cell, indexed by the tuple of cell indices
+
+        Usage example:
+            grid = Grid((0.1, 0.1), periods=(None, 2*math.pi))
+            grid.add(cluster, (theta, phi))
+            for item in grid.neighbours((theta2, phi2)):
+                print item
+    '''
+    def __init__(self, cellsizes, periods=None):
+        '''
+        cellsizes : minimum size of the cells along each axis
+        periods : period of each axis, or None for a non-periodic axis.
+                  For periodic axes, the cell size is increased so that
+                  the period is an integer number of cells.
+        '''
+        if periods is None:
+            periods = (None,) * len(cellsizes)
+        self.axes = []
+        for size, period in zip(cellsizes, periods):
+            ncells = None
+            if period is not None:
+                ncells = max(1, int(period / size))
+                size = float(period) / ncells
+            self.axes.append((float(size), ncells))
+        self.cells = collections.defaultdict(list)
+
+    def cell(self, coords):
+        ''' returns the tuple of indices of the cell containing the point coords'''
+        indices = []
+        for x, (size, ncells) in zip(coords, self.axes):
+            index = int(math.floor(x / size))
+            if ncells is not None:
+                index %= ncells
+            indices.append(index)
+        return tuple(indices)
+
+    def add(self, item, coords):
+        ''' adds item at the point coords'''
+        self.cells[self.cell(coords)].append(item)
+
+    def neighbours(self, coords):
+        ''' returns the list of items in the cell containing the point coords
+            and in the adjacent cells.
+        '''
+        ranges = []
+        for index, (size, ncells) in zip(self.cell(coords), self.axes):
+            indices = [index - 1, index, index + 1]
+            if ncells is not None:
+                indices = set(i % ncells for i in indices)
+            ranges.append(indices)
+        items = []
+        for cell in itertools.product(*ranges):
+            items.extend(self.cells.get(cell, []))
+        return items
+
+    def __len__(self):
+        return sum(len(items) for items in self.cells.itervalues())
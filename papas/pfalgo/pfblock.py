@@ -1,5 +1,4 @@
-import itertools
-from heppy.papas.graphtools.edge import Edge
+from heppy.papas.graphtools.sparseedges import SparseEdges
 from heppy.papas.data.idcoder import IdCoder
 
 class PFBlock(object):
@@ -13,8 +12,9 @@ class PFBlock(object):
      element_uniqueids : list of uniqueids of its elements
      papasevent : contains the tracks and clusters and a get_object method to allow access to the
                underlying objects given their uniqueid
-     edges : Dictionary of all the edge cominations in the block dict{edgekey : Edge}
+     sparse_edges : SparseEdges containing the linked edges between the elements
              use  get_edge(id1,id2) to find an edge
+     edges : Dictionary of the linked edges in the block dict{edgekey : Edge}
      
      Usage:
             block = PFBlock(element_ids,  edges, index, 'r') 
@@ -29,8 +29,8 @@ class PFBlock(object):
     def __init__(self, element_ids, edges, index, subtype): 
         ''' 
             @param element_ids:  list of the uniqueids of the elements to go in this block [id1,id2,...]
-            @param edges: is a dictionary of edges, it must contain at least all needed edges.
-                   It is not a problem if it contains
+            @param edges: SparseEdges, or a dictionary of edges, containing at least the linked
+                   edges between the elements. It is not a problem if it contains
                    additional edges as only the ones needed will be extracted
             @param index: index into the collection of blocks into which new block will be added
             @param subtype: used when making unique identifier, will normally be 'r' for reconstructed blocks and 's' for split blocks
@@ -44,11 +44,17 @@ class PFBlock(object):
         self.block_count = PFBlock.temp_block_count
         PFBlock.temp_block_count += 1
 
-        #extract the relevant parts of the complete set of edges and store this within the block
-        self.edges = dict()
-        for id1, id2 in itertools.combinations(self.element_uniqueids, 2):
-            key = Edge.make_key(id1, id2)
-            self.edges[key] = edges[key]
+        #extract the linked edges between the elements and store them within the block
+        if not isinstance(edges, SparseEdges):
+            edges = SparseEdges.from_edges(self.element_uniqueids, edges)
+        if edges.ids != self.element_uniqueids:
+            edges = edges.split([self.element_uniqueids])[0]
+        self.sparse_edges = edges
+
+    @property
+    def edges(self):
+        ''' dict of the linked edges {edgekey : Edge}, created on demand'''
+        return self.sparse_edges.edges()
 
     def count_ecal(self):
         ''' Counts how many ecal cluster ids are in the block '''
@@ -80,32 +86,13 @@ class PFBlock(object):
         @param uniqueid: is the id of item of interest
         @param edgetype: is an optional type of edge. If specified only links of the given edgetype will be returned
         '''
-        linked_edges = []
-        for edge in self.edges.itervalues():
-            if edge.linked and (edge.id1 == uniqueid or edge.id2 == uniqueid):
-                if edgetype is None or ((edgetype != None) and (edge.edge_type == edgetype)):
-                    linked_edges.append(edge)
-
-
-        #this is a bit yucky and temporary solution as need to make sure the order returned is consistent
-        # maybe should live outside of this class
-        linked_edges.sort(key=lambda x: (x.distance is None, x.distance))
-        return linked_edges
+        return self.sparse_edges.linked_edges(uniqueid, edgetype)
 
     def linked_ids(self, uniqueid, edgetype=None) :
         '''Returns the list of ids linked to uniqueid, sorted by increasing distance. the type of link can be specified through the parameter edgetype.
             eg block.linked_ids(trackid, "ecal_track") returns all the ids that are linked and of type "ecal_track"
             '''
-        linked_ids = []
-        linked_edges = []
-        linked_edges = self.linked_edges(uniqueid, edgetype)
-        if len(linked_edges):
-            for edge in linked_edges:
-                if edge.id1 == uniqueid:
-                    linked_ids.append(edge.id2)
-                else:
-                    linked_ids.append(edge.id1)
-        return linked_ids
+        return self.sparse_edges.linked_ids(uniqueid, edgetype)
     
     def short_elements_string(self):
         ''' Construct a string description of each of the elements in a block.
@@ -197,10 +184,10 @@ class PFBlock(object):
 
     def get_edge(self, id1, id2):
         ''' Find the edge corresponding to e1 e2
-            Note that make_key deals with whether it is get_edge(e1, e2) or
-                                                        get_edge(e2, e1) (either order gives same result)
+            Either order gives same result, get_edge(e1, e2) or get_edge(e2, e1)
+            If e1 and e2 are not linked, the edge is not linked and has no distance
             '''
-        return self.edges[Edge.make_key(id1, id2)]
+        return self.sparse_edges.get_edge(id1, id2)
 
     def __str__(self):
         ''' Block description which includes list of elements and a matrix of distances
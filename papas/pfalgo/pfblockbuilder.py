@@ -1,5 +1,5 @@
 from blockbuilder import BlockBuilder
-from heppy.papas.graphtools.edge import Edge
+from heppy.papas.graphtools.sparseedges import SparseEdges
 from heppy.papas.graphtools.DAG import Node
 
 class PFBlockBuilder(BlockBuilder):
@@ -10,6 +10,9 @@ class PFBlockBuilder(BlockBuilder):
         Blocks retain information of the elements and the distances between elements
         The blocks can then be used for future particle reconstruction
         The ids must be unique and are expected to come from the Identifier class
+        If the ruler has a candidates method, see Distance.candidates, only the
+        pairs of elements that may be linked are measured.
+        Only the linked edges are stored, see SparseEdges.
         
         attributes:
         
@@ -34,6 +37,7 @@ class PFBlockBuilder(BlockBuilder):
                     link_type = 'ecal_ecal', 'ecal_track' etc
                     is_link = true/false
                     distance = float
+                it may also have a candidates method returning the pairs of ids that may be linked
             startindex is the index number for this block within the collection of blocks being created
             subtype says which identifier subtype to use when creating new blocks eg 'r' reconstructed, 's' split
         '''
@@ -41,20 +45,26 @@ class PFBlockBuilder(BlockBuilder):
         if self.papasevent.history is None:
             self.papasevent.history = dict((idt, Node(idt)) for idt in uniqueids)
         
-        # compute edges between each pair of nodes
-        edges = dict()
-
-        for id1 in uniqueids:
-            for  id2 in uniqueids:
-                if id1 < id2 :
-                    edge = self._make_edge(id1, id2, ruler)
-                    #the edge object is added into the edges dictionary
-                    edges[edge.key] = edge
+        # measure the pairs of nodes that may be linked
+        # if the ruler does not provide the candidate pairs, all pairs are used
+        if hasattr(ruler, 'candidates'):
+            pairs = ruler.candidates([self.papasevent.get_object(uid) for uid in uniqueids])
+        else:
+            pairs = ((id1, id2) for id1 in uniqueids for id2 in uniqueids if id1 < id2)
+        # only the linked edges are stored
+        linked_pairs = []
+        distances = []
+        for id1, id2 in pairs:
+            is_linked, distance = self._measure(id1, id2, ruler)
+            if is_linked:
+                linked_pairs.append((id1, id2))
+                distances.append(distance)
+        edges = SparseEdges(uniqueids, linked_pairs, distances)
 
         #use the underlying BlockBuilder to construct the blocks        
         super(PFBlockBuilder, self).__init__(uniqueids, edges, startindex, subtype, self.papasevent.history)
 
-    def _make_edge(self, id1, id2, ruler):
+    def _measure(self, id1, id2, ruler):
         ''' id1, id2 are the unique ids of the two items
             ruler is something that measures distance between two objects eg track and hcal
             (see Distance class for example)
@@ -63,8 +73,7 @@ class PFBlockBuilder(BlockBuilder):
                 link_type = 'ecal_ecal', 'ecal_track' etc
                 is_link = true/false
                 distance = float
-            an edge object is returned which contains the link_type:
-                is_link (bool) and distance between the objects. 
+            returns is_link (bool) and the distance between the objects. 
         '''
         #find the original items and pass to the ruler to get the distance info
         obj1 = self.papasevent.get_object(id1)
@@ -75,6 +84,4 @@ class PFBlockBuilder(BlockBuilder):
         #for the event we do not want ehal_hcal links
         if link_type == "ecal_hcal":
             is_linked = False
-            
-        #make the edge 
-        return Edge(id1, id2, is_linked, distance) 
+        return is_linked, distance
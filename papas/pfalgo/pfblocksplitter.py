@@ -6,14 +6,15 @@ class BlockSplitter(BlockBuilder):
         using the underlying BlockBuilder class
         
         Usage example:
-            splitter = BlockSplitter(block, unlink_edges)
+            splitter = BlockSplitter(block.uniqueid, block.element_uniqueids,
+                                     block.sparse_edges.without(unlink_pairs), 0, 's')
             for b in splitter.blocks.itervalues():
                 print b
     '''
     def __init__(self, blockid,  blockids, edges, startindex, subtype, history = None):
         '''arguments:
         blockids  : list of ids in blck
-        edges : list of edges 
+        edges : SparseEdges of the block, without the edges to be unlinked, see SparseEdges.without
         subtype says which identifier subtype to use when creating new blocks eg 'r' reconstructed, 's' split
         history : an optional dictionary of history nodes which describes the parent child links between elements
         '''
@@ -1,8 +1,10 @@
 import unittest
 import itertools
+import math
+import random
 from distance import Distance
 from links import Element
-from heppy.papas.pfobjects import Cluster, Track
+from heppy.papas.pfobjects import Cluster, MergedCluster, Track
 from heppy.papas.path import StraightLine
 
 from ROOT import TVector3, TLorentzVector
@@ -51,9 +53,54 @@ class TestDistance(unittest.TestCase):
         link_type, link_ok, distance = ruler(c2, c3)
         self.assertEqual(distance, 0.059)
         
-        
-        
-        
+
+    def test_candidates(self):
+        '''all linked pairs are among the candidates'''
+        rnd = random.Random(0xdeadbeef)
+        elems = []
+        for i in range(60):
+            layer, radius = rnd.choice([('ecal_in', 130.), ('hcal_in', 190.)])
+            pos = TVector3()
+            pos.SetMagThetaPhi(radius, rnd.uniform(0.5, 2.6), rnd.uniform(-math.pi, math.pi))
+            elems.append(Cluster(rnd.uniform(1, 10), pos, rnd.uniform(5, 20), layer, index=i))
+        for i in range(20):
+            p3 = elems[i].position.Unit() * 10.
+            p4 = TLorentzVector()
+            p4.SetVectM(p3, 1.)
+            tr = Track(p3, 1, StraightLine(p4, TVector3(0, 0, 0)), index=i)
+            tr.path.points['ecal_in'] = elems[i].position.Unit() * 130. + TVector3(rnd.uniform(-10, 10), 0, 0)
+            tr.path.points['hcal_in'] = elems[i].position.Unit() * 190.
+            elems.append(tr)
+        candidates = ruler.candidates(elems)
+        nlinks = 0
+        for ele1, ele2 in itertools.combinations(elems, 2):
+            link_type, link_ok, distance = ruler(ele1, ele2)
+            if link_ok:
+                nlinks += 1
+                pair = tuple(sorted([ele1.uniqueid, ele2.uniqueid]))
+                self.assertTrue(pair in candidates)
+        self.assertTrue(nlinks > 0)
+        self.assertTrue(len(candidates) < len(elems) * (len(elems) - 1) / 2)
+
+    def test_cluster_links(self):
+        '''same links as the ruler, also for merged clusters'''
+        rnd = random.Random(0xdeadbeef)
+        clusters = []
+        for i in range(80):
+            pos = TVector3()
+            pos.SetMagThetaPhi(130., rnd.uniform(0.5, 2.6), rnd.uniform(-math.pi, math.pi))
+            clusters.append(Cluster(rnd.uniform(1, 10), pos, rnd.uniform(2, 15), 'ecal_in', index=i))
+        merged = MergedCluster(clusters[:3], index=0)
+        clusters = [merged] + clusters[3:]
+        links = ruler.cluster_links(clusters)
+        expected = []
+        for ele1, ele2 in itertools.combinations(clusters, 2):
+            if ruler(ele1, ele2)[1]:
+                expected.append(tuple(sorted([ele1.uniqueid, ele2.uniqueid])))
+        self.assertTrue(len(expected) > 0)
+        self.assertEqual(links, sorted(expected))
+
+
 if __name__ == '__main__':
     unittest.main()
 
@@ -0,0 +1,44 @@
+import unittest
+import math
+import random
+import itertools
+from grid import Grid
+
+class TestGrid(unittest.TestCase):
+
+    def test_neighbours(self):
+        grid = Grid((1., 1.))
+        grid.add('a', (0.5, 0.5))
+        grid.add('b', (1.9, 0.2))
+        grid.add('c', (2.5, 0.5))
+        self.assertEqual(sorted(grid.neighbours((0.1, 0.9))), ['a', 'b'])
+        self.assertEqual(sorted(grid.neighbours((3.9, 0.))), ['c'])
+        self.assertEqual(len(grid), 3)
+
+    def test_periodic(self):
+        grid = Grid((0.5, 0.5), (None, 2 * math.pi))
+        grid.add('a', (0., math.pi - 0.1))
+        self.assertEqual(grid.neighbours((0., -math.pi + 0.1)), ['a'])
+        # fewer than 3 cells, items are found only once
+        grid = Grid((4.,), (2 * math.pi,))
+        grid.add('a', (1.,))
+        self.assertEqual(grid.neighbours((-1.,)), ['a'])
+
+    def test_close_pairs(self):
+        '''all pairs of points closer than the cell size are found'''
+        rnd = random.Random(0xdeadbeef)
+        points = [(rnd.uniform(-5, 5), rnd.uniform(-5, 5)) for i in range(200)]
+        size = 0.7
+        grid = Grid((size, size))
+        found = set()
+        for i, point in enumerate(points):
+            found.update((j, i) for j in grid.neighbours(point))
+            grid.add(i, point)
+        for i, j in itertools.combinations(range(len(points)), 2):
+            if math.hypot(points[i][0] - points[j][0], points[i][1] - points[j][1]) < size:
+                self.assertTrue((i, j) in found)
+        self.assertTrue(len(found) < len(points) * (len(points) - 1) / 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,13 +1,13 @@
 from heppy.particles.jet import Jet as BaseJet
 from heppy.particles.jet import JetConstituents
 from heppy.particles.cms.particle import Particle
-from ROOT import TLorentzVector 
+from heppy.framework.lazyroot import ROOT
 
 class Jet(BaseJet):
     def __init__(self, candidate):
         super(Jet, self).__init__()
         self.candidate = candidate
-        self._tlv = TLorentzVector()
+        self._tlv = ROOT.TLorentzVector()
         p4 = candidate.p4()
         self._tlv.SetPtEtaPhiM(p4.pt(), p4.eta(), p4.phi(), p4.mass())
         self.convert_constituents()
@@ -1,5 +1,5 @@
 from heppy.particles.particle import Particle as BaseParticle
-from ROOT import TLorentzVector
+from heppy.framework.lazyroot import ROOT
 
 class Particle(BaseParticle):
     def __init__(self, candidate):
@@ -7,7 +7,7 @@ class Particle(BaseParticle):
         self._charge = candidate.charge()
         self._pid = candidate.pdgId()
         self._status = candidate.status()
-        self._tlv = TLorentzVector()
+        self._tlv = ROOT.TLorentzVector()
         p4 = candidate.p4()
         self._tlv.SetPtEtaPhiM(p4.pt(), p4.eta(), p4.phi(), p4.mass())
         
@@ -1,11 +1,11 @@
 from heppy.particles.met import MET as BaseMET
-from ROOT import TLorentzVector
+from heppy.framework.lazyroot import ROOT
 
 class Met(BaseMET):
     
     def __init__(self, fccmet):
         self.fccmet = fccmet
         self._sum_et = fccmet.scalarSum()
-        self._tlv = TLorentzVector()
+        self._tlv = ROOT.TLorentzVector()
         self._tlv.SetPtEtaPhiM(fccmet.magnitude(), 0.,fccmet.phi(),0. )
         self._charge = 0. 
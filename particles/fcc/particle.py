@@ -1,7 +1,7 @@
 from heppy.particles.particle import Particle as BaseParticle
 from vertex import Vertex
 from pod import POD
-from ROOT import TLorentzVector
+from heppy.framework.lazyroot import ROOT
 from heppy.utils.pdebug import pdebugger
 from heppy.papas.data.idcoder import IdCoder
 
@@ -21,7 +21,7 @@ class Particle(BaseParticle, POD):
             end = fccobj.endVertex()
             self._end_vertex = Vertex(end) if end.isAvailable() \
                                else None 
-        self._tlv = TLorentzVector()
+        self._tlv = ROOT.TLorentzVector()
         p4 = fccobj.core().p4
         self._tlv.SetXYZM(p4.px, p4.py, p4.pz, p4.mass)
     
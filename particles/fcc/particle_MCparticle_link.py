@@ -2,8 +2,6 @@ from heppy.particles.object_link import ObjectLink as BaseLink
 from pod import POD
 from heppy.papas.data.idcoder import IdCoder
 
-from ROOT import TLorentzVector
-from ROOT import TVector3
 
 class ParticleMCParticleLink(BaseLink, POD):
     '''Interface for link between fcc particle and MCParticle as stored in a ParticleMCParticle association
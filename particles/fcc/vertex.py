@@ -1,7 +1,7 @@
 from heppy.particles.vertex import Vertex as BaseVertex
 from pod import POD
 
-from ROOT import TVector3
+from heppy.framework.lazyroot import ROOT
 
 class Vertex(BaseVertex, POD):
 
@@ -9,9 +9,9 @@ class Vertex(BaseVertex, POD):
         super(Vertex, self).__init__(fccobj)
         self.incoming = []
         self.outgoing = []
-        self._point = TVector3(fccobj.position().x,
-                               fccobj.position().y,
-                               fccobj.position().z)
+        self._point = ROOT.TVector3(fccobj.position().x,
+                                    fccobj.position().y,
+                                    fccobj.position().z)
         self._point *= 1e-3 # pythia : mm -> papas : m
         self._ctau = fccobj.ctau()
         
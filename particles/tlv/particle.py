@@ -1,6 +1,6 @@
 from heppy.particles.particle import Particle as BaseParticle
 from rootobj import RootObj
-from ROOT import TVector3
+from heppy.framework.pools import vectors3
 from vertex import Vertex 
 from heppy.papas.data.idcoder import IdCoder
 
@@ -13,6 +13,6 @@ class Particle(BaseParticle, RootObj):
         self._charge = charge
         self._tlv = tlv
         self._status = status
-        self._start_vertex = Vertex(TVector3(),0)
+        self._start_vertex = Vertex(vectors3.get(),0)
         self._end_vertex = None
 
@@ -1,5 +1,6 @@
 from heppy.particles.tlv.particle import Particle
-from ROOT import TLorentzVector, TVector3
+from heppy.framework.lazyroot import ROOT
+from heppy.framework.pools import lorentz_vectors
 from rootobj import RootObj
 import math
 
@@ -14,7 +15,7 @@ class Resonance(Particle, RootObj):
     
     def __init__(self, legs, pid, status=3):
         self.legs = legs
-        tlv = TLorentzVector()
+        tlv = lorentz_vectors.get()
         charge = 0
         for leg in legs:
             charge += leg.q()
@@ -61,7 +62,7 @@ class Resonance2(Resonance):
         If axis is None, using the z axis.
         '''
         if axis is None:
-            axis = TVector3(0, 0, 1)
+            axis = ROOT.TVector3(0, 0, 1)
         p1 = self.leg1().p3()
         p2 = self.leg2().p3()
         normal = p1.Cross(p2).Unit()
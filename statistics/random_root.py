@@ -1,23 +1,47 @@
 
-from ROOT import TRandom
+import hashlib
 
-rootrandom = TRandom()
+from heppy.framework.lazyroot import ROOT
+
+# created at the first use, not to import ROOT when importing this module
+rootrandom = None
+
+def _generator():
+    global rootrandom
+    if rootrandom is None:
+        rootrandom = ROOT.TRandom()
+    return rootrandom
 
 def expovariate (a):
-    x=rootrandom.Exp(1./a)
+    x=_generator().Exp(1./a)
     #pdebugger.info( x)
     return x
 
 def uniform (a, b):
-    x=rootrandom.Uniform(a, b)
+    x=_generator().Uniform(a, b)
     #pdebugger.info( x)
     return x
 
 def gauss (a, b):
-    x= rootrandom.Gaus(a,b)
+    x= _generator().Gaus(a,b)
     #pdebugger.info( x)
     return x
 
 def seed (s):
     global rootrandom
-    rootrandom = TRandom(s)
+    rootrandom = ROOT.TRandom(s)
+
+def stream_seed(*key):
+    '''Returns a non-zero 32 bits seed computed from key, a tuple of
+    strings and numbers.'''
+    digest = hashlib.md5(repr(key)).hexdigest()
+    return int(digest[:8], 16) or 1
+
+def stream(*key):
+    '''Starts the random stream identified by key, e.g.
+    (seed, component, input file, entry, analyzer).
+
+    The numbers drawn afterwards only depend on key, see the
+    random_seed parameter of the L{Config<heppy.framework.config.Config>}.
+    '''
+    _generator().SetSeed(stream_seed(*key))
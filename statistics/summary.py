@@ -0,0 +1,139 @@
+'''Counters and averages of all analyzers, in a single file.'''
+
+import numpy
+
+from heppy.statistics.counter import Counter
+from heppy.statistics.average import Average
+
+
+class Summary(object):
+    '''Counters and averages of all analyzers of a looper.
+
+    The looper writes the summary of a job to a single file,
+    summary.npz, in numpy npz format. This file can be read
+    without importing the configuration or the analyzers::
+
+      summary = Summary.load('Outdir/comp/summary.npz')
+      print summary.counter('heppy.analyzers.EventFilter.EventFilter_zfilter',
+                            'efficiency')
+
+    Summaries can be added, e.g. to merge the summaries of all chunks
+    of a component. The counters and averages with the same analyzer
+    and name are then added.
+    '''
+
+    fname = 'summary.npz'
+
+    def __init__(self):
+        self.counters = []
+        self.averages = []
+        self._ranks = dict()
+
+    def _add(self, kind, analyzer, item):
+        key = (kind, analyzer, item.name)
+        items = self.counters if kind == 'counter' else self.averages
+        rank = self._ranks.get(key)
+        if rank is None:
+            self._ranks[key] = len(items)
+            items.append((analyzer, item))
+        else:
+            items[rank][1].__iadd__(item)
+
+    def add(self, analyzer, counters=(), averages=()):
+        '''Add the counters and averages of an analyzer.
+
+        @param analyzer: name of the analyzer.
+        @param counters: iterable of L{Counter<heppy.statistics.counter.Counter>}.
+        @param averages: iterable of L{Average<heppy.statistics.average.Average>}.
+        '''
+        for counter in counters:
+            self._add('counter', analyzer, counter)
+        for average in averages:
+            self._add('average', analyzer, average)
+
+    def counter(self, analyzer, name):
+        '''Returns the counter with this name of an analyzer.'''
+        return self.counters[self._ranks[('counter', analyzer, name)]][1]
+
+    def average(self, analyzer, name):
+        '''Returns the average with this name of an analyzer.'''
+        return self.averages[self._ranks[('average', analyzer, name)]][1]
+
+    def __len__(self):
+        return len(self.counters) + len(self.averages)
+
+    def __add__(self, other):
+        '''Merge two summaries.'''
+        for analyzer, counter in other.counters:
+            self._add('counter', analyzer, counter)
+        for analyzer, average in other.averages:
+            self._add('average', analyzer, average)
+        return self
+
+    def __iadd__(self, other):
+        return self.__add__(other)
+
+    def write(self, dirname):
+        '''Write the summary to summary.npz, and its printout
+        to summary.txt, in dirname.'''
+        levels = [level for analyzer, counter in self.counters
+                  for level, count in counter]
+        counts = [count for analyzer, counter in self.counters
+                  for level, count in counter]
+        arrays = dict(
+            counter_analyzers=numpy.array([analyzer for analyzer, counter in self.counters], dtype=str),
+            counter_names=numpy.array([counter.name for analyzer, counter in self.counters], dtype=str),
+            counter_sizes=numpy.array([len(counter) for analyzer, counter in self.counters], dtype=numpy.int64),
+            levels=numpy.array(levels, dtype=str),
+            counts=numpy.array(counts) if counts else numpy.zeros(0, dtype=numpy.int64),
+            average_analyzers=numpy.array([analyzer for analyzer, average in self.averages], dtype=str),
+            average_names=numpy.array([average.name for analyzer, average in self.averages], dtype=str),
+            average_sums=numpy.array([[average.sumw, average.sumwx, average.sumwx2]
+                                      for analyzer, average in self.averages],
+                                     dtype=numpy.float64).reshape(-1, 3)
+        )
+        with open('/'.join([dirname, self.fname]), 'wb') as out:
+            numpy.savez(out, **arrays)
+        with open('/'.join([dirname, self.fname.replace('.npz', '.txt')]), 'w') as out:
+            out.write(str(self))
+            out.write('\n')
+
+    @classmethod
+    def load(cls, fname):
+        '''Read a summary written by L{write}.'''
+        summary = cls()
+        with numpy.load(fname) as arrays:
+            levels = arrays['levels'].tolist()
+            counts = arrays['counts'].tolist()
+            offset = 0
+            for analyzer, name, size in zip(arrays['counter_analyzers'].tolist(),
+                                            arrays['counter_names'].tolist(),
+                                            arrays['counter_sizes'].tolist()):
+                counter = Counter(name)
+                for level, count in zip(levels[offset:offset+size],
+                                        counts[offset:offset+size]):
+                    counter.register(level)
+                    counter.inc(level, count)
+                offset += size
+                summary.add(analyzer, counters=[counter])
+            for analyzer, name, sums in zip(arrays['average_analyzers'].tolist(),
+                                            arrays['average_names'].tolist(),
+                                            arrays['average_sums'].tolist()):
+                average = Average(name)
+                average.sumw, average.sumwx, average.sumwx2 = sums
+                summary.add(analyzer, averages=[average])
+        return summary
+
+    def __str__(self):
+        lines = []
+        analyzers = []
+        for analyzer, item in self.counters + self.averages:
+            if analyzer not in analyzers:
+                analyzers.append(analyzer)
+        for analyzer in analyzers:
+            lines.append(analyzer + ':')
+            lines.extend(str(counter) for ana, counter in self.counters
+                         if ana == analyzer)
+            lines.extend(str(average) for ana, average in self.averages
+                         if ana == analyzer)
+        return '\n'.join(lines)
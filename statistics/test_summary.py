@@ -0,0 +1,61 @@
+import unittest
+import tempfile
+import shutil
+import os
+
+from summary import Summary
+from counter import Counter
+from average import Average
+
+def make_summary(nall, npass, values):
+    counter = Counter('cut_flow')
+    counter.register('all')
+    counter.register('pass')
+    counter.inc('all', nall)
+    counter.inc('pass', npass)
+    average = Average('mass')
+    for value in values:
+        average.add(value)
+    summary = Summary()
+    summary.add('ana1', counters=[counter], averages=[average])
+    summary.add('ana2', counters=[Counter('empty')])
+    return summary
+
+class SummaryTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.dirname = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.dirname)
+
+    def test_write_load(self):
+        summary = make_summary(10, 3, [1., 2.])
+        summary.write(self.dirname)
+        self.assertEqual(sorted(os.listdir(self.dirname)),
+                         ['summary.npz', 'summary.txt'])
+        loaded = Summary.load('/'.join([self.dirname, Summary.fname]))
+        self.assertEqual(len(loaded), 3)
+        counter = loaded.counter('ana1', 'cut_flow')
+        self.assertEqual(counter['all'], ['all', 10])
+        self.assertEqual(counter['pass'], ['pass', 3])
+        self.assertEqual(len(loaded.counter('ana2', 'empty')), 0)
+        self.assertEqual(loaded.average('ana1', 'mass').average(),
+                         summary.average('ana1', 'mass').average())
+        self.assertEqual(str(loaded), str(summary))
+
+    def test_empty(self):
+        Summary().write(self.dirname)
+        loaded = Summary.load('/'.join([self.dirname, Summary.fname]))
+        self.assertEqual(len(loaded), 0)
+
+    def test_add(self):
+        summary = make_summary(10, 3, [1., 2.])
+        summary += make_summary(5, 1, [3.])
+        self.assertEqual(len(summary), 3)
+        self.assertEqual(summary.counter('ana1', 'cut_flow')['pass'], ['pass', 4])
+        self.assertAlmostEqual(summary.average('ana1', 'mass').value(), 2.)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,83 @@
+import unittest
+import tempfile
+import shutil
+
+from timing import LatencyHistogram, TimingReport
+
+class LatencyHistogramTestCase(unittest.TestCase):
+
+    def test_quantiles(self):
+        histo = LatencyHistogram('ana')
+        for i in range(99):
+            histo.add(0.001)
+        histo.add(1.)
+        self.assertEqual(histo.n, 100)
+        self.assertEqual(histo.max, 1.)
+        self.assertAlmostEqual(histo.mean(), (0.099+1.)/100)
+        # bins are 26% wide
+        self.assertTrue(0.001 <= histo.quantile(0.5) < 0.00126)
+        self.assertTrue(0.001 <= histo.quantile(0.99) < 0.00126)
+        self.assertEqual(histo.quantile(1.), 1.)
+
+    def test_underflow(self):
+        histo = LatencyHistogram('ana')
+        histo.add(0.)
+        self.assertEqual(histo.counts, {0:1})
+        self.assertEqual(histo.quantile(0.5), 0.)
+
+    def test_add(self):
+        h1 = LatencyHistogram('ana')
+        h1.add(0.001)
+        h2 = LatencyHistogram('ana')
+        h2.add(0.1)
+        h2.add(0.1)
+        h1 += h2
+        self.assertEqual(h1.n, 3)
+        self.assertEqual(h1.max, 0.1)
+        self.assertTrue(h1.quantile(0.5) > 0.01)
+        h3 = LatencyHistogram('ana', bins_per_decade=5)
+        self.assertRaises(ValueError, h1.__add__, h3)
+
+
+class TimingReportTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.dirname = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.dirname)
+
+    def fill(self, nevents):
+        report = TimingReport(['ana1', 'ana2'], tick_events=10)
+        report.start()
+        for i in range(nevents):
+            report.analyzers[0].add(0.001)
+            report.analyzers[1].add(0.002)
+            report.event.add(0.003)
+            report.tick()
+        return report
+
+    def test_write_load(self):
+        report = self.fill(25)
+        self.assertEqual(len(report.timelines[0]), 3)
+        self.assertEqual(report.timelines[0][-1][1], 20)
+        report.write(self.dirname)
+        loaded = TimingReport.load('/'.join([self.dirname, TimingReport.fname]))
+        self.assertEqual(loaded.events, 25)
+        self.assertEqual(loaded.timelines, report.timelines)
+        self.assertEqual([histo.name for histo in loaded.analyzers],
+                         ['ana1', 'ana2'])
+        self.assertEqual(loaded.analyzers[1].counts, report.analyzers[1].counts)
+
+    def test_add(self):
+        report = self.fill(25)
+        report += self.fill(10)
+        self.assertEqual(report.events, 35)
+        self.assertEqual(report.event.n, 35)
+        self.assertEqual(len(report.timelines), 2)
+        other = TimingReport(['ana1'])
+        self.assertRaises(ValueError, report.__add__, other)
+
+
+if __name__ == '__main__':
+    unittest.main()
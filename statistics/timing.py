@@ -0,0 +1,212 @@
+'''Latency histograms and timing report of the looper.'''
+
+import math
+import json
+import timeit
+
+
+class LatencyHistogram(object):
+    '''Histogram of latencies, with logarithmic bins.
+
+    The bins cover latencies from min_time on,
+    with bins_per_decade bins per factor of 10.
+    Smaller latencies are counted in the first bin.
+    The quantiles are therefore known with a relative precision
+    of about 10**(1./bins_per_decade) - 1, i.e. 26% by default.
+
+    Histograms with the same binning can be added::
+
+      histo = LatencyHistogram('event')
+      histo.add(0.004)
+      histo += other_histo
+      print histo.quantile(0.99)
+    '''
+
+    def __init__(self, name, min_time=1e-6, bins_per_decade=10):
+        self.name = name
+        self.min_time = min_time
+        self.bins_per_decade = bins_per_decade
+        self.counts = dict()
+        self.n = 0
+        self.sum = 0.
+        self.max = 0.
+
+    def bin(self, time):
+        '''Index of the bin containing time.'''
+        if time <= self.min_time:
+            return 0
+        return int(math.log10(time / self.min_time) * self.bins_per_decade)
+
+    def edge(self, ibin):
+        '''Lower edge of bin ibin.'''
+        return self.min_time * 10 ** (float(ibin) / self.bins_per_decade)
+
+    def add(self, time):
+        '''Add a latency, in seconds.'''
+        ibin = self.bin(time)
+        self.counts[ibin] = self.counts.get(ibin, 0) + 1
+        self.n += 1
+        self.sum += time
+        if time > self.max:
+            self.max = time
+
+    def mean(self):
+        return self.sum / self.n if self.n else 0.
+
+    def quantile(self, q):
+        '''Returns the latency below which a fraction q of the entries lies.
+
+        The upper edge of the bin is returned,
+        or the maximum latency if it is smaller.
+        '''
+        if not self.n:
+            return 0.
+        threshold = q * self.n
+        cumul = 0
+        for ibin in sorted(self.counts):
+            cumul += self.counts[ibin]
+            if cumul >= threshold:
+                return min(self.edge(ibin + 1), self.max)
+        return self.max
+
+    def __add__(self, other):
+        '''Add two histograms, which must have the same binning.'''
+        if (self.min_time, self.bins_per_decade) != \
+           (other.min_time, other.bins_per_decade):
+            raise ValueError('cannot add histograms {h1} and {h2} with different binnings'.format(
+                h1=self.name, h2=other.name))
+        for ibin, count in other.counts.iteritems():
+            self.counts[ibin] = self.counts.get(ibin, 0) + count
+        self.n += other.n
+        self.sum += other.sum
+        self.max = max(self.max, other.max)
+        return self
+
+    def __iadd__(self, other):
+        return self.__add__(other)
+
+    def to_dict(self):
+        return dict(name=self.name,
+                    n=self.n,
+                    total=self.sum,
+                    mean=self.mean(),
+                    p50=self.quantile(0.5),
+                    p90=self.quantile(0.9),
+                    p99=self.quantile(0.99),
+                    max=self.max,
+                    min_time=self.min_time,
+                    bins_per_decade=self.bins_per_decade,
+                    counts=dict((str(ibin), count)
+                                for ibin, count in self.counts.iteritems()))
+
+    @classmethod
+    def from_dict(cls, data):
+        histo = cls(data['name'], data['min_time'], data['bins_per_decade'])
+        histo.counts = dict((int(ibin), count)
+                            for ibin, count in data['counts'].iteritems())
+        histo.n = data['n']
+        histo.sum = data['total']
+        histo.max = data['max']
+        return histo
+
+    def __str__(self):
+        return 'Latency {name:<40}: n={n:<9} mean={mean:9.2f} p50={p50:9.2f} p90={p90:9.2f} p99={p99:9.2f} max={max:9.2f} ms'.format(
+            name=self.name, n=self.n,
+            mean=1000*self.mean(),
+            p50=1000*self.quantile(0.5),
+            p90=1000*self.quantile(0.9),
+            p99=1000*self.quantile(0.99),
+            max=1000*self.max)
+
+
+class TimingReport(object):
+    '''Timing of the event processing by the L{Looper<heppy.framework.looper.Looper>}:
+
+     - a latency histogram for each analyzer
+     - a histogram of the latency of the whole analyzer sequence per event
+     - the throughput over time: elapsed time and number of processed
+       events, recorded every tick_events events
+     - the number of processed events
+
+    The report is written to timing.json in the output directory of the looper,
+    once all analyzers have written their output.
+
+    Reports can be added, e.g. to merge the reports of all chunks of a component.
+    The throughput timelines of the chunks are then kept side by side.
+    '''
+
+    fname = 'timing.json'
+
+    def __init__(self, analyzer_names, tick_events=100):
+        self.analyzers = [LatencyHistogram(name) for name in analyzer_names]
+        self.event = LatencyHistogram('event')
+        self.events = 0
+        self.tick_events = tick_events
+        self.timelines = [[]]
+        self.start_time = None
+
+    def start(self):
+        '''Start the throughput clock.'''
+        self.start_time = timeit.default_timer()
+        self.timelines[-1].append((0., 0))
+
+    def tick(self):
+        '''Increase the number of processed events by one.
+
+        Returns the throughput since the start, in events per second,
+        every tick_events events, and None otherwise.
+        '''
+        self.events += 1
+        if self.events % self.tick_events or self.start_time is None:
+            return None
+        elapsed = timeit.default_timer() - self.start_time
+        self.timelines[-1].append((elapsed, self.events))
+        return self.events / elapsed if elapsed > 0 else None
+
+    def __add__(self, other):
+        names = [histo.name for histo in self.analyzers]
+        other_names = [histo.name for histo in other.analyzers]
+        if names != other_names:
+            raise ValueError('cannot add timing reports for different analyzer sequences')
+        for histo, other_histo in zip(self.analyzers, other.analyzers):
+            histo += other_histo
+        self.event += other.event
+        self.events += other.events
+        self.timelines.extend(other.timelines)
+        return self
+
+    def __iadd__(self, other):
+        return self.__add__(other)
+
+    def to_dict(self):
+        return dict(events=self.events,
+                    event=self.event.to_dict(),
+                    analyzers=[histo.to_dict() for histo in self.analyzers],
+                    throughput=self.timelines)
+
+    @classmethod
+    def from_dict(cls, data):
+        report = cls([])
+        report.analyzers = [LatencyHistogram.from_dict(histo)
+                            for histo in data['analyzers']]
+        report.event = LatencyHistogram.from_dict(data['event'])
+        report.events = data['events']
+        report.timelines = [[tuple(point) for point in timeline]
+                            for timeline in data['throughput']]
+        return report
+
+    def write(self, dirname):
+        '''Dump the report to timing.json in dirname.'''
+        with open('/'.join([dirname, self.fname]), 'w') as out:
+            json.dump(self.to_dict(), out, indent=1)
+
+    @classmethod
+    def load(cls, fname):
+        with open(fname) as infile:
+            return cls.from_dict(json.load(infile))
+
+    def __str__(self):
+        lines = ['TimingReport: {n} events'.format(n=self.events)]
+        lines.extend(str(histo) for histo in self.analyzers)
+        lines.append(str(self.event))
+        return '\n'.join(lines)
@@ -1,13 +1,12 @@
 import numpy
-from ROOT import TTree
-import ROOT
+from heppy.framework.lazyroot import ROOT
 
 class Tree(object):
     
     def __init__(self, name, title, defaultFloatType="D", defaultIntType="I"):
         self.vars = {}
         self.vecvars = {}
-        self.tree = TTree(name, title)
+        self.tree = ROOT.TTree(name, title)
         self.defaults = {}
         self.vecdefaults = {}
         self.defaultFloatType = defaultFloatType
@@ -0,0 +1,164 @@
+import unittest
+import shutil
+import tempfile
+import os
+import copy
+from simple_example_cfg import config
+from heppy.utils.testtree import create_tree
+from heppy.framework.checkpoint_looper import CheckpointLooper
+from heppy.framework.eventindex import EventIndex
+import heppy.bin.heppy_hadd as heppy_hadd
+from ROOT import TFile
+
+import logging
+logging.getLogger().setLevel(logging.ERROR)
+
+
+class StopAfter(object):
+    '''Stop flag set after a given number of checks.'''
+    def __init__(self, nchecks):
+        self.nchecks = nchecks
+        self.value = 0
+
+    def __getattribute__(self, attr):
+        if attr == 'value':
+            nchecks = object.__getattribute__(self, 'nchecks') - 1
+            self.nchecks = nchecks
+            if nchecks < 0:
+                return 1
+        return object.__getattribute__(self, attr)
+
+
+class TestCheckpointLooper(unittest.TestCase):
+
+    def setUp(self):
+        self.fname = create_tree()
+        rootfile = TFile(self.fname)
+        self.nevents = rootfile.Get('test_tree').GetEntries()
+        self.outdir = tempfile.mkdtemp()
+        logging.disable(logging.CRITICAL)
+        # entry counts cached in a temporary directory, not in ~/.heppy
+        self.cachedir = tempfile.mkdtemp()
+        self.heppy_cache = os.environ.get('HEPPY_CACHE')
+        os.environ['HEPPY_CACHE'] = self.cachedir
+
+    def tearDown(self):
+        shutil.rmtree(self.outdir)
+        logging.disable(logging.NOTSET)
+        shutil.rmtree(self.cachedir)
+        if self.heppy_cache is None:
+            del os.environ['HEPPY_CACHE']
+        else:
+            os.environ['HEPPY_CACHE'] = self.heppy_cache
+
+    def check_output(self, loop):
+        self.assertEqual(loop.nEvProcessed, self.nevents)
+        self.assertFalse(os.path.exists(loop.checkpointDir))
+        fname = '/'.join([loop.outDir,
+                          'heppy.analyzers.examples.simple.SimpleTreeProducer.SimpleTreeProducer_tree/simple_tree.root'])
+        rootfile = TFile(fname)
+        tree = rootfile.Get('tree')
+        self.assertEqual(tree.GetEntries(), self.nevents)
+        values = [entry.test_variable for entry in tree]
+        self.assertEqual(values, sorted(values))
+
+    def test_segments(self):
+        loop = CheckpointLooper( self.outdir, config,
+                                 checkpointEvents=30,
+                                 quiet=True )
+        loop.loop()
+        self.assertEqual(len(loop.segments), (self.nevents+29)/30)
+        loop.write()
+        self.check_output(loop)
+
+    def test_failed_merge(self):
+        loop = CheckpointLooper( self.outdir, config,
+                                 checkpointEvents=30,
+                                 quiet=True )
+        loop.loop()
+        hadd = heppy_hadd.hadd
+        # the hadd command fails for the root files
+        heppy_hadd.hadd = lambda fname, odir, idirs: 1 if fname.endswith('.root') \
+                          else hadd(fname, odir, idirs)
+        try:
+            self.assertRaises(RuntimeError, loop.write)
+        finally:
+            heppy_hadd.hadd = hadd
+        self.assertTrue(os.path.isfile(loop.checkpointFile))
+
+    def test_resume(self):
+        # stopped at the end of the second segment
+        loop = CheckpointLooper( self.outdir, config,
+                                 checkpointEvents=30,
+                                 stopFlag=StopAfter(62),
+                                 quiet=True )
+        loop.loop()
+        loop.write()
+        self.assertFalse(loop.completed)
+        self.assertEqual(loop.nEvProcessed, 60)
+        self.assertTrue(os.path.isfile(loop.checkpointFile))
+        loop = CheckpointLooper( self.outdir, config,
+                                 checkpointEvents=30,
+                                 resume=True,
+                                 quiet=True )
+        self.assertEqual(loop.nEvProcessed, 60)
+        loop.loop()
+        loop.write()
+        self.check_output(loop)
+
+    def test_event_index(self):
+        # one entry in 3 selected
+        selected = range(0, self.nevents, 3)
+        index = EventIndex.from_entries(selected, [self.fname], [self.nevents])
+        index_fname = '/'.join([self.outdir, EventIndex.fname])
+        index.write(index_fname)
+        comp = copy.copy(config.components[0])
+        comp.event_index = index_fname
+        index_config = copy.copy(config)
+        index_config.components = [comp]
+        outdir = '/'.join([self.outdir, 'out'])
+        # stopped during the second segment
+        loop = CheckpointLooper( outdir, index_config,
+                                 checkpointEvents=30,
+                                 stopFlag=StopAfter(16),
+                                 quiet=True )
+        loop.loop()
+        self.assertFalse(loop.completed)
+        self.assertEqual([seg['nevents'] for seg in loop.segments], [10, 5])
+        self.assertEqual(loop.nEntries, 30 + 13)
+        loop = CheckpointLooper( outdir, index_config,
+                                 checkpointEvents=30,
+                                 resume=True,
+                                 quiet=True )
+        loop.loop()
+        loop.write()
+        self.assertTrue(loop.completed)
+        self.assertEqual(loop.nEvProcessed, len(selected))
+        fname = '/'.join([loop.outDir,
+                          'heppy.analyzers.examples.simple.SimpleTreeProducer.SimpleTreeProducer_tree/simple_tree.root'])
+        rootfile = TFile(fname)
+        tree = rootfile.Get('tree')
+        self.assertEqual(tree.GetEntries(), len(selected))
+
+    def test_max_rss(self):
+        # the ceiling is exceeded at the first check
+        loop = CheckpointLooper( self.outdir, config,
+                                 checkpointEvents=30,
+                                 maxRSS=1.,
+                                 quiet=True )
+        loop.loop()
+        self.assertTrue(loop.outOfMemory)
+        self.assertFalse(loop.completed)
+        self.assertEqual(len(loop.segments), 1)
+        loop = CheckpointLooper( self.outdir, config,
+                                 checkpointEvents=30,
+                                 resume=True,
+                                 quiet=True )
+        loop.loop()
+        loop.write()
+        self.check_output(loop)
+
+
+if __name__ == '__main__':
+
+    unittest.main()
@@ -0,0 +1,82 @@
+import unittest
+import shutil
+import tempfile
+import os
+import copy
+from simple_example_cfg import config, inputSample
+from heppy.utils.testtree import create_tree
+from heppy.framework.chunk_scheduler import ChunkScheduler
+from heppy.framework.heppy_loop import create_parser
+from heppy.framework.config import split
+import heppy.framework.config as cfg
+from ROOT import TFile
+
+import logging
+logging.getLogger().setLevel(logging.ERROR)
+
+class TestChunkScheduler(unittest.TestCase):
+
+    def setUp(self):
+        self.fname = create_tree()
+        rootfile = TFile(self.fname)
+        self.nevents = rootfile.Get('test_tree').GetEntries()
+        self.outdir = tempfile.mkdtemp()
+        self.cfgfname = os.path.abspath('simple_example_cfg.py')
+        self.options, args = create_parser().parse_args(['-q', '--progress', '0'])
+        logging.disable(logging.CRITICAL)
+        # entry counts cached in a temporary directory, not in ~/.heppy
+        self.cachedir = tempfile.mkdtemp()
+        self.heppy_cache = os.environ.get('HEPPY_CACHE')
+        os.environ['HEPPY_CACHE'] = self.cachedir
+
+    def tearDown(self):
+        shutil.rmtree(self.outdir)
+        logging.disable(logging.NOTSET)
+        shutil.rmtree(self.cachedir)
+        if self.heppy_cache is None:
+            del os.environ['HEPPY_CACHE']
+        else:
+            os.environ['HEPPY_CACHE'] = self.heppy_cache
+
+    def test_steal(self):
+        # a big chunk and a small one, with more workers than chunks
+        big = copy.deepcopy(inputSample)
+        big.name = 'big'
+        small = copy.deepcopy(inputSample)
+        small.name = 'small'
+        small.eventsPerJob = self.nevents / 2
+        comps = [big] + split([small])[:1]
+        scheduler = ChunkScheduler(comps, self.outdir, config, self.cfgfname,
+                                   self.options, nworkers=4, min_steal=10)
+        failed = scheduler.run()
+        self.assertEqual(failed, [])
+        # the big chunk was processed in several pieces
+        self.assertTrue(len(scheduler.chunks[0].pieces) > 1)
+        self.assertEqual(scheduler.processed(), self.nevents + self.nevents / 2)
+        # the merged output tree contains all events, in order
+        fname = '/'.join([self.outdir, 'big',
+                          'heppy.analyzers.examples.simple.SimpleTreeProducer.SimpleTreeProducer_tree/simple_tree.root'])
+        rootfile = TFile(fname)
+        tree = rootfile.Get('tree')
+        self.assertEqual(tree.GetEntries(), self.nevents)
+        values = [entry.test_variable for entry in tree]
+        self.assertEqual(values, sorted(values))
+        self.assertFalse(os.path.exists('/'.join([self.outdir, 'big', 'pieces'])))
+        # needed to unpickle the configuration, e.g. by heppy_hadd
+        for name in ['big', comps[1].name]:
+            self.assertTrue(os.path.isfile('/'.join([self.outdir, name, '__cfg_to_run__.py'])))
+
+    def test_failed(self):
+        # the analyzer module cannot be imported in the workers
+        bad_config = copy.copy(config)
+        bad_config.sequence = [cfg.Analyzer('heppy.analyzers.Missing.Missing')]
+        scheduler = ChunkScheduler([inputSample], self.outdir, bad_config,
+                                   self.cfgfname, self.options,
+                                   nworkers=2, retries=1)
+        self.assertEqual(scheduler.run(), [inputSample.name])
+        self.assertEqual(scheduler.chunks[0].failures, 2)
+
+
+if __name__ == '__main__':
+
+    unittest.main()
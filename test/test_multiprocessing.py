@@ -28,10 +28,19 @@ class TestMultiProcessing(unittest.TestCase):
         self.nevents = rootfile.Get('test_tree').GetEntries()
         self.outdir = tempfile.mkdtemp()
         logging.disable(logging.CRITICAL)
+        # entry counts cached in a temporary directory, not in ~/.heppy
+        self.cachedir = tempfile.mkdtemp()
+        self.heppy_cache = os.environ.get('HEPPY_CACHE')
+        os.environ['HEPPY_CACHE'] = self.cachedir
         
     def tearDown(self):
         shutil.rmtree(self.outdir)
         logging.disable(logging.NOTSET)
+        shutil.rmtree(self.cachedir)
+        if self.heppy_cache is None:
+            del os.environ['HEPPY_CACHE']
+        else:
+            os.environ['HEPPY_CACHE'] = self.heppy_cache
         os.remove(self.fname2)
         
     def test_dummy(self):
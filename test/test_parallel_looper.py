@@ -0,0 +1,91 @@
+import unittest
+import shutil
+import tempfile
+import os
+from simple_example_cfg import config
+from heppy.utils.testtree import create_tree
+from heppy.framework.parallel_looper import ParallelLooper
+import heppy.bin.heppy_hadd as heppy_hadd
+from ROOT import TFile
+
+import logging
+logging.getLogger().setLevel(logging.ERROR)
+
+class TestParallelLooper(unittest.TestCase):
+
+    def setUp(self):
+        self.fname = create_tree()
+        rootfile = TFile(self.fname)
+        self.nevents = rootfile.Get('test_tree').GetEntries()
+        self.outdir = tempfile.mkdtemp()
+        logging.disable(logging.CRITICAL)
+
+    def tearDown(self):
+        shutil.rmtree(self.outdir)
+        logging.disable(logging.NOTSET)
+
+    def test_shards(self):
+        shards = ParallelLooper._shards(10, 11, 3)
+        self.assertEqual(shards, [(10, 4), (14, 4), (18, 3)])
+        # never more workers than events
+        self.assertEqual(ParallelLooper._shards(0, 2, 4), [(0, 1), (1, 1)])
+
+    def test_all_events_processed(self):
+        loop = ParallelLooper( self.outdir, config,
+                               nWorkers=3,
+                               nEvents=None,
+                               nPrint=0,
+                               quiet=True )
+        loop.loop()
+        loop.write()
+        self.assertEqual(loop.nEvProcessed, self.nevents)
+        self.assertFalse(os.path.exists(loop.workersDir))
+        logfile = open('/'.join([self.outdir, 'log.txt']))
+        nev_processed = None
+        for line in logfile:
+            if line.startswith('number of events processed:'):
+                nev_processed = int(line.split(':')[1])
+        logfile.close()
+        self.assertEqual(nev_processed, self.nevents)
+        # the merged output tree contains all events, in order
+        fname = '/'.join([self.outdir,
+                          'heppy.analyzers.examples.simple.SimpleTreeProducer.SimpleTreeProducer_tree/simple_tree.root'])
+        rootfile = TFile(fname)
+        tree = rootfile.Get('tree')
+        self.assertEqual(tree.GetEntries(), self.nevents)
+        values = [entry.test_variable for entry in tree]
+        self.assertEqual(values, sorted(values))
+
+    def test_skip(self):
+        first = 10
+        loop = ParallelLooper( self.outdir, config,
+                               nWorkers=2,
+                               nEvents=None,
+                               firstEvent=first,
+                               nPrint=0,
+                               quiet=True )
+        loop.loop()
+        loop.write()
+        self.assertEqual(loop.nEvProcessed, self.nevents-first)
+
+    def test_failed_merge(self):
+        loop = ParallelLooper( self.outdir, config,
+                               nWorkers=2,
+                               nEvents=None,
+                               nPrint=0,
+                               quiet=True )
+        loop.loop()
+        hadd = heppy_hadd.hadd
+        # the hadd command fails for the root files
+        heppy_hadd.hadd = lambda fname, odir, idirs: 1 if fname.endswith('.root') \
+                          else hadd(fname, odir, idirs)
+        try:
+            self.assertRaises(RuntimeError, loop.write)
+        finally:
+            heppy_hadd.hadd = hadd
+        self.assertTrue(os.path.isdir(loop.workersDir))
+
+
+if __name__ == '__main__':
+
+    unittest.main()
@@ -0,0 +1,83 @@
+import unittest
+import shutil
+import tempfile
+import copy
+from simple_example_cfg import config
+from heppy.utils.testtree import create_tree
+from heppy.framework.looper import Looper
+from heppy.framework.analyzer import Analyzer
+from heppy.framework.test_batch import Events
+import heppy.framework.config as cfg
+import heppy.statistics.rrandom as random
+
+import logging
+logging.getLogger().setLevel(logging.ERROR)
+
+
+class BatchRandom(Analyzer):
+    def process(self, event):
+        event.var_random = random.uniform(0, 1)
+    def process_batch(self, batch):
+        batch.put('var_random', [random.uniform(0, 1) for event in batch])
+
+class Recorder(Analyzer):
+    def beginLoop(self, setup):
+        super(Recorder, self).beginLoop(setup)
+        self.values = []
+    def process(self, event):
+        self.values.append(event.var_random)
+
+
+class TestRandomStreams(unittest.TestCase):
+
+    def setUp(self):
+        self.fname = create_tree()
+        self.outdir = tempfile.mkdtemp()
+        self.config = copy.copy(config)
+        self.config.random_seed = 0xdeadbeef
+        logging.disable(logging.CRITICAL)
+
+    def tearDown(self):
+        shutil.rmtree(self.outdir)
+        logging.disable(logging.NOTSET)
+
+    def values(self, config, entries):
+        loop = Looper('/'.join([self.outdir, 'looper']), config, quiet=True)
+        values = []
+        for iEv in entries:
+            loop.process(iEv)
+            values.append(loop.event.var_random)
+        return values
+
+    def test_reproducible(self):
+        ref = self.values(self.config, range(10))
+        # in another order, as in another chunk
+        random.seed(1)
+        self.assertEqual(self.values(self.config, [7, 3]), [ref[7], ref[3]])
+        self.assertEqual(len(set(ref)), 10)
+        # another seed
+        other = copy.copy(self.config)
+        other.random_seed = 1
+        self.assertNotEqual(self.values(other, [7]), [ref[7]])
+
+    def test_batch_size(self):
+        # the same analyzers, as the streams depend on their names
+        sequence = cfg.Sequence([cfg.Analyzer(BatchRandom), cfg.Analyzer(Recorder)])
+        def values(batch_size):
+            config = cfg.Config(components=[cfg.Component('test', files=['dummy'])],
+                                sequence=sequence,
+                                services=[], events_class=Events,
+                                batch_size=batch_size, random_seed=1)
+            loop = Looper('/'.join([self.outdir, 'looper']), config,
+                          nEvents=20, quiet=True)
+            loop.loop()
+            return loop._analyzers[-1].values
+        ref = values(0)
+        self.assertEqual(len(set(ref)), 20)
+        self.assertEqual(values(3), ref)
+        self.assertEqual(values(50), ref)
+
+
+if __name__ == '__main__':
+
+    unittest.main()